@@ -739,12 +739,12 @@ def hash_directory(directory, ignore=[]):
 
 
 @contextmanager
-def write_tmp_and_move(filename):
+def write_tmp_and_move(filename, mode='w'):
     """Write to a temporary file, then move into place."""
     dirname = os.path.dirname(filename)
     basename = os.path.basename(filename)
     tmp = os.path.join(dirname, '.%s.tmp' % basename)
-    with open(tmp, 'w') as f:
+    with open(tmp, mode) as f:
         yield f
     shutil.move(tmp, filename)
 
@@ -5,6 +5,7 @@
 
 from __future__ import division
 
+import collections
 import functools
 import inspect
 import multiprocessing
@@ -452,6 +453,7 @@ def add_func_to_class(name, func):
 class HashableMap(MutableMapping):
     """This is a hashable, comparable dictionary.  Hash is performed on
        a tuple of the values in the dictionary."""
+    __slots__ = ('dict',)
 
     def __init__(self):
         self.dict = {}
@@ -487,6 +489,47 @@ def copy(self):
         return clone
 
 
+class LRUCache(object):
+    """Mapping of limited size that evicts its least recently used items.
+
+    Lookups through ``get()`` are counted in the ``hits`` and ``misses``
+    attributes.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+
+    def get(self, key, default=None):
+        """Return the value for key, or default, and mark it as used."""
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = value
+        if len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+
 def in_function(function_name):
     """True if the caller was called from some function with
        the supplied Name, False otherwise."""
@@ -714,25 +757,43 @@ class ObjectWrapper(object):
 
     This class is modeled after the stackoverflow answer:
     * http://stackoverflow.com/a/1445289/771663
+
+    The wrapper shares the ``__dict__`` of the wrapped object. Attributes
+    stored in ``__slots__`` are copied instead, so the wrapped class must
+    also have a ``__dict__`` for new attributes.
     """
-    def __init__(self, wrapped_object):
+    def __new__(cls, wrapped_object, *args, **kwargs):
         wrapped_cls = type(wrapped_object)
         wrapped_name = wrapped_cls.__name__
 
         # If the wrapped object is already an ObjectWrapper, or a derived class
-        # of it, adding type(self) in front of type(wrapped_object)
-        # results in an inconsistent MRO.
+        # of it, adding cls in front of type(wrapped_object) results in an
+        # inconsistent MRO.
         #
         # TODO: the implementation below doesn't account for the case where we
         # TODO: have different base classes of ObjectWrapper, say A and B, and
         # TODO: we want to wrap an instance of A with B.
-        if type(self) not in wrapped_cls.__mro__:
-            self.__class__ = type(wrapped_name, (type(self), wrapped_cls), {})
+        #
+        # The instance is created with its final class, since the class of an
+        # object with __slots__ cannot be changed afterwards.
+        if cls not in wrapped_cls.__mro__:
+            wrapper_cls = type(wrapped_name, (cls, wrapped_cls), {})
         else:
-            self.__class__ = type(wrapped_name, (wrapped_cls,), {})
+            wrapper_cls = type(wrapped_name, (wrapped_cls,), {})
+        return object.__new__(wrapper_cls)
 
+    def __init__(self, wrapped_object):
         self.__dict__ = wrapped_object.__dict__
 
+        for klass in type(wrapped_object).__mro__:
+            for name in getattr(klass, '__slots__', ()):
+                if name in ('__dict__', '__weakref__'):
+                    continue
+                try:
+                    setattr(self, name, getattr(wrapped_object, name))
+                except AttributeError:
+                    pass
+
 
 class Singleton(object):
     """Simple wrapper for lazily initialized singleton objects."""
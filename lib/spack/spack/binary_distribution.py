@@ -27,10 +27,12 @@
 import spack.cmd
 import spack.config as config
 import spack.database as spack_db
+import spack.directory_layout
 import spack.fetch_strategy as fs
 import spack.hash_types as ht
 import spack.mirror
 import spack.relocate as relocate
+import spack.spec
 import spack.util.file_cache as file_cache
 import spack.util.gpg
 import spack.util.spack_json as sjson
@@ -192,6 +194,13 @@ def get_all_built_specs(self):
 
         return spec_list
 
+    def index_hashes(self):
+        """Return the hashes of the cached build cache indices, by mirror
+        URL. They change whenever ``update()`` fetches a new index."""
+        self._init_local_index_cache()
+        return dict((url, entry['index_hash'])
+                    for url, entry in self._local_index_cache.items())
+
     def find_built_spec(self, spec):
         """Look in our cache for the built spec corresponding to ``spec``.
 
@@ -734,24 +743,28 @@ def generate_package_index(cache_prefix):
 
     all_mirror_specs = {}
 
-    for file_path in file_list:
-        try:
-            yaml_url = url_util.join(cache_prefix, file_path)
-            tty.debug('fetching {0}'.format(yaml_url))
-            _, _, yaml_file = web_util.read_from_url(yaml_url)
-            yaml_contents = codecs.getreader('utf-8')(yaml_file).read()
-            spec_dict = syaml.load(yaml_contents)
-            s = Spec.from_yaml(yaml_contents)
-            all_mirror_specs[s.dag_hash()] = {
-                'yaml_url': yaml_url,
-                'spec': s,
-                'num_deps': len(list(s.traverse(root=False))),
-                'binary_cache_checksum': spec_dict['binary_cache_checksum'],
-                'buildinfo': spec_dict['buildinfo'],
-            }
-        except (URLError, web_util.SpackWebError) as url_err:
-            tty.error('Error reading spec.yaml: {0}'.format(file_path))
-            tty.error(url_err)
+    # Specs in a build cache share most of their dependencies, and only
+    # the spliced copies of the specs read here are modified
+    with spack.spec.interned_nodes():
+        for file_path in file_list:
+            try:
+                yaml_url = url_util.join(cache_prefix, file_path)
+                tty.debug('fetching {0}'.format(yaml_url))
+                _, _, yaml_file = web_util.read_from_url(yaml_url)
+                yaml_contents = codecs.getreader('utf-8')(yaml_file).read()
+                spec_dict = syaml.load(yaml_contents)
+                s = Spec.from_dict(spec_dict)
+                all_mirror_specs[s.dag_hash()] = {
+                    'yaml_url': yaml_url,
+                    'spec': s,
+                    'num_deps': len(list(s.traverse(root=False))),
+                    'binary_cache_checksum':
+                        spec_dict['binary_cache_checksum'],
+                    'buildinfo': spec_dict['buildinfo'],
+                }
+            except (URLError, web_util.SpackWebError) as url_err:
+                tty.error('Error reading spec.yaml: {0}'.format(file_path))
+                tty.error(url_err)
 
     sorted_specs = sorted(all_mirror_specs.keys(),
                           key=lambda k: all_mirror_specs[k]['num_deps'])
@@ -976,6 +989,13 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
         tar.extractall(workdir)
     os.remove(temp_tarfile_path)
 
+    # the binary copy of the spec file can only be read by the Python that
+    # wrote it, the spec.yaml file is enough
+    binary_spec_file = spack.directory_layout.binary_spec_path(
+        os.path.join(workdir, ".spack", "spec.yaml"))
+    if os.path.exists(binary_spec_file):
+        os.remove(binary_spec_file)
+
     # create info for later relocation and create tar
     write_buildinfo_file(spec, workdir, rel)
 
@@ -15,6 +15,7 @@
 import spack.config
 import spack.main
 import spack.repo
+import spack.solver.asp
 import spack.stage
 from spack.paths import lib_path, var_path
 
@@ -42,6 +43,9 @@ def setup_parser(subparser):
     subparser.add_argument(
         '-m', '--misc-cache', action='store_true',
         help="remove long-lived caches, like the virtual package index")
+    subparser.add_argument(
+        '--solver-cache', action='store_true',
+        help="remove cached concretization results")
     subparser.add_argument(
         '-p', '--python-cache', action='store_true',
         help="remove .pyc, .pyo files and __pycache__ folders")
@@ -57,7 +61,8 @@ def setup_parser(subparser):
 def clean(parser, args):
     # If nothing was set, activate the default
     if not any([args.specs, args.stage, args.downloads, args.failures,
-                args.misc_cache, args.python_cache, args.bootstrap]):
+                args.misc_cache, args.solver_cache, args.python_cache,
+                args.bootstrap]):
         args.stage = True
 
     # Then do the cleaning falling through the cases
@@ -85,6 +90,10 @@ def clean(parser, args):
         tty.msg('Removing cached information on repositories')
         spack.caches.misc_cache.destroy()
 
+    if args.solver_cache:
+        tty.msg('Removing cached concretization results')
+        spack.solver.asp.clear_solver_cache()
+
     if args.python_cache:
         tty.msg('Removing python cache files')
         for directory in [lib_path, var_path]:
@@ -3,6 +3,8 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import llnl.util.tty as tty
+
 import spack.environment as ev
 
 description = 'concretize an environment and write a lockfile'
@@ -20,11 +22,19 @@ def setup_parser(subparser):
         help="""Concretize with test dependencies. When 'root' is chosen, test
 dependencies are only added for the environment's root specs. When 'all' is
 chosen, test dependencies are enabled for all packages in the environment.""")
+    subparser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help="maximum number of processes used to concretize specs "
+        "separately. 1 concretizes them one after the other.")
 
 
 def concretize(parser, args):
     env = ev.get_env(args, 'concretize', required=True)
 
+    if args.jobs is not None and args.jobs < 1:
+        tty.die('invalid value for argument "-j" '
+                '[expected a positive integer, got "{0}"]'.format(args.jobs))
+
     if args.test == 'all':
         tests = True
     elif args.test == 'root':
@@ -33,6 +43,7 @@ def concretize(parser, args):
         tests = False
 
     with env.write_transaction():
-        concretized_specs = env.concretize(force=args.force, tests=tests)
+        concretized_specs = env.concretize(
+            force=args.force, tests=tests, jobs=args.jobs)
         ev.display_specs(concretized_specs)
         env.write()
@@ -3,6 +3,11 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import time
+
+import llnl.util.tty as tty
+
+import spack.config
 import spack.store
 
 description = "rebuild Spack's package database"
@@ -10,5 +15,34 @@
 level = "long"
 
 
+def setup_parser(subparser):
+    subparser.add_argument(
+        '--to-sqlite', action='store_true',
+        help="migrate the database to SQLite storage instead of rebuilding it")
+    subparser.add_argument(
+        '--to-json', action='store_true',
+        help="migrate a database stored in SQLite back to index.json")
+    subparser.add_argument(
+        '-j', '--jobs', type=int, dest='jobs',
+        help="number of processes reading spec files (default: one per CPU)")
+
+
 def reindex(parser, args):
-    spack.store.store.reindex()
+    if args.to_sqlite:
+        spack.store.db.migrate_to_sqlite()
+        tty.msg('Database migrated to {0}'.format(spack.store.db._sqlite_path))
+        return
+
+    if args.to_json:
+        if spack.config.get('config:db_storage') == 'sqlite':
+            tty.die("Cannot migrate the database to JSON while "
+                    "'config:db_storage' is 'sqlite'",
+                    "Set it to 'json' first.")
+        spack.store.db.migrate_to_json()
+        tty.msg('Database migrated to {0}'.format(spack.store.db._index_path))
+        return
+
+    start = time.time()
+    spack.store.store.reindex(jobs=args.jobs)
+    tty.msg('Reindexed {0} installations in {1:.2f}s'.format(
+        len(spack.store.db.query(installed=any)), time.time() - start))
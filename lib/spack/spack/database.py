@@ -20,9 +20,14 @@
 filesystem.
 """
 
+import bisect
 import contextlib
 import datetime
+import functools
+import hashlib
+import json
 import os
+import shutil
 import socket
 import sys
 import time
@@ -37,13 +42,23 @@
     _use_uuid = False
     pass
 
+try:
+    import sqlite3
+    _use_sqlite = True
+except ImportError:
+    _use_sqlite = False
+    pass
+
 import llnl.util.filesystem as fs
 import llnl.util.tty as tty
 
+import spack.caches
+import spack.dependency as dp
 import spack.repo
 import spack.spec
 import spack.store
 import spack.util.lock as lk
+import spack.util.spack_binary as sbinary
 import spack.util.spack_json as sjson
 from spack.directory_layout import DirectoryLayoutError
 from spack.error import SpackError
@@ -93,6 +108,43 @@ def nullcontext(*args, **kwargs):
 # ensure a failed install is properly tracked).
 _pkg_lock_timeout = None
 
+# Default number of journal entries that a journaled database accumulates
+# before the journal is compacted back into the index file.
+_db_journal_threshold = 1000
+
+# Schema of the SQLite storage of the database. Each row of ``installs``
+# holds an install record, in the same form as in index.json, along with the
+# fields that queries look records up by. ``dependencies`` holds the
+# dependency edges of the records, with comma separated deptypes, so that
+# dependents can be looked up without reading records. ``metadata`` holds
+# the version of the database and a generation number, incremented by each
+# write transaction, which tells readers that their records are stale.
+_sqlite_schema = """
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS installs (
+    hash TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    path TEXT,
+    installed INTEGER NOT NULL,
+    explicit INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS installs_name ON installs (name);
+CREATE INDEX IF NOT EXISTS installs_path ON installs (path);
+CREATE INDEX IF NOT EXISTS installs_explicit ON installs (explicit);
+CREATE TABLE IF NOT EXISTS dependencies (
+    hash TEXT NOT NULL,
+    dependent TEXT NOT NULL,
+    deptypes TEXT NOT NULL,
+    PRIMARY KEY (hash, dependent)
+);
+CREATE INDEX IF NOT EXISTS dependencies_dependent
+    ON dependencies (dependent);
+"""
+
 # Types of dependencies tracked by the database
 _tracked_deps = ('link', 'run')
 
@@ -178,6 +230,9 @@ class InstallRecord(object):
         explicit (bool, optional): whether or not this spec was explicitly
             installed, or pulled-in as a dependency of something else
         installation_time (time, optional): time of the installation
+
+    Records read lazily from the database index start without a spec:
+    see ``defer_spec()``.
     """
 
     def __init__(
@@ -192,6 +247,7 @@ def __init__(
             in_buildcache=False,
     ):
         self.spec = spec
+        self._spec_dict = None
         self.path = str(path) if path else None
         self.installed = bool(installed)
         self.ref_count = ref_count
@@ -200,6 +256,43 @@ def __init__(
         self.deprecated_for = deprecated_for
         self.in_buildcache = in_buildcache
 
+    @property
+    def spec(self):
+        if self._spec is None and self._spec_loader is not None:
+            self._spec = self._spec_loader()
+            self._spec_loader = None
+        return self._spec
+
+    @spec.setter
+    def spec(self, spec):
+        self._spec = spec
+        self._spec_loader = None
+
+    @property
+    def name(self):
+        """Name of the spec, available without building the spec."""
+        if self._spec is not None:
+            return self._spec.name
+        return next(iter(self._spec_dict))
+
+    @property
+    def spec_materialized(self):
+        """Whether the spec of this record has been built."""
+        return self._spec_loader is None
+
+    def defer_spec(self, spec_dict, loader):
+        """Build the spec of this record only when it is first accessed.
+
+        Args:
+            spec_dict (dict): node dictionary of the spec, as stored in the
+                database index
+            loader (callable): function with no arguments returning the
+                spec for ``spec_dict``
+        """
+        self._spec = None
+        self._spec_dict = spec_dict
+        self._spec_loader = loader
+
     def install_type_matches(self, installed):
         installed = InstallStatuses.canonicalize(installed)
         if self.installed:
@@ -213,7 +306,10 @@ def to_dict(self, include_fields=default_install_record_fields):
         rec_dict = {}
 
         for field_name in include_fields:
-            if field_name == 'spec':
+            if field_name == 'spec' and not self.spec_materialized:
+                # Still in the form read from the index: no need to build it
+                rec_dict.update({'spec': self._spec_dict})
+            elif field_name == 'spec':
                 rec_dict.update({'spec': self.spec.node_dict_with_hashes()})
             elif field_name == 'deprecated_for' and self.deprecated_for:
                 rec_dict.update({'deprecated_for': self.deprecated_for})
@@ -339,6 +435,8 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
         # Set up layout of database files within the db dir
         self._index_path = os.path.join(self._db_dir, 'index.json')
         self._verifier_path = os.path.join(self._db_dir, 'index_verifier')
+        self._journal_path = os.path.join(self._db_dir, 'index.journal')
+        self._sqlite_path = os.path.join(self._db_dir, 'index.sqlite')
         self._lock_path = os.path.join(self._db_dir, 'lock')
 
         # This is for other classes to use to lock prefix directories.
@@ -346,6 +444,10 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
 
         # Ensure a persistent location for dealing with parallel installation
         # failures (e.g., across near-concurrent processes).
+        self._failure_log_path = os.path.join(self._db_dir, 'failures.log')
+
+        # Directory of per-spec failure markers written by older versions,
+        # imported into the failure log when it is first written.
         self._failure_dir = os.path.join(self._db_dir, 'failures')
 
         # Support special locks for handling parallel installation failures
@@ -356,9 +458,6 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
         if not os.path.exists(self._db_dir):
             fs.mkdirp(self._db_dir)
 
-        if not os.path.exists(self._failure_dir) and not is_upstream:
-            fs.mkdirp(self._failure_dir)
-
         self.is_upstream = is_upstream
         self.last_seen_verifier = ''
 
@@ -370,6 +469,11 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
             _pkg_lock_timeout)
         tty.debug('DATABASE LOCK TIMEOUT: {0}s'.format(
                   str(self.db_lock_timeout)))
+        self._failures = _FailureLog(
+            self._failure_log_path,
+            os.path.join(self._db_dir, 'failures.lock'),
+            timeout=self.db_lock_timeout, legacy_dir=self._failure_dir)
+
         timeout_format_str = ('{0}s'.format(str(self.package_lock_timeout))
                               if self.package_lock_timeout else 'No timeout')
         tty.debug('PACKAGE LOCK TIMEOUT: {0}'.format(
@@ -388,8 +492,27 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
         # before installing a different spec.
         self._installed_prefixes = set()
 
+        # Secondary indexes on the records in self._data, used to narrow down
+        # the records to be checked by queries. They map package names to
+        # sets of hashes, and hold the hashes of explicit records and the
+        # sorted list of all hashes for hash prefix lookups, which is built
+        # on demand and then kept sorted as records are added and removed.
+        self._by_name = {}
+        self._explicit_hashes = set()
+        self._sorted_hashes = None
+
+        # Reverse dependency edges between the records: maps the hash of a
+        # dependency (possibly in an upstream database) to a dictionary from
+        # the hashes of its dependents in this database to the deptypes of
+        # the edge. It is derived from the dependencies stored in each record.
+        self._dependents = {}
+
         self.upstream_dbs = list(upstream_dbs) if upstream_dbs else []
 
+        # For upstream databases: the state of the index files on disk when
+        # they were last read, used to re-read them only when they change.
+        self._index_stamp = None
+
         # whether there was an error at the start of a read transaction
         self._error = None
 
@@ -407,23 +530,135 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
 
         self._record_fields = record_fields
 
+        # Configured storage engine for the records: either 'json'
+        # (index.json) or 'sqlite' (index.sqlite), where each transaction
+        # only writes the rows of the records it modified. A database
+        # migrated to SQLite has no index.json anymore, and keeps using
+        # SQLite whatever the setting (see ``_check_storage()``).
+        self._storage = 'json'
+        if enable_transaction_locking:
+            self._storage = spack.config.get('config:db_storage', 'json')
+        if self._storage == 'sqlite' and not _use_sqlite:
+            raise SpackError(
+                "Cannot use SQLite database storage: the sqlite3 module is "
+                "not available in this Python", "Set config:db_storage to "
+                "'json' to use the JSON index instead.")
+
+        # The records in SQLite storage, when it is in use. They replace
+        # self._data, and the secondary indexes are then looked up in SQL.
+        self._sqlite = None
+
+        # Set while migrating the records to SQLite, when the storage must
+        # not be changed by nested transactions
+        self._migrating = False
+
+        # Whether to cache a binary snapshot of the decoded index file in the
+        # misc cache, so that it's not parsed again while it's unchanged.
+        self._use_snapshot = spack.config.get('config:db_snapshot', False)
+
+        # In lazy mode the specs of records read from the index are built
+        # only when they are first accessed (see ``_read_from_file()``).
+        self._lazy_specs = spack.config.get('config:db_lazy_specs', False)
+
+        # In journaled mode each write transaction appends the records it
+        # modified to ``index.journal`` instead of rewriting ``index.json``.
+        # The journal is replayed on top of the index when reading, and it is
+        # compacted into the index once it grows past a threshold.
+        self._journal_enabled = (
+            enable_transaction_locking and not is_upstream and
+            spack.config.get('config:db_journal', False))
+        self._journal_threshold = (
+            spack.config.get('config:db_journal_threshold') or
+            _db_journal_threshold)
+
+        # Number of entries in the journal on disk, and whether its tail was
+        # found to be truncated the last time it was read.
+        self._journal_entries = 0
+        self._journal_truncated = False
+
+        # Sequence number of the last transaction in the index and journal
+        # that were read. Each journal line records the sequence number of
+        # its transaction, and the index the one of the last transaction it
+        # includes, so that lines already compacted into the index are not
+        # replayed on top of it again.
+        self._journal_sequence = 0
+
+        # Records modified by the current write transaction. Maps a hash to
+        # None if the whole record changed, otherwise to the set of fields
+        # that were marked.
+        self._journal_ops = {}
+
+        # Set when the current write transaction must rewrite the index
+        # (e.g. after a reindex) regardless of the journal.
+        self._journal_full_write = False
+
     def write_transaction(self):
         """Get a write lock context manager for use in a `with` block."""
+        self._check_storage()
         return self._write_transaction_impl(
-            self.lock, acquire=self._read, release=self._write)
+            self._transaction_lock, acquire=self._read, release=self._write)
 
     def read_transaction(self):
         """Get a read lock context manager for use in a `with` block."""
-        return self._read_transaction_impl(self.lock, acquire=self._read)
+        self._check_storage()
+        return self._read_transaction_impl(
+            self._transaction_lock, acquire=self._read)
 
-    def _failed_spec_path(self, spec):
-        """Return the path to the spec's failure file, which may not exist."""
+    @property
+    def _transaction_lock(self):
+        """Lock taken by transactions: with SQLite storage, transactions of
+        the storage itself take the place of the database lock file."""
+        if self._sqlite is not None and not self.is_upstream:
+            return self._sqlite.lock
+        return self.lock
+
+    def _check_storage(self):
+        """Choose the storage of the records before a transaction starts.
+
+        A database with an ``index.json`` is migrated to SQLite if that
+        storage is configured, and read from index.json otherwise. One
+        without index.json but with ``index.sqlite`` was migrated, and is
+        read from SQLite whatever the configured storage.
+        """
+        if self._migrating or (
+                self._sqlite is not None and self._sqlite.lock.held):
+            return
+
+        if os.path.isfile(self._index_path):
+            if self._storage == 'sqlite' and not self.is_upstream:
+                self.migrate_to_sqlite()
+            else:
+                self._use_sqlite_storage(False)
+        elif self._storage == 'sqlite' and not self.is_upstream:
+            self._use_sqlite_storage(True)
+        elif os.path.isfile(self._sqlite_path):
+            if not _use_sqlite:
+                raise SpackError(
+                    "Cannot read the database in {0}: it uses SQLite storage "
+                    "but the sqlite3 module is not available in this "
+                    "Python".format(self._db_dir))
+            self._use_sqlite_storage(True)
+
+    def _use_sqlite_storage(self, use_sqlite):
+        """Switch the records to SQLite storage, or back to index.json."""
+        if use_sqlite and self._sqlite is None:
+            self._set_data({}, set())
+            self._sqlite = _SQLiteRecords(self)
+            self._data = self._sqlite
+            self._installed_prefixes = _SQLitePrefixes(self._sqlite)
+        elif not use_sqlite and self._sqlite is not None:
+            self._sqlite.close()
+            self._sqlite = None
+            self._set_data({}, set())
+            self.last_seen_verifier = ''
+
+    def _failure_key(self, spec):
+        """Return the key of the spec in the failure log."""
         if not spec.concrete:
-            raise ValueError('Concrete spec required for failure path for {0}'
-                             .format(spec.name))
+            raise ValueError('Concrete spec required for failure tracking '
+                             'of {0}'.format(spec.name))
 
-        return os.path.join(self._failure_dir,
-                            '{0}-{1}'.format(spec.name, spec.full_hash()))
+        return spec.full_hash()
 
     def clear_all_failures(self):
         """Force remove install failure tracking files."""
@@ -433,14 +668,16 @@ def clear_all_failures(self):
             if lock:
                 lock.release_write()
 
-        # Remove all failure markings (aka files)
+        # Remove all failure markings at once
         tty.debug('Removing prefix failure tracking files')
-        for fail_mark in os.listdir(self._failure_dir):
-            try:
-                os.remove(os.path.join(self._failure_dir, fail_mark))
-            except OSError as exc:
-                tty.warn('Unable to remove failure marking file {0}: {1}'
-                         .format(fail_mark, str(exc)))
+        try:
+            self._failures.clear()
+        except (OSError, lk.LockError) as exc:
+            tty.warn('Unable to remove failure log {0}: {1}'
+                     .format(self._failure_log_path, str(exc)))
+
+        if os.path.isdir(self._failure_dir):
+            shutil.rmtree(self._failure_dir, ignore_errors=True)
 
     def clear_failure(self, spec, force=False):
         """
@@ -472,36 +709,45 @@ def clear_failure(self, spec, force=False):
 
         if self.prefix_failure_marked(spec):
             try:
-                path = self._failed_spec_path(spec)
                 tty.debug('Removing failure marking for {0}'.format(spec.name))
-                os.remove(path)
-            except OSError as err:
+                self._failures.remove(self._failure_key(spec))
+            except (KeyError, OSError, lk.LockError) as err:
                 tty.warn('Unable to remove failure marking for {0} ({1}): {2}'
-                         .format(spec.name, path, str(err)))
+                         .format(spec.name, self._failure_log_path, str(err)))
 
-    def mark_failed(self, spec):
+    def mark_failed(self, spec, error=None):
         """
         Mark a spec as failing to install.
 
         Prefix failure marking takes the form of a byte range lock on the nth
         byte of a file for coordinating between concurrent parallel build
-        processes and a persistent file, named with the full hash and
-        containing the spec, in a subdirectory of the database to enable
-        persistence across overlapping but separate related build processes.
+        processes and a persistent entry, holding the full hash, the time
+        and a summary of the error, in the failure log of the database to
+        enable persistence across overlapping but separate related build
+        processes.
 
         The failure lock file, ``spack.store.db.prefix_failures``, lives
         alongside the install DB. ``n`` is the sys.maxsize-bit prefix of the
         associated DAG hash to make the likelihood of collision very low with
         no cleanup required.
+
+        Args:
+            spec (Spec): the spec that failed to install
+            error (Exception or str or None): the cause of the failure, if
+                known, summarized in the failure log
         """
-        # Dump the spec to the failure file for (manual) debugging purposes
-        path = self._failed_spec_path(spec)
-        with open(path, 'w') as f:
-            spec.to_json(f)
+        err = 'Unable to mark {0.name} as failed.'
+
+        # Record the failure for other (and later) build processes
+        try:
+            self._failures.add(self._failure_key(spec), spec.name, error)
+        except lk.LockTimeoutError:
+            tty.debug('PID {0} failed to record install failure for {1}'
+                      .format(os.getpid(), spec.name))
+            tty.warn(err.format(spec))
 
         # Also ensure a failure lock is taken to prevent cleanup removal
         # of failure status information during a concurrent parallel build.
-        err = 'Unable to mark {0.name} as failed.'
 
         prefix = spec.prefix
         if prefix not in self._prefix_failures:
@@ -553,7 +799,7 @@ def prefix_failure_locked(self, spec):
 
     def prefix_failure_marked(self, spec):
         """Determine if the spec has a persistent failure marking."""
-        return os.path.exists(self._failed_spec_path(spec))
+        return self._failure_key(spec) in self._failures.failures()
 
     def prefix_lock(self, spec, timeout=None):
         """Get a lock on a particular spec's installation directory.
@@ -639,12 +885,146 @@ def _write_to_file(self, stream):
                 'version': str(_db_version)
             }
         }
+        if self._journal_sequence:
+            database['database']['journal_sequence'] = self._journal_sequence
 
         try:
             sjson.dump(database, stream)
         except (TypeError, ValueError) as e:
             raise sjson.SpackJSONError("error writing JSON database:", str(e))
 
+    def _journal_touch(self, key, field=None):
+        """Track a modification of the install record for ``key``.
+
+        If ``field`` is given only that attribute of the record changed,
+        otherwise the record was added, replaced or removed.
+
+        Does not do any locking.
+        """
+        if self._sqlite is not None:
+            self._sqlite.touch(key)
+
+        if field is None:
+            self._journal_ops[key] = None
+        elif key not in self._journal_ops:
+            self._journal_ops[key] = set([field])
+        elif self._journal_ops[key] is not None:
+            self._journal_ops[key].add(field)
+
+    def _journal_reset(self):
+        """Forget the modifications tracked for the current transaction."""
+        self._journal_ops = {}
+        self._journal_full_write = False
+
+    def _append_to_journal(self):
+        """Append the records modified by the current transaction to the
+        journal, as a single line holding a JSON object with the sequence
+        number of the transaction and the list of its entries:
+
+            {"sequence": <number>, "entries": [<entry>, ...]}
+
+        Entries have one of the following forms:
+
+            {"add": <hash>, "record": <install record>}
+            {"remove": <hash>}
+            {"mark": <hash>, "fields": {<field>: <value>, ...}}
+
+        This function does not do any locking or transactions.
+        """
+        entries = []
+        for key, fields in sorted(self._journal_ops.items()):
+            rec = self._data.get(key)
+            if rec is None:
+                entries.append({'remove': key})
+            elif fields is None:
+                entries.append({
+                    'add': key,
+                    'record': rec.to_dict(include_fields=self._record_fields)
+                })
+            else:
+                entries.append({
+                    'mark': key,
+                    'fields': dict((f, getattr(rec, f)) for f in sorted(fields)
+                                   if f in self._record_fields)
+                })
+
+        sequence = self._journal_sequence + 1
+        try:
+            line = json.dumps({'sequence': sequence, 'entries': entries},
+                              separators=(',', ':'))
+        except (TypeError, ValueError) as e:
+            raise sjson.SpackJSONError("error writing database journal:",
+                                       str(e))
+
+        # A single write keeps the transaction on one line: a process dying
+        # half-way leaves a truncated last line, which is ignored on replay.
+        with open(self._journal_path, 'a') as f:
+            f.write(line + '\n')
+
+        self._journal_sequence = sequence
+        self._journal_entries += len(entries)
+
+    def _journal_transactions(self):
+        """Iterate over the ``(sequence, entries)`` of the transactions in
+        the journal, stopping at an incomplete last line.
+
+        Does not do any locking.
+        """
+        if not os.path.isfile(self._journal_path):
+            return
+
+        with open(self._journal_path, 'r') as f:
+            for line in f:
+                try:
+                    if not line.endswith('\n'):
+                        raise ValueError('missing end of line')
+                    transaction = sjson.load(line)
+                    sequence = int(transaction['sequence'])
+                    entries = transaction['entries']
+                except (ValueError, TypeError, KeyError) as e:
+                    # The process writing this transaction was interrupted
+                    tty.debug('Invalid line in the database journal: '
+                              '{0}'.format(str(e)))
+                    self._journal_truncated = True
+                    return
+                yield sequence, entries
+
+    def _replay_journal(self, installs, sequence=0):
+        """Apply the transactions recorded in the journal to the raw
+        ``installs`` dictionary read from the index file, whose last
+        transaction has the sequence number ``sequence``.
+
+        A process may die after writing a compacted index and before
+        removing the journal. The transactions of the journal that are
+        already in the index are skipped then, since replaying them would
+        undo the changes made by the compacting transaction.
+
+        Does not do any locking.
+        """
+        self._journal_sequence = sequence
+        self._journal_entries = 0
+        self._journal_truncated = False
+        for sequence, entries in self._journal_transactions():
+            # Stale lines count towards the size of the journal as well
+            self._journal_entries += len(entries)
+            if sequence <= self._journal_sequence:
+                continue
+
+            for entry in entries:
+                if 'add' in entry:
+                    installs[entry['add']] = entry['record']
+                elif 'remove' in entry:
+                    installs.pop(entry['remove'], None)
+                elif 'mark' in entry and entry['mark'] in installs:
+                    installs[entry['mark']].update(entry['fields'])
+            self._journal_sequence = sequence
+
+        if self._journal_truncated:
+            # Drop the incomplete transaction; the journal is compacted at
+            # the next write.
+            tty.warn('Discarding incomplete transaction at the end '
+                     'of the database journal')
+
     def _read_spec_from_dict(self, hash_key, installs):
         """Recursively construct a spec from a hash in a YAML database.
 
@@ -666,7 +1046,7 @@ def db_for_spec_hash(self, hash_key):
             if hash_key in self._data:
                 return self
 
-        for db in self.upstream_dbs:
+        for db in self._read_upstreams():
             if hash_key in db._data:
                 return db
 
@@ -677,15 +1057,45 @@ def query_by_spec_hash(self, hash_key, data=None):
             with self.read_transaction():
                 if hash_key in self._data:
                     return False, self._data[hash_key]
-        for db in self.upstream_dbs:
+        for db in self._read_upstreams():
             if hash_key in db._data:
                 return True, db._data[hash_key]
         return False, None
 
-    def _assign_dependencies(self, hash_key, installs, data):
+    def query_by_hashes(self, hashes):
+        """Look up many DAG hashes at once in this database and upstreams.
+
+        This is the bulk version of ``query_by_spec_hash()``: this database
+        is read once, and each upstream database is checked once for changes
+        on disk, however many hashes are looked up.
+
+        Arguments:
+            hashes (iterable): DAG hashes to look up
+
+        Returns:
+            (dict): maps each hash that was found to an ``(upstream, record)``
+                tuple, like the ones returned by ``query_by_spec_hash()``
+        """
+        missing = set(hashes)
+        found = {}
+        with self.read_transaction():
+            for key in missing:
+                if key in self._data:
+                    found[key] = (False, self._data[key])
+        missing.difference_update(found)
+
+        for db in self._read_upstreams():
+            if not missing:
+                break
+            for key in [k for k in missing if k in db._data]:
+                found[key] = (True, db._data[key])
+                missing.discard(key)
+        return found
+
+    def _assign_dependencies(self, hash_key, installs, data, spec=None):
         # Add dependencies from other records in the install DB to
         # form a full spec.
-        spec = data[hash_key].spec
+        spec = spec or data[hash_key].spec
         spec_dict = installs[hash_key]['spec']
         if 'dependencies' in spec_dict[spec.name]:
             yaml_deps = spec_dict[spec.name]['dependencies']
@@ -720,31 +1130,89 @@ def _read_from_file(self, filename):
 
         Does not do any locking.
         """
-        try:
-            with open(filename, 'r') as f:
-                fdata = sjson.load(f)
-        except Exception as e:
-            raise CorruptDatabaseError("error parsing database:", str(e))
+        snapshot = None
+        if self._use_snapshot:
+            snapshot = _IndexSnapshot(filename)
+            db = snapshot.load()
+            if db is not None:
+                tty.debug('Database snapshot cache hit for {0}'.format(
+                    filename))
+            else:
+                tty.debug('Database snapshot cache miss for {0}'.format(
+                    filename))
 
-        if fdata is None:
-            return
+        if snapshot is None or db is None:
+            try:
+                with open(filename, 'r') as f:
+                    fdata = sjson.load(f)
+            except Exception as e:
+                raise CorruptDatabaseError("error parsing database:", str(e))
+
+            if fdata is None:
+                return
+
+            def check(cond, msg):
+                if not cond:
+                    raise CorruptDatabaseError(
+                        "Spack database is corrupt: %s" % msg,
+                        self._index_path)
 
-        def check(cond, msg):
-            if not cond:
-                raise CorruptDatabaseError(
-                    "Spack database is corrupt: %s" % msg, self._index_path)
+            check('database' in fdata, "no 'database' attribute in JSON DB.")
 
-        check('database' in fdata, "no 'database' attribute in JSON DB.")
+            # High-level file checks
+            db = fdata['database']
+            check('installs' in db, "no 'installs' in JSON DB.")
+            check('version' in db, "no 'version' in JSON DB.")
 
-        # High-level file checks
-        db = fdata['database']
-        check('installs' in db, "no 'installs' in JSON DB.")
-        check('version' in db, "no 'version' in JSON DB.")
+            if snapshot is not None:
+                snapshot.save(db)
 
         installs = db['installs']
+        if filename == self._index_path:
+            self._replay_journal(installs, db.get('journal_sequence', 0))
 
+        self._read_installs(installs, Version(db['version']), filename)
+
+    def _read_from_sqlite(self):
+        """Check the SQLite storage at the start of a transaction, and
+        forget the records read from it if it changed since.
+
+        An empty storage is filled by reindexing, if local.
+        """
+        if not os.path.isfile(self._sqlite_path):
+            raise CorruptDatabaseError(
+                "Spack database storage was moved by another process:",
+                self._sqlite_path)
+
+        try:
+            self._sqlite.refresh()
+            version = self._sqlite.version()
+        except sqlite3.Error as e:
+            raise CorruptDatabaseError("error reading database:", str(e))
+
+        if version is None:
+            if self.is_upstream:
+                raise UpstreamDatabaseLockingError(
+                    "No database index file is present, and upstream"
+                    " databases cannot generate an index file")
+            self.reindex(spack.store.layout)
+        elif version > _db_version:
+            raise InvalidDatabaseVersionError(_db_version, version)
+        elif version < _db_version and not any(
+                old == version and new == _db_version
+                for old, new in _skip_reindex):
+            tty.warn(
+                "Spack database version changed from %s to %s. Upgrading."
+                % (version, _db_version))
+            self.reindex(spack.store.layout)
+
+    def _read_installs(self, installs, version, filename):
+        """Fill database from a dictionary mapping hashes to install
+        records, as stored in the database index, at the given version.
+
+        Does not do any locking.
+        """
         # TODO: better version checking semantics.
-        version = Version(db['version'])
         if version > _db_version:
             raise InvalidDatabaseVersionError(_db_version, version)
         elif version < _db_version:
@@ -767,7 +1235,11 @@ def invalid_record(hash_key, error):
             msg = ("Invalid record in Spack database: "
                    "hash: %s, cause: %s: %s")
             msg %= (hash_key, type(error).__name__, str(error))
-            raise CorruptDatabaseError(msg, self._index_path)
+            raise CorruptDatabaseError(msg, filename)
+
+        if self._lazy_specs:
+            self._read_lazily(installs, invalid_record)
+            return
 
         # Build up the database in three passes:
         #
@@ -814,13 +1286,202 @@ def invalid_record(hash_key, error):
         for hash_key, rec in data.items():
             rec.spec._mark_root_concrete()
 
+        self._set_data(data, installed_prefixes)
+
+    def _read_lazily(self, installs, invalid_record):
+        """Fill the database with records whose specs are built on demand.
+
+        Only the install records are decoded here. The spec of a record,
+        along with the specs of its dependencies, is built the first time
+        it is accessed by ``_materialize_spec()``.
+
+        Does not do any locking.
+        """
+        data = {}
+        installed_prefixes = set()
+        for hash_key, rec in installs.items():
+            try:
+                spec_dict = rec['spec']
+                node = spec_dict[next(iter(spec_dict))]
+
+                record = InstallRecord.from_dict(None, rec)
+                record.defer_spec(spec_dict, functools.partial(
+                    self._materialize_spec, hash_key, installs, data))
+                data[hash_key] = record
+
+                external = node.get('external') or {}
+                if (not (external.get('path') or external.get('module')) and
+                        rec.get('installed')):
+                    installed_prefixes.add(rec['path'])
+            except Exception as e:
+                invalid_record(hash_key, e)
+
+        self._set_data(data, installed_prefixes)
+
+    def _materialize_spec(self, hash_key, installs, data):
+        """Build the spec of a record read lazily, connected to the
+        specs of its dependencies (which are built too if necessary)."""
+        try:
+            spec = self._read_spec_from_dict(hash_key, installs)
+            self._assign_dependencies(hash_key, installs, data, spec=spec)
+        except MissingDependenciesError:
+            raise
+        except Exception as e:
+            msg = ("Invalid record in Spack database: "
+                   "hash: %s, cause: %s: %s")
+            msg %= (hash_key, type(e).__name__, str(e))
+            index_path = (self._index_path if self._sqlite is None
+                          else self._sqlite_path)
+            raise CorruptDatabaseError(msg, index_path)
+
+        spec._mark_root_concrete()
+        return spec
+
+    def _set_data(self, data, installed_prefixes):
+        """Replace all the records in the database, and rebuild the
+        secondary indexes on them.
+
+        Does not do any locking.
+        """
+        if self._sqlite is not None:
+            self._sqlite.replace(data)
+            return
+
         self._data = data
         self._installed_prefixes = installed_prefixes
 
-    def reindex(self, directory_layout):
+        self._by_name = {}
+        self._explicit_hashes = set()
+        self._sorted_hashes = None
+        self._dependents = {}
+        for key, rec in data.items():
+            self._index_record(key, rec)
+
+    def _index_record(self, key, rec):
+        """Add a record, with its dependencies, to the secondary indexes."""
+        if self._sqlite is not None:
+            return
+        self._by_name.setdefault(rec.name, set()).add(key)
+        if rec.explicit:
+            self._explicit_hashes.add(key)
+        if self._sorted_hashes is not None:
+            i = bisect.bisect_left(self._sorted_hashes, key)
+            if (i == len(self._sorted_hashes) or
+                    self._sorted_hashes[i] != key):
+                self._sorted_hashes.insert(i, key)
+
+        for dep_key, deptypes in self._record_dependencies(rec):
+            self._dependents.setdefault(dep_key, {})[key] = deptypes
+
+    def _unindex_record(self, key, rec):
+        """Remove a record from the secondary indexes."""
+        if self._sqlite is not None:
+            return
+        hashes = self._by_name.get(rec.name)
+        if hashes is not None:
+            hashes.discard(key)
+            if not hashes:
+                del self._by_name[rec.name]
+        self._explicit_hashes.discard(key)
+        if self._sorted_hashes is not None:
+            i = bisect.bisect_left(self._sorted_hashes, key)
+            if (i < len(self._sorted_hashes) and
+                    self._sorted_hashes[i] == key):
+                del self._sorted_hashes[i]
+
+        for dep_key, _ in self._record_dependencies(rec):
+            dependents = self._dependents.get(dep_key)
+            if dependents is not None:
+                dependents.pop(key, None)
+                if not dependents:
+                    del self._dependents[dep_key]
+
+    def _record_dependencies(self, rec):
+        """Yield the hash and deptypes of the dependencies of a record,
+        without building its spec if it was not built yet."""
+        if rec.spec_materialized:
+            for dspec in rec.spec._dependencies.values():
+                yield dspec.spec.dag_hash(), tuple(dspec.deptypes)
+        else:
+            node = rec._spec_dict[rec.name]
+            for _, dep_key, deptypes in spack.spec.Spec.read_yaml_dep_specs(
+                    node.get('dependencies', {})):
+                yield dep_key, tuple(deptypes)
+
+    def _dependents_of(self, key, deptype='all', transitive=True):
+        """Return the hashes of the records depending on the record with
+        the given hash, in this database and in the upstream databases.
+
+        Only dependency edges of the given deptypes are followed. The cost is
+        proportional to the number of dependents found.
+        """
+        deptype = dp.canonical_deptype(deptype)
+        dbs = [self] + self.upstream_dbs
+
+        dependents, seen, stack = [], set([key]), [key]
+        while stack:
+            current = stack.pop()
+            for db in dbs:
+                for parent, deptypes in db._dependents_edges(current).items():
+                    if parent in seen or not any(
+                            t in deptype for t in deptypes):
+                        continue
+                    seen.add(parent)
+                    dependents.append(parent)
+                    if transitive:
+                        stack.append(parent)
+        return dependents
+
+    def _index_explicit(self, key, rec):
+        """Update the index of explicit records after a change of the
+        explicit flag of a record."""
+        if self._sqlite is not None:
+            return
+        if rec.explicit:
+            self._explicit_hashes.add(key)
+        else:
+            self._explicit_hashes.discard(key)
+
+    def _hashes_for_name(self, name):
+        """Return the hashes of the records of the package ``name``."""
+        if self._sqlite is not None:
+            return set(self._sqlite.select('name = ?', (name,)))
+        return self._by_name.get(name, set())
+
+    def _explicit_keys(self):
+        """Return the hashes of the explicit records."""
+        if self._sqlite is not None:
+            return set(self._sqlite.select('explicit = 1'))
+        return self._explicit_hashes
+
+    def _dependents_edges(self, key):
+        """Map the hashes of the records depending on the record with the
+        given hash to the deptypes of their dependency."""
+        if self._sqlite is not None:
+            return self._sqlite.dependents(key)
+        return self._dependents.get(key, {})
+
+    def _hashes_with_prefix(self, prefix):
+        """Return the hashes in the database starting with ``prefix``."""
+        if self._sqlite is not None:
+            return self._sqlite.with_prefix(prefix)
+
+        if self._sorted_hashes is None:
+            self._sorted_hashes = sorted(self._data)
+
+        hashes = []
+        i = bisect.bisect_left(self._sorted_hashes, prefix)
+        while (i < len(self._sorted_hashes) and
+               self._sorted_hashes[i].startswith(prefix)):
+            hashes.append(self._sorted_hashes[i])
+            i += 1
+        return hashes
+
+    def reindex(self, directory_layout, jobs=None):
         """Build database index from scratch based on a directory layout.
 
-        Locks the DB if it isn't locked already.
+        Locks the DB if it isn't locked already. Spec files in the layout
+        are read by ``jobs`` processes (one per available CPU by default).
         """
         if self.is_upstream:
             raise UpstreamDatabaseLockingError(
@@ -830,15 +1491,18 @@ def reindex(self, directory_layout):
         # ignore errors if we need to rebuild a corrupt database.
         def _read_suppress_error():
             try:
-                if os.path.isfile(self._index_path):
+                if self._sqlite is not None:
+                    self._sqlite.refresh()
+                elif os.path.isfile(self._index_path):
                     self._read_from_file(self._index_path)
             except CorruptDatabaseError as e:
                 self._error = e
-                self._data = {}
-                self._installed_prefixes = set()
+                self._set_data({}, set())
 
+        self._check_storage()
         transaction = lk.WriteTransaction(
-            self.lock, acquire=_read_suppress_error, release=self._write
+            self._transaction_lock, acquire=_read_suppress_error,
+            release=self._write
         )
 
         with transaction:
@@ -851,13 +1515,18 @@ def _read_suppress_error():
 
             old_data = self._data
             old_installed_prefixes = self._installed_prefixes
+            if self._sqlite is not None:
+                # The records in SQLite are replaced in place: keep the old
+                # ones aside, with their specs built while they can be.
+                old_data = dict(self._sqlite.items())
+                for rec in old_data.values():
+                    rec.spec
             try:
                 self._construct_from_directory_layout(
-                    directory_layout, old_data)
+                    directory_layout, old_data, jobs=jobs)
             except BaseException:
                 # If anything explodes, restore old data, skip write.
-                self._data = old_data
-                self._installed_prefixes = old_installed_prefixes
+                self._set_data(old_data, old_installed_prefixes)
                 raise
 
     def _construct_entry_from_directory_layout(self, directory_layout,
@@ -885,7 +1554,8 @@ def _construct_entry_from_directory_layout(self, directory_layout,
         if deprecator:
             self._deprecate(spec, deprecator)
 
-    def _construct_from_directory_layout(self, directory_layout, old_data):
+    def _construct_from_directory_layout(self, directory_layout, old_data,
+                                         jobs=None):
         # Read first the `spec.yaml` files in the prefixes. They should be
         # considered authoritative with respect to DB reindexing, as
         # entries in the DB may be corrupted in a way that still makes
@@ -893,13 +1563,14 @@ def _construct_from_directory_layout(self, directory_layout, old_data):
         # instead, we would perpetuate errors over a reindex.
         with directory_layout.disable_upstream_check():
             # Initialize data in the reconstructed DB
-            self._data = {}
-            self._installed_prefixes = set()
+            self._set_data({}, set())
+            self._journal_full_write = True
 
             # Start inspecting the installed prefixes
             processed_specs = set()
 
-            for spec in directory_layout.all_specs():
+            start = time.time()
+            for spec in directory_layout.all_specs(jobs=jobs):
                 self._construct_entry_from_directory_layout(directory_layout,
                                                             old_data, spec)
                 processed_specs.add(spec)
@@ -949,6 +1620,8 @@ def _construct_from_directory_layout(self, directory_layout, old_data):
                     tty.debug(e)
 
             self._check_ref_counts()
+            tty.debug('Reindexed {0} installations in {1:.2f}s'.format(
+                len(self._data), time.time() - start))
 
     def _check_ref_counts(self):
         """Ensure consistency of reference counts in the DB.
@@ -989,23 +1662,192 @@ def _write(self, type, value, traceback):
 
         This routine does no locking.
         """
+        if self._sqlite is not None:
+            # Commit the SQL transaction, or roll it back on errors
+            try:
+                if type is not None:
+                    self._sqlite.rollback()
+                elif self._sqlite.commit():
+                    # Upstream readers of the database check the verifier
+                    self._write_verifier()
+            finally:
+                self._journal_reset()
+            return
+
         # Do not write if exceptions were raised
         if type is not None:
+            self._journal_reset()
             return
 
+        try:
+            if (self._journal_enabled and
+                    not self._journal_full_write and
+                    not self._journal_truncated and
+                    os.path.isfile(self._index_path) and
+                    self._journal_entries + len(self._journal_ops) <
+                    self._journal_threshold):
+                # Nothing to record for read-only uses of a write transaction
+                if self._journal_ops:
+                    # Update the verifier first, so that other processes
+                    # re-read the journal even if this append is interrupted.
+                    self._write_verifier()
+                    self._append_to_journal()
+            else:
+                self._write_index()
+        finally:
+            self._journal_reset()
+
+    def migrate_to_sqlite(self):
+        """Write all the records of the database to the SQLite storage.
+
+        The database is read from index.json, which is then renamed to
+        ``index.json.migrated``, and all readers of the database use the
+        SQLite storage from then on.
+        """
+        if not _use_sqlite:
+            raise SpackError("Cannot migrate the database to SQLite: the "
+                             "sqlite3 module is not available in this Python")
+        if self.is_upstream:
+            raise UpstreamDatabaseLockingError(
+                "Cannot migrate an upstream database")
+
+        # Keep processes using index.json out until it is retired
+        with lk.WriteTransaction(self.lock):
+            self._use_sqlite_storage(False)
+            if not os.path.isfile(self._index_path):
+                # Migrated by another process already
+                self._use_sqlite_storage(True)
+                return
+
+            tty.msg('Migrating the database index to SQLite')
+            self._migrating = True
+            try:
+                self._read_from_file(self._index_path)
+            finally:
+                self._migrating = False
+
+            data, installed_prefixes = self._data, self._installed_prefixes
+            self._use_sqlite_storage(True)
+            with lk.WriteTransaction(
+                    self._sqlite.lock, acquire=self._sqlite.refresh,
+                    release=self._write):
+                self._set_data(data, installed_prefixes)
+            self._retire_index(self._index_path, self._journal_path)
+
+    def migrate_to_json(self):
+        """Write all the records of a database stored in SQLite back to
+        index.json.
+
+        The SQLite storage is then renamed to ``index.sqlite.migrated``, and
+        readers of the database use index.json from then on, unless they are
+        configured to use SQLite storage.
+        """
+        if self.is_upstream:
+            raise UpstreamDatabaseLockingError(
+                "Cannot migrate an upstream database")
+
+        self._check_storage()
+        if self._sqlite is None:
+            return
+
+        # Keep processes using either storage out until SQLite is retired
+        with lk.WriteTransaction(self.lock):
+            with lk.WriteTransaction(self._sqlite.lock, acquire=self._read):
+                tty.msg('Migrating the database index to JSON')
+                self._write_index()
+                self._retire_index(
+                    self._sqlite_path, self._sqlite_path + '-wal',
+                    self._sqlite_path + '-shm')
+        self._use_sqlite_storage(False)
+
+    def _retire_index(self, index_path, *paths):
+        """Move an index file out of the way after its records were written
+        to the other storage, so that no reader uses it again. Other files
+        of the index are renamed along, or removed if ``index_path`` is
+        index.json (they are journals then).
+
+        This function does not do any locking.
+        """
+        if os.path.isfile(index_path):
+            os.rename(index_path, index_path + '.migrated')
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            elif index_path == self._index_path:
+                os.remove(path)
+            else:
+                # SQLite finds the journals by the name of the database
+                os.rename(path, path.replace(
+                    index_path, index_path + '.migrated'))
+        self._journal_entries = 0
+        self._journal_truncated = False
+
+    def _stat_index(self):
+        """Modification times and sizes of the files holding the index."""
+        stamp = []
+        for path in (self._verifier_path, self._index_path,
+                     self._journal_path, self._sqlite_path):
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _refresh(self):
+        """Re-read an upstream database if its index changed on disk since
+        it was last read."""
+        if self._stat_index() != self._index_stamp:
+            self._read()
+
+    def _read_upstreams(self):
+        """Return the upstream databases, refreshed from disk if needed."""
+        for db in self.upstream_dbs:
+            db._refresh()
+        return self.upstream_dbs
+
+    def index_stamp(self):
+        """Return a value that changes whenever this database or one of its
+        upstreams is modified on disk, to tell when data derived from their
+        records is out of date.
+
+        Does not do any locking.
+        """
+        return (self._stat_index(),) + tuple(
+            db._stat_index() for db in self.upstream_dbs)
+
+    def _write_verifier(self):
+        """Write a new verifier, signaling other processes that the
+        database changed on disk."""
+        if _use_uuid:
+            with open(self._verifier_path, 'w') as f:
+                new_verifier = str(uuid.uuid4())
+                f.write(new_verifier)
+                self.last_seen_verifier = new_verifier
+
+    def _write_index(self):
+        """Rewrite the whole index file, compacting the journal into it."""
         temp_file = self._index_path + (
             '.%s.%s.temp' % (socket.getfqdn(), os.getpid()))
 
+        # The index must supersede every transaction in the journal, also
+        # those that were not read (e.g. when reindexing a corrupt index)
+        for sequence, _ in self._journal_transactions():
+            self._journal_sequence = max(self._journal_sequence, sequence)
+
         # Write a temporary database file them move it into place
         try:
             with open(temp_file, 'w') as f:
                 self._write_to_file(f)
             os.rename(temp_file, self._index_path)
-            if _use_uuid:
-                with open(self._verifier_path, 'w') as f:
-                    new_verifier = str(uuid.uuid4())
-                    f.write(new_verifier)
-                    self.last_seen_verifier = new_verifier
+
+            # The new index includes everything in the journal
+            if os.path.exists(self._journal_path):
+                os.remove(self._journal_path)
+            self._journal_entries = 0
+            self._journal_truncated = False
+
+            self._write_verifier()
         except BaseException as e:
             tty.debug(e)
             # Clean up temp file if something goes wrong.
@@ -1020,6 +1862,15 @@ def _read(self):
         try to regenerate a missing DB if local. This requires taking a
         write lock.
         """
+        if self.is_upstream:
+            # Upstream databases take no transactions: check the storage here
+            self._index_stamp = self._stat_index()
+            self._check_storage()
+
+        if self._sqlite is not None:
+            self._read_from_sqlite()
+            return
+
         if os.path.isfile(self._index_path):
             current_verifier = ''
             if _use_uuid:
@@ -1124,6 +1975,7 @@ def _add(
             self._data[key] = InstallRecord(
                 new_spec, path, installed, ref_count=0, **extra_args
             )
+            self._journal_touch(key)
 
             # Connect dependencies from the DB to the new copy.
             for name, dep in six.iteritems(
@@ -1134,6 +1986,7 @@ def _add(
                 new_spec._add_dependency(record.spec, dep.deptypes)
                 if not upstream:
                     record.ref_count += 1
+                    self._journal_touch(dkey, 'ref_count')
 
             # Mark concrete once everything is built, and preserve
             # the original hash of concrete specs.
@@ -1141,13 +1994,19 @@ def _add(
             new_spec._hash = key
             new_spec._full_hash = spec._full_hash
 
+            self._index_record(key, self._data[key])
+
         else:
             # If it is already there, mark it as installed and update
             # installation time
             self._data[key].installed = True
             self._data[key].installation_time = _now()
+            self._journal_touch(key, 'installed')
+            self._journal_touch(key, 'installation_time')
 
         self._data[key].explicit = explicit
+        self._index_explicit(key, self._data[key])
+        self._journal_touch(key, 'explicit')
 
     @_autospec
     def add(self, spec, directory_layout, explicit=False):
@@ -1188,9 +2047,12 @@ def _decrement_ref_count(self, spec):
 
         rec = self._data[key]
         rec.ref_count -= 1
+        self._journal_touch(key, 'ref_count')
 
         if rec.ref_count == 0 and not rec.installed:
             del self._data[key]
+            self._unindex_record(key, rec)
+            self._journal_touch(key)
 
             for dep in spec.dependencies(_tracked_deps):
                 self._decrement_ref_count(dep)
@@ -1203,6 +2065,7 @@ def _increment_ref_count(self, spec):
 
         rec = self._data[key]
         rec.ref_count += 1
+        self._journal_touch(key, 'ref_count')
 
     def _remove(self, spec):
         """Non-locking version of remove(); does real work."""
@@ -1216,9 +2079,12 @@ def _remove(self, spec):
 
         if rec.ref_count > 0:
             rec.installed = False
+            self._journal_touch(key, 'installed')
             return rec.spec
 
         del self._data[key]
+        self._unindex_record(key, rec)
+        self._journal_touch(key)
 
         for dep in rec.spec.dependencies(_tracked_deps):
             # FIXME: the two lines below needs to be updated once #11983 is
@@ -1286,6 +2152,8 @@ def _deprecate(self, spec, deprecator):
         spec_rec.deprecated_for = deprecator_key
         spec_rec.installed = False
         self._data[spec_key] = spec_rec
+        self._journal_touch(spec_key, 'deprecated_for')
+        self._journal_touch(spec_key, 'installed')
 
     @_autospec
     def mark(self, spec, key, value):
@@ -1294,8 +2162,12 @@ def mark(self, spec, key, value):
             return self._mark(spec, key, value)
 
     def _mark(self, spec, key, value):
-        record = self._data[self._get_matching_spec_key(spec)]
+        spec_key = self._get_matching_spec_key(spec)
+        record = self._data[spec_key]
         setattr(record, key, value)
+        if key == 'explicit':
+            self._index_explicit(spec_key, record)
+        self._journal_touch(spec_key, key)
 
     @_autospec
     def deprecate(self, spec, deprecator):
@@ -1311,6 +2183,26 @@ def installed_relatives(self, spec, direction='children', transitive=True,
             raise ValueError("Invalid direction: %s" % direction)
 
         relatives = set()
+        if direction == 'parents':
+            # Follow the dependents index instead of the links between
+            # specs, so that only the relatives themselves are visited.
+            with self.read_transaction():
+                for spec in self.query(spec):
+                    for hash_key in self._dependents_of(
+                            spec.dag_hash(), deptype, transitive):
+                        upstream, record = self.query_by_spec_hash(hash_key)
+                        if not record:
+                            msg = ("Inconsistent state! Dependent %s of %s "
+                                   "not in DB" % (hash_key, spec.dag_hash()))
+                            if self._fail_when_missing_deps:
+                                raise MissingDependenciesError(msg)
+                            tty.warn(msg)
+                            continue
+
+                        if record.installed:
+                            relatives.add(record.spec)
+            return relatives
+
         for spec in self.query(spec):
             if transitive:
                 to_add = spec.traverse(
@@ -1377,9 +2269,8 @@ def _get_by_hash_local(self, dag_hash, default=None, installed=any):
 
         # check if hash is a prefix of some installed (or previously
         # installed) spec.
-        matches = [record.spec for h, record in self._data.items()
-                   if h.startswith(dag_hash) and
-                   record.install_type_matches(installed)]
+        matches = [self._data[h].spec for h in self._hashes_with_prefix(dag_hash)
+                   if self._data[h].install_type_matches(installed)]
         if matches:
             return matches
 
@@ -1441,7 +2332,7 @@ def get_by_hash(self, dag_hash, default=None, installed=any):
         if spec is not None:
             return spec
 
-        for upstream_db in self.upstream_dbs:
+        for upstream_db in self._read_upstreams():
             spec = upstream_db._get_by_hash_local(
                 dag_hash, default=default, installed=installed)
             if spec is not None:
@@ -1483,8 +2374,36 @@ def _query(
         start_date = start_date or datetime.datetime.min
         end_date = end_date or datetime.datetime.max
 
-        for key, rec in self._data.items():
-            if hashes is not None and rec.spec.dag_hash() not in hashes:
+        if query_spec is not any and not isinstance(
+                query_spec, spack.spec.Spec):
+            query_spec = spack.spec.Spec(query_spec)
+
+        # Use the secondary indexes to narrow down the records to check.
+        # Records for other packages can't satisfy a query for a
+        # non-virtual package, so they are skipped without building specs.
+        candidates = []
+        query_name = None
+        if hashes is not None:
+            candidates.append(set(h for h in hashes if h in self._data))
+        if query_spec is not any and query_spec.name and \
+                not query_spec.virtual:
+            query_name = query_spec.name
+            candidates.append(self._hashes_for_name(query_name))
+        if explicit is True:
+            candidates.append(self._explicit_keys())
+
+        if candidates:
+            keys = sorted(min(candidates, key=len))
+        else:
+            keys = self._data
+
+        for key in keys:
+            rec = self._data[key]
+
+            if query_name is not None and rec.name != query_name:
+                continue
+
+            if hashes is not None and key not in hashes:
                 continue
 
             if not rec.install_type_matches(installed):
@@ -1497,7 +2416,7 @@ def _query(
                 continue
 
             if known is not any and spack.repo.path.exists(
-                    rec.spec.name) != known:
+                    rec.name) != known:
                 continue
 
             if start_date or end_date:
@@ -1529,7 +2448,7 @@ def query_local(self, *args, **kwargs):
     def query(self, *args, **kwargs):
         """Query the Spack database including all upstream databases."""
         upstream_results = []
-        for upstream_db in self.upstream_dbs:
+        for upstream_db in self._read_upstreams():
             # queries for upstream DBs need to *not* lock - we may not
             # have permissions to do this and the upstream DBs won't know about
             # us anyway (so e.g. they should never uninstall specs)
@@ -1577,14 +2496,20 @@ def unused_specs(self):
             2. Installed as a "run" or "link" dependency (even transitive) of
                a spec at point 1.
         """
-        needed, visited = set(), set()
+        needed = set()
         with self.read_transaction():
-            for key, rec in self._data.items():
-                if rec.explicit:
-                    # recycle `visited` across calls to avoid
-                    # redundantly traversing
-                    for spec in rec.spec.traverse(visited=visited):
-                        needed.add(spec.dag_hash())
+            # Walk the dependency edges of the records from the explicit
+            # ones, without building specs that are not needed.
+            stack = list(self._explicit_keys())
+            while stack:
+                key = stack.pop()
+                if key in needed:
+                    continue
+                needed.add(key)
+                rec = self._data.get(key)
+                if rec is not None:
+                    stack.extend(
+                        k for k, _ in self._record_dependencies(rec))
 
             unused = [rec.spec for key, rec in self._data.items()
                       if key not in needed and rec.installed]
@@ -1608,6 +2533,586 @@ def update_explicit(self, spec, explicit):
                 status = 'explicit' if explicit else 'implicit'
                 tty.debug(message.format(status, s=spec))
                 rec.explicit = explicit
+                self._index_explicit(rec.spec.dag_hash(), rec)
+                self._journal_touch(rec.spec.dag_hash(), 'explicit')
+
+
+class _IndexSnapshot(object):
+    """Binary snapshot of a decoded database index file, cached in the
+    misc cache.
+
+    The snapshot is keyed on the path of the index, and is only valid for
+    the index file with the modification time, size and content hash it
+    was saved for. It uses the encoding of ``spack.util.spack_binary``,
+    which holds data only, so a snapshot can't run code when it is loaded.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.path.abspath(filename)
+        path_hash = hashlib.sha1(self.filename.encode('utf-8')).hexdigest()
+        self.key = 'database/{0}.bin'.format(path_hash)
+        self.signature = None
+
+    def _signature(self):
+        """Return the modification time, size and content hash of the
+        index file."""
+        stat = os.stat(self.filename)
+        with open(self.filename, 'rb') as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        return [stat.st_mtime, stat.st_size, content_hash]
+
+    def load(self):
+        """Return the decoded ``database`` section of the index file, or
+        None if there is no valid snapshot for it."""
+        cache = spack.caches.misc_cache
+        try:
+            self.signature = self._signature()
+            if not cache.init_entry(self.key):
+                return None
+            with cache.read_transaction(self.key, binary=True) as f:
+                snapshot = sbinary.load(f)
+            signature, db = snapshot['signature'], snapshot['database']
+        except Exception as e:
+            tty.debug('Unable to read database snapshot: {0}'.format(e))
+            return None
+
+        return db if signature == self.signature else None
+
+    def save(self, db):
+        """Cache the decoded ``database`` section of the index file."""
+        if self.signature is None:
+            return
+
+        cache = spack.caches.misc_cache
+        try:
+            cache.init_entry(self.key)
+            with cache.write_transaction(self.key, binary=True) as (old, new):
+                sbinary.dump(
+                    {'signature': self.signature, 'database': db}, new)
+        except Exception as e:
+            tty.debug('Unable to write database snapshot: {0}'.format(e))
+
+
+class _SQLiteLock(object):
+    """Lock running the transactions of a database stored in SQLite.
+
+    It has the interface of ``llnl.util.lock.Lock``, so the usual
+    transaction context managers work with it, and it takes the place of
+    the database lock file: the outermost read or write lock begins a
+    SQLite transaction, which is committed when the last lock is released.
+    Readers work on a snapshot of the storage and don't wait for writers,
+    while write transactions are serialized by SQLite.
+    """
+
+    def __init__(self, path, timeout, read_only=False):
+        self.path = path
+        self.timeout = timeout
+        self.read_only = read_only
+        self._connection = None
+        self._pid = None
+        self._reads = 0
+        self._writes = 0
+        self._in_transaction = False
+
+    @property
+    def connection(self):
+        """Connection to the storage, opened again in forked processes."""
+        if self._connection is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None)
+            if not self.read_only:
+                # Write-ahead logging lets readers proceed during a write
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.executescript(_sqlite_schema)
+            self._connection, self._pid = conn, os.getpid()
+        return self._connection
+
+    @property
+    def held(self):
+        """Whether a transaction is in progress in this process."""
+        return self._reads > 0 or self._writes > 0
+
+    def close(self):
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def _begin(self, write):
+        try:
+            self.connection.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+        except sqlite3.OperationalError as e:
+            raise lk.LockTimeoutError(
+                'Timed out waiting for a write transaction on {0}: {1}'
+                .format(self.path, str(e)))
+        self._in_transaction = True
+
+    def commit(self):
+        if self._in_transaction:
+            self._in_transaction = False
+            self.connection.execute('COMMIT')
+
+    def rollback(self):
+        if self._in_transaction:
+            self._in_transaction = False
+            self.connection.execute('ROLLBACK')
+
+    def acquire_read(self, timeout=None):
+        self._reads += 1
+        if self._reads == 1 and self._writes == 0:
+            self._begin(write=False)
+            return True
+        return False
+
+    def acquire_write(self, timeout=None):
+        self._writes += 1
+        if self._writes > 1:
+            return False
+
+        # A read transaction can't write once another process did: start
+        # over with a write transaction, and read the storage again.
+        self.commit()
+        self._begin(write=True)
+        return True
+
+    def release_read(self, release_fn=None):
+        assert self._reads > 0
+        if self._reads > 1 or self._writes > 0:
+            self._reads -= 1
+            return False
+
+        try:
+            return release_fn() if release_fn else True
+        finally:
+            self._reads = 0
+            self.commit()
+
+    def release_write(self, release_fn=None):
+        assert self._writes > 0
+        if self._writes > 1:
+            self._writes -= 1
+            return False
+
+        try:
+            result = release_fn() if release_fn else True
+            self.commit()
+        except BaseException:
+            self.rollback()
+            raise
+        finally:
+            self._writes = 0
+            if self._reads:
+                self._begin(write=False)
+        return result
+
+
+class _SQLiteRecords(object):
+    """Install records of a database stored in SQLite.
+
+    This takes the place of the dictionary of records of a ``Database``,
+    and answers the lookups of its secondary indexes with SQL queries on the
+    indexed columns. Records are read from their rows the first time they
+    are looked up, and their specs are only built when they are accessed.
+    They are kept until another process writes to the storage.
+
+    Records modified by a write transaction are written back to their rows
+    before each query (see ``flush()``), and the transaction is committed
+    by ``commit()``.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.lock = _SQLiteLock(
+            db._sqlite_path, db.db_lock_timeout, read_only=db.is_upstream)
+
+        # Records read or modified since the storage last changed. Records
+        # deleted by the current transaction map to None.
+        self._cache = {}
+
+        # Hashes of the records modified since the last flush, and whether
+        # the current transaction changed the storage at all
+        self._dirty = set()
+        self._changed = False
+
+        # Generation of the storage the cached records were read from
+        self.generation = None
+
+    def execute(self, sql, args=()):
+        return self.lock.connection.execute(sql, args)
+
+    def close(self):
+        self.lock.close()
+
+    def version(self):
+        """Version of the database, or None if the storage is empty."""
+        row = self.execute(
+            "SELECT value FROM metadata WHERE key = 'version'").fetchone()
+        return Version(row[0]) if row else None
+
+    def _stored_generation(self):
+        row = self.execute(
+            "SELECT value FROM metadata WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def refresh(self):
+        """Forget the records read so far if another process wrote to the
+        storage since they were read."""
+        generation = self._stored_generation()
+        if generation != self.generation:
+            self._cache = {}
+            self.generation = generation
+
+    def _load(self, key, record):
+        try:
+            rec_dict = sjson.load(record)
+            rec = InstallRecord.from_dict(None, rec_dict)
+            rec.defer_spec(rec_dict['spec'], functools.partial(
+                self.db._materialize_spec, key, {key: rec_dict}, self))
+        except Exception as e:
+            msg = ("Invalid record in Spack database: "
+                   "hash: %s, cause: %s: %s")
+            msg %= (key, type(e).__name__, str(e))
+            raise CorruptDatabaseError(msg, self.lock.path)
+
+        self._cache[key] = rec
+        return rec
+
+    def get(self, key, default=None):
+        if key in self._cache:
+            rec = self._cache[key]
+        else:
+            row = self.execute(
+                'SELECT record FROM installs WHERE hash = ?', (key,)
+            ).fetchone()
+            rec = self._load(key, row[0]) if row else None
+        return default if rec is None else rec
+
+    def __getitem__(self, key):
+        rec = self.get(key)
+        if rec is None:
+            raise KeyError(key)
+        return rec
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, rec):
+        self._cache[key] = rec
+        self._dirty.add(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._cache[key] = None
+        self._dirty.add(key)
+
+    def touch(self, key):
+        """Mark the record for ``key`` as modified."""
+        self._dirty.add(key)
+
+    def select(self, condition='1', args=()):
+        """Return the sorted hashes of the records whose rows match a SQL
+        condition, reading the records that were not read yet."""
+        self.flush()
+        keys = []
+        for key, record in self.execute(
+                'SELECT hash, record FROM installs WHERE ' + condition +
+                ' ORDER BY hash', args):
+            if key not in self._cache:
+                self._load(key, record)
+            keys.append(key)
+        return keys
+
+    def keys(self):
+        return self.select()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(key, self._cache[key]) for key in self.keys()]
+
+    def values(self):
+        return [self._cache[key] for key in self.keys()]
+
+    def __len__(self):
+        self.flush()
+        return self.execute('SELECT COUNT(*) FROM installs').fetchone()[0]
+
+    def __bool__(self):
+        self.flush()
+        return self.execute(
+            'SELECT 1 FROM installs LIMIT 1').fetchone() is not None
+
+    __nonzero__ = __bool__
+
+    def replace(self, records):
+        """Replace all the records in the storage."""
+        self.execute('DELETE FROM installs')
+        self.execute('DELETE FROM dependencies')
+        self._cache = {}
+        self._dirty = set()
+        self._changed = True
+        for key, rec in records.items():
+            self[key] = rec
+
+    def with_prefix(self, prefix):
+        """Return the sorted hashes starting with ``prefix``."""
+        if not prefix:
+            return self.select()
+        # Hashes with the prefix sort between the prefix and the next string
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return self.select('hash >= ? AND hash < ?', (prefix, upper))
+
+    def dependents(self, key):
+        """Map the hashes of the records depending on ``key`` to the
+        deptypes of their dependency."""
+        self.flush()
+        return dict((dependent, tuple(deptypes.split(',')))
+                    for dependent, deptypes in self.execute(
+                        'SELECT dependent, deptypes FROM dependencies '
+                        'WHERE hash = ?', (key,)))
+
+    def prefix_in_use(self, path):
+        """Whether an installed, non-external record uses ``path``."""
+        for key in self.select('path = ? AND installed = 1', (path,)):
+            rec = self._cache[key]
+            if rec.spec_materialized:
+                external = rec.spec.external
+            else:
+                node = rec._spec_dict[rec.name].get('external') or {}
+                external = node.get('path') or node.get('module')
+            if not external:
+                return True
+        return False
+
+    def flush(self):
+        """Write the records modified since the last flush to their rows,
+        in the current transaction."""
+        for key in sorted(self._dirty):
+            self.execute(
+                'DELETE FROM dependencies WHERE dependent = ?', (key,))
+            rec = self._cache.get(key)
+            if rec is None:
+                self.execute('DELETE FROM installs WHERE hash = ?', (key,))
+                self._cache.pop(key, None)
+                continue
+
+            try:
+                record = json.dumps(
+                    rec.to_dict(include_fields=self.db._record_fields),
+                    separators=(',', ':'))
+            except (TypeError, ValueError) as e:
+                raise sjson.SpackJSONError(
+                    "error writing database:", str(e))
+            self.execute(
+                'INSERT OR REPLACE INTO installs VALUES (?, ?, ?, ?, ?, ?)',
+                (key, rec.name, rec.path, rec.installed, rec.explicit,
+                 record))
+            self.lock.connection.executemany(
+                'INSERT OR REPLACE INTO dependencies VALUES (?, ?, ?)',
+                [(dep_key, key, ','.join(deptypes)) for dep_key, deptypes
+                 in self.db._record_dependencies(rec)])
+
+        self._changed = self._changed or bool(self._dirty)
+        self._dirty = set()
+
+    def commit(self):
+        """Write the modified records and commit the current transaction.
+        Return whether the storage changed."""
+        self.flush()
+        changed = self._changed
+        if changed:
+            self.generation = self._stored_generation() + 1
+            self.execute(
+                "INSERT OR REPLACE INTO metadata VALUES ('generation', ?)",
+                (str(self.generation),))
+            self.execute(
+                "INSERT OR REPLACE INTO metadata VALUES ('version', ?)",
+                (str(_db_version),))
+        self.lock.commit()
+        self._changed = False
+        return changed
+
+    def rollback(self):
+        """Roll back the current transaction, and forget its records."""
+        self.lock.rollback()
+        self._cache = {}
+        self._dirty = set()
+        self._changed = False
+        self.generation = None
+
+
+class _SQLitePrefixes(object):
+    """Install prefixes in use in a database stored in SQLite, in place of
+    the set of installed prefixes of a ``Database``. They are looked up in
+    the rows of the records, so adding and removing prefixes is left to the
+    records themselves."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def __contains__(self, path):
+        return self.records.prefix_in_use(path)
+
+    def add(self, path):
+        pass
+
+    def remove(self, path):
+        pass
+
+
+class _FailureLog(object):
+    """Persistent record of the specs that failed to install.
+
+    Failures are kept in a single file, one JSON object per line. Marking a
+    failure appends its full hash, package name, time and error summary;
+    clearing it appends an entry with the hash alone, and the log is
+    compacted once most of its entries are cleared ones. Clearing all
+    failures removes the file.
+
+    Writers take a lock on a separate lock file. Readers do not lock: the
+    log is parsed again only when it changes on disk, and lines truncated by
+    a crash are skipped.
+
+    Older versions of Spack marked each failure with a file named after the
+    package and full hash in ``legacy_dir``. Until the log exists, those
+    markers are read instead, and they are moved to the log when it is
+    first written.
+    """
+
+    #: Minimum number of entries before the log is compacted
+    compaction_threshold = 64
+
+    def __init__(self, path, lock_path, timeout=None, legacy_dir=None):
+        self.path = path
+        self.legacy_dir = legacy_dir
+        self.lock = lk.Lock(lock_path, default_timeout=timeout,
+                            desc='install failures')
+        self._stamp = None
+        self._failures = {}
+        self._entries = 0
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_ino, st.st_mtime, st.st_size)
+        except OSError:
+            return None
+
+    def failures(self):
+        """Return a dictionary from the full hashes of the failed specs to
+        their entries in the log."""
+        stamp = self._stat()
+        if stamp is None:
+            # Until the log exists, look at the markers of older versions
+            self._stamp = None
+            self._failures, self._entries = self._legacy_failures(), 0
+        elif stamp != self._stamp:
+            self._failures, self._entries = {}, 0
+            self._load()
+            self._stamp = stamp
+        return self._failures
+
+    def _legacy_failures(self):
+        """Return the failures marked by files in the legacy directory."""
+        failures = {}
+        if not self.legacy_dir or not os.path.isdir(self.legacy_dir):
+            return failures
+
+        for marker in os.listdir(self.legacy_dir):
+            name, _, key = marker.rpartition('-')
+            if not name or not key:
+                continue
+            try:
+                mtime = os.stat(os.path.join(self.legacy_dir, marker)).st_mtime
+            except OSError:
+                continue
+            failures[key] = {'hash': key, 'name': name, 'time': mtime,
+                             'error': None}
+        return failures
+
+    def _import_legacy(self):
+        """Move the markers of older versions to a new log, before it is
+        written for the first time. Must be called with the lock held."""
+        if self._stat() is not None:
+            return
+
+        failures = self._legacy_failures()
+        if failures:
+            tmp = '{0}.{1}.temp'.format(self.path, os.getpid())
+            with open(tmp, 'w') as f:
+                for entry in failures.values():
+                    f.write(json.dumps(entry, separators=(',', ':')))
+                    f.write('\n')
+            os.rename(tmp, self.path)
+        if self.legacy_dir and os.path.isdir(self.legacy_dir):
+            shutil.rmtree(self.legacy_dir, ignore_errors=True)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        key = str(entry['hash'])
+                    except (ValueError, TypeError, KeyError):
+                        continue
+                    self._entries += 1
+                    if 'name' in entry:
+                        self._failures[key] = entry
+                    else:
+                        self._failures.pop(key, None)
+        except (IOError, OSError) as e:
+            tty.debug('Unable to read failure log: {0}'.format(e))
+
+    def _append(self, entry):
+        data = (json.dumps(entry, separators=(',', ':')) + '\n').encode()
+        with open(self.path, 'ab+') as f:
+            # Do not merge the entry with a line truncated by a crash
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    data = b'\n' + data
+            f.write(data)
+
+    def add(self, key, name, error=None):
+        """Record a failure for the spec with the given full hash."""
+        summary = str(error).strip().split('\n')[0] if error else None
+        with lk.WriteTransaction(self.lock):
+            self._import_legacy()
+            self._append({'hash': key, 'name': name, 'time': _now(),
+                          'error': summary})
+
+    def remove(self, key):
+        """Clear the failure of the spec with the given full hash.
+
+        Raises KeyError if there is no such failure.
+        """
+        with lk.WriteTransaction(self.lock):
+            self._import_legacy()
+            failures = self.failures()
+            if key not in failures:
+                raise KeyError(key)
+
+            if (self._entries < self.compaction_threshold or
+                    self._entries < 2 * len(failures)):
+                self._append({'hash': key})
+                return
+
+            tmp = '{0}.{1}.temp'.format(self.path, os.getpid())
+            with open(tmp, 'w') as f:
+                for other, entry in failures.items():
+                    if other != key:
+                        f.write(json.dumps(entry, separators=(',', ':')))
+                        f.write('\n')
+            os.rename(tmp, self.path)
+
+    def clear(self):
+        """Clear all the failures."""
+        with lk.WriteTransaction(self.lock):
+            if os.path.exists(self.path):
+                os.remove(self.path)
 
 
 class UpstreamDatabaseLockingError(SpackError):
@@ -5,6 +5,8 @@
 
 """Data structures that represent Spack's dependency relationships.
 """
+from typing import Dict, Tuple  # novm
+
 from six import string_types
 
 import spack.spec
@@ -15,6 +17,12 @@
 #: Default dependency type if none is specified
 default_deptype = ('build', 'link')
 
+#: Bit flag of each dependency type, see ``deptype_mask()``
+deptype_flags = dict((t, 1 << i) for i, t in enumerate(all_deptypes))
+
+#: Memoized masks of canonical deptype tuples
+_deptype_masks = {}  # type: Dict[Tuple[str, ...], int]
+
 
 def deptype_chars(*type_tuples):
     """Create a string representing deptypes for many dependencies.
@@ -63,6 +71,25 @@ def canonical_deptype(deptype):
     raise ValueError('Invalid dependency type: %s' % repr(deptype))
 
 
+def deptype_mask(deptypes):
+    """Return the bitmask of the flags of some dependency types.
+
+    Masks let traversals check whether an edge has any of the requested
+    types with a single ``&``.
+
+    Args:
+        deptypes (tuple): canonical tuple of dependency types, like the
+            ``deptypes`` of a ``DependencySpec``
+    """
+    mask = _deptype_masks.get(deptypes)
+    if mask is None:
+        mask = 0
+        for t in deptypes:
+            mask |= deptype_flags[t]
+        _deptype_masks[deptypes] = mask
+    return mask
+
+
 class Dependency(object):
     """Class representing metadata for a dependency on a package.
 
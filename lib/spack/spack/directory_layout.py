@@ -5,18 +5,23 @@
 
 import errno
 import glob
+import multiprocessing
 import os
 import shutil
 import tempfile
+import time
 from contextlib import contextmanager
 
 import ruamel.yaml as yaml
 
+import llnl.util.tty as tty
 from llnl.util.filesystem import mkdirp
 
 import spack.config
 import spack.hash_types as ht
 import spack.spec
+import spack.util.cpus
+import spack.util.spack_binary as sbinary
 import spack.util.spack_json as sjson
 from spack.error import SpackError
 
@@ -25,6 +30,62 @@
                                '{name}-{version}-{hash}')}
 
 
+#: Below this number of prefixes, spec files are read in a single process,
+#: since starting a pool of workers would cost more than it saves.
+parallel_read_threshold = 64
+
+
+def binary_spec_path(path):
+    """Path of the binary copy of the YAML spec file at ``path``, which is
+    written next to it when ``config:binary_specs`` is set."""
+    return os.path.splitext(path)[0] + '.bin'
+
+
+def _read_binary_spec_data(path):
+    """Load the binary copy of the spec file at ``path``, if there is one
+    this Python can read and it is not older than the spec file, or return
+    None."""
+    binary_path = binary_spec_path(path)
+    try:
+        # The spec file may have been rewritten since, e.g. by a Spack that
+        # does not write binary copies
+        if os.stat(binary_path).st_mtime < os.stat(path).st_mtime:
+            return None
+        with open(binary_path, 'rb') as f:
+            data = f.read()
+        if sbinary.is_binary(data):
+            return sbinary.load(data)
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOENT:
+            tty.debug('Cannot read {0}: {1}'.format(binary_path, e))
+    except Exception as e:
+        # The YAML spec file is always there to fall back to
+        tty.debug('Cannot read {0}: {1}'.format(binary_path, e))
+    return None
+
+
+def _read_spec_data(path):
+    """Load the raw data of a spec file, in a worker process. The binary
+    copy of the file is read instead if there is one.
+
+    Returns a ``(data, error)`` tuple: errors are passed back as strings so
+    they can be reported by the parent process. Missing files, and paths
+    below files, yield ``(None, None)``.
+    """
+    try:
+        data = _read_binary_spec_data(path)
+        if data is not None:
+            return data, None
+        with open(path) as f:
+            return yaml.load(f), None
+    except (IOError, OSError) as e:
+        if e.errno in (errno.ENOENT, errno.ENOTDIR):
+            return None, None
+        return None, str(e)
+    except Exception as e:
+        return None, str(e)
+
+
 def _check_concrete(spec):
     """If the spec is not concrete, raise a ValueError"""
     if not spec.concrete:
@@ -54,7 +115,7 @@ def hidden_file_paths(self):
         """
         raise NotImplementedError()
 
-    def all_specs(self):
+    def all_specs(self, jobs=None):
         """To be implemented by subclasses to traverse all specs for which there is
            a directory within the root.
         """
@@ -240,13 +301,33 @@ def relative_path_for_spec(self, spec):
         return path
 
     def write_spec(self, spec, path):
-        """Write a spec out to a file."""
+        """Write a spec out to a file.
+
+        If ``config:binary_specs`` is set, a binary copy of the file is
+        written next to it as well, see ``binary_spec_path()``. The YAML
+        file is always written, for other readers and other Pythons.
+        """
         _check_concrete(spec)
         with open(path, 'w') as f:
             # The hash the the projection is the DAG hash but we write out the
             # full provenance by full hash so it's availabe if we want it later
             spec.to_yaml(f, hash=ht.full_hash)
 
+        binary_path = binary_spec_path(path)
+        if spack.config.get('config:binary_specs'):
+            try:
+                data = spec.to_binary(hash=ht.full_hash)
+            except ValueError as e:
+                tty.debug('Not writing {0}: {1}'.format(binary_path, e))
+            else:
+                with open(binary_path, 'wb') as f:
+                    f.write(data)
+                return
+
+        # Don't leave a binary copy of an older spec around
+        if os.path.exists(binary_path):
+            os.remove(binary_path)
+
     def write_host_environment(self, spec):
         """The host environment is a json file with os, kernel, and spack
         versioning. We use it in the case that an analysis later needs to
@@ -259,10 +340,15 @@ def write_host_environment(self, spec):
             sjson.dump(environ, fd)
 
     def read_spec(self, path):
-        """Read the contents of a file and parse them as a spec"""
+        """Read the contents of a file and parse them as a spec. The binary
+        copy of the file is read instead if there is one."""
         try:
-            with open(path) as f:
-                spec = spack.spec.Spec.from_yaml(f)
+            data = _read_binary_spec_data(path)
+            if data is not None:
+                spec = spack.spec.Spec.from_dict(data)
+            else:
+                with open(path) as f:
+                    spec = spack.spec.Spec.from_yaml(f)
         except Exception as e:
             if spack.config.get('config:debug'):
                 raise
@@ -273,6 +359,21 @@ def read_spec(self, path):
         spec._mark_concrete()
         return spec
 
+    def _spec_from_data(self, path, data, error):
+        """Build a spec from data loaded by ``_read_spec_data()``"""
+        try:
+            if error is not None:
+                raise SpackError(error)
+            spec = spack.spec.Spec.from_dict(data)
+        except Exception as e:
+            if spack.config.get('config:debug'):
+                raise
+            raise SpecReadError(
+                'Unable to read file: %s' % path, 'Cause: ' + str(e))
+
+        spec._mark_concrete()
+        return spec
+
     def spec_file_path(self, spec):
         """Gets full path to spec file"""
         _check_concrete(spec)
@@ -375,19 +476,68 @@ def check_installed(self, spec):
             raise InconsistentInstallDirectoryError(
                 'Spec file in %s does not match hash!' % spec_file_path)
 
-    def all_specs(self):
+    def all_specs(self, jobs=None):
+        """Read the specs of all the prefixes in this layout.
+
+        Prefixes are listed serially, while their spec files are checked
+        and parsed by a pool of ``jobs`` processes (one per available CPU
+        by default). Specs are returned in the order of their spec file
+        paths, regardless of the number of jobs.
+        """
         if not os.path.isdir(self.root):
             return []
 
-        specs = []
+        candidates = set()
         for _, path_scheme in self.projections.items():
             path_elems = ["*"] * len(path_scheme.split(os.sep))
-            path_elems += [self.metadata_dir, self.spec_file_name]
             pattern = os.path.join(self.root, *path_elems)
-            spec_files = glob.glob(pattern)
-            specs.extend([self.read_spec(s) for s in spec_files])
+            candidates.update(
+                os.path.join(prefix, self.metadata_dir, self.spec_file_name)
+                for prefix in glob.glob(pattern) if os.path.isdir(prefix))
+        candidates = sorted(candidates)
+
+        if jobs is None:
+            jobs = spack.util.cpus.cpus_available()
+        jobs = min(jobs, len(candidates))
+
+        start = time.time()
+        if jobs > 1 and len(candidates) >= parallel_read_threshold:
+            results = self._read_spec_data_in_parallel(candidates, jobs)
+        else:
+            jobs = 1
+            results = (_read_spec_data(path) for path in candidates)
+
+        # Installed specs share most of their dependencies
+        specs = []
+        with spack.spec.interned_nodes():
+            for path, (data, error) in zip(candidates, results):
+                if data is None and error is None:
+                    continue
+                specs.append(self._spec_from_data(path, data, error))
+
+        tty.debug('Read {0} spec files from {1} with {2} job(s) in {3:.2f}s'
+                  .format(len(specs), self.root, jobs, time.time() - start))
         return specs
 
+    def _read_spec_data_in_parallel(self, paths, jobs):
+        """Load the spec files at ``paths`` with a pool of ``jobs`` workers,
+        reporting progress as they complete."""
+        pool = multiprocessing.Pool(jobs)
+        try:
+            chunksize = max(1, len(paths) // (jobs * 8))
+            results = []
+            step = max(1, len(paths) // 10)
+            for i, result in enumerate(
+                    pool.imap(_read_spec_data, paths, chunksize), 1):
+                results.append(result)
+                if i % step == 0 or i == len(paths):
+                    tty.msg('Read {0}/{1} spec files'.format(i, len(paths)))
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        return results
+
     def all_deprecated_specs(self):
         if not os.path.isdir(self.root):
             return []
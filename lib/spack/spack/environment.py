@@ -4,10 +4,13 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import collections
 import copy
+import errno
+import multiprocessing
 import os
 import re
 import shutil
 import sys
+import time
 
 import ruamel.yaml as yaml
 import six
@@ -27,11 +30,14 @@
 import spack.spec
 import spack.stage
 import spack.store
+import spack.subprocess_context
 import spack.user_environment as uenv
+import spack.util.cpus
 import spack.util.environment
 import spack.util.hash
 import spack.util.lock as lk
 import spack.util.path
+import spack.util.spack_binary as sbinary
 import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 from spack.filesystem_view import YamlFilesystemView
@@ -48,6 +54,12 @@
 _active_environment = None
 
 
+#: Below this number of user specs to concretize separately, specs are
+#: concretized in a single process, since starting a pool of workers would
+#: cost more than it saves.
+parallel_concretization_threshold = 4
+
+
 #: path where environments are stored in the spack tree
 env_path = os.path.join(spack.paths.var_path, 'environments')
 
@@ -762,8 +774,13 @@ def _read(self):
                 self._read_manifest(f)
 
         if os.path.exists(self.lock_path):
-            with open(self.lock_path) as f:
-                read_lock_version = self._read_lockfile(f)
+            lockfile_dict = self._read_binary_lockfile()
+            if lockfile_dict is not None:
+                self._read_lockfile_dict(lockfile_dict)
+                read_lock_version = lockfile_dict['_meta']['lockfile-version']
+            else:
+                with open(self.lock_path) as f:
+                    read_lock_version = self._read_lockfile(f)
             if default_manifest:
                 # No manifest, set user specs from lockfile
                 self._set_user_specs_from_lockfile()
@@ -907,6 +924,12 @@ def lock_path(self):
         """Path to spack.lock file in this environment."""
         return os.path.join(self.path, lockfile_name)
 
+    @property
+    def _binary_lock_path(self):
+        """Path to the binary copy of spack.lock, which is written next to
+        it when ``config:binary_specs`` is set."""
+        return self.lock_path + '.bin'
+
     @property
     def _lock_backup_v1_path(self):
         """Path to backup of v1 lockfile before conversion to v2"""
@@ -1179,7 +1202,7 @@ def undevelop(self, spec):
             return True
         return False
 
-    def concretize(self, force=False, tests=False):
+    def concretize(self, force=False, tests=False, jobs=None):
         """Concretize user_specs in this environment.
 
         Only concretizes specs that haven't been concretized yet unless
@@ -1193,6 +1216,9 @@ def concretize(self, force=False, tests=False):
                already concretized
             tests (bool or list or set): False to run no tests, True to test
                 all packages, or a list of package names to run tests for some
+            jobs (int): maximum number of processes used to concretize specs
+                separately; defaults to ``config:concretize_jobs``, or to the
+                number of cores available
 
         Returns:
             List of specs that have been concretized. Each entry is a tuple of
@@ -1208,7 +1234,7 @@ def concretize(self, force=False, tests=False):
         if self.concretization == 'together':
             return self._concretize_together(tests=tests)
         if self.concretization == 'separately':
-            return self._concretize_separately(tests=tests)
+            return self._concretize_separately(tests=tests, jobs=jobs)
 
         msg = 'concretization strategy not implemented [{0}]'
         raise SpackEnvironmentError(msg.format(self.concretization))
@@ -1252,7 +1278,7 @@ def _concretize_together(self, tests=False):
             self._add_concrete_spec(abstract, concrete)
         return concretized_specs
 
-    def _concretize_separately(self, tests=False):
+    def _concretize_separately(self, tests=False, jobs=None):
         """Concretization strategy that concretizes separately one
         user spec after the other.
         """
@@ -1271,13 +1297,34 @@ def _concretize_separately(self, tests=False):
                 self._add_concrete_spec(s, concrete, new=False)
 
         # Concretize any new user specs that we haven't concretized yet
-        concretized_specs = []
+        new_user_specs, new_constraints = [], []
         for uspec, uspec_constraints in zip(
                 self.user_specs, self.user_specs.specs_as_constraints):
             if uspec not in old_concretized_user_specs:
-                concrete = _concretize_from_constraints(uspec_constraints, tests=tests)
-                self._add_concrete_spec(uspec, concrete)
-                concretized_specs.append((uspec, concrete))
+                new_user_specs.append(uspec)
+                new_constraints.append(uspec_constraints)
+
+        if jobs is None:
+            jobs = spack.config.get('config:concretize_jobs')
+        if jobs is None:
+            jobs = spack.util.cpus.cpus_available()
+        jobs = min(jobs, len(new_user_specs))
+        threshold = parallel_concretization_threshold
+        if jobs > 1 and len(new_user_specs) >= threshold:
+            concrete_specs = _concretize_in_parallel(
+                new_constraints, tests, jobs)
+        else:
+            concrete_specs = [
+                _concretize_from_constraints(uspec_constraints, tests=tests)
+                for uspec_constraints in new_constraints
+            ]
+
+        # Results are added in the order of the user specs, however they
+        # were concretized
+        concretized_specs = []
+        for uspec, concrete in zip(new_user_specs, concrete_specs):
+            self._add_concrete_spec(uspec, concrete)
+            concretized_specs.append((uspec, concrete))
         return concretized_specs
 
     def concretize_and_add(self, user_spec, concrete_spec=None, tests=False):
@@ -1794,6 +1841,48 @@ def _to_lockfile_dict(self):
 
         return data
 
+    def _write_lockfile(self, lockfile_dict):
+        """Write the lockfile in JSON and, if ``config:binary_specs`` is set,
+        a binary copy of it next to it, see ``_binary_lock_path``."""
+        with fs.write_tmp_and_move(self.lock_path) as f:
+            sjson.dump(lockfile_dict, stream=f)
+
+        binary_path = self._binary_lock_path
+        if spack.config.get('config:binary_specs'):
+            try:
+                data = sbinary.dump(lockfile_dict)
+            except ValueError as e:
+                tty.debug('Not writing {0}: {1}'.format(binary_path, e))
+            else:
+                with fs.write_tmp_and_move(binary_path, mode='wb') as f:
+                    f.write(data)
+                return
+
+        # Don't leave a binary copy of an older lockfile around
+        if os.path.exists(binary_path):
+            os.remove(binary_path)
+
+    def _read_binary_lockfile(self):
+        """Load the binary copy of the lockfile, if there is one this Python
+        can read and it is not older than the lockfile, or return None."""
+        binary_path = self._binary_lock_path
+        try:
+            # The lockfile may have been replaced since, e.g. by a checkout
+            if (os.stat(binary_path).st_mtime <
+                    os.stat(self.lock_path).st_mtime):
+                return None
+            with open(binary_path, 'rb') as f:
+                data = f.read()
+            if sbinary.is_binary(data):
+                return sbinary.load(data)
+        except (IOError, OSError) as e:
+            if e.errno != errno.ENOENT:
+                tty.debug('Cannot read {0}: {1}'.format(binary_path, e))
+        except Exception as e:
+            # The JSON lockfile is always there to fall back to
+            tty.debug('Cannot read {0}: {1}'.format(binary_path, e))
+        return None
+
     def _read_lockfile(self, file_or_json):
         """Read a lockfile from a file or from a raw string."""
         lockfile_dict = sjson.load(file_or_json)
@@ -1886,11 +1975,10 @@ def write(self, regenerate=True):
                     spack.repo.path.dump_provenance(dep, pkg_dir)
 
             # write the lock file last
-            with fs.write_tmp_and_move(self.lock_path) as f:
-                sjson.dump(self._to_lockfile_dict(), stream=f)
+            self._write_lockfile(self._to_lockfile_dict())
             self._update_and_write_manifest(raw_yaml_dict, yaml_dict)
         else:
-            with fs.safe_remove(self.lock_path):
+            with fs.safe_remove(self.lock_path, self._binary_lock_path):
                 self._update_and_write_manifest(raw_yaml_dict, yaml_dict)
 
         # TODO: rethink where this needs to happen along with
@@ -2099,6 +2187,77 @@ def _concretize_from_constraints(spec_constraints, tests=False):
             invalid_constraints.extend(inv_variant_constraints)
 
 
+def _init_concretization_worker(state, env):
+    """Restore the configuration, repositories and active environment of
+    the parent process in a concretization worker."""
+    global _active_environment
+    state.restore()
+    _active_environment = env
+
+
+def _concretize_task(args):
+    """Concretize a user spec in a worker process.
+
+    Returns a ``(index, data, elapsed, error)`` tuple, where ``data`` is the
+    spec file data of the concrete spec. Errors are passed back as strings,
+    since not every error can be sent back to the parent process.
+    """
+    index, spec_constraints, tests = args
+    start = time.time()
+    try:
+        concrete = _concretize_from_constraints(spec_constraints, tests=tests)
+        data = concrete.to_dict(hash=ht.process_hash)
+        return index, data, time.time() - start, None
+    except Exception as e:
+        return index, None, time.time() - start, str(e)
+
+
+def _concretize_in_parallel(constraints, tests, jobs):
+    """Concretize the user specs with the given constraints with a pool of
+    ``jobs`` workers, reporting the time spent on each of them.
+
+    The state of Spack is sent to the workers once, when they start. User
+    specs that fail to concretize in a worker are concretized again in this
+    process, to report the error.
+
+    Returns:
+        list: the concrete specs, in the order of ``constraints``
+    """
+    tasks = [(i, c, tests) for i, c in enumerate(constraints)]
+    results = [None] * len(tasks)
+
+    pool = multiprocessing.Pool(
+        jobs, initializer=_init_concretization_worker,
+        initargs=(spack.subprocess_context.TestState(), _active_environment))
+    try:
+        start = time.time()
+        for n, (i, data, elapsed, error) in enumerate(
+                pool.imap_unordered(_concretize_task, tasks), 1):
+            results[i] = data
+            name = [c for c in constraints[i] if c.name][0].name
+            status = 'Failed to concretize' if error else 'Concretized'
+            tty.msg('[{0}/{1}] {2} {3} in {4:.2f}s'.format(
+                n, len(tasks), status, name, elapsed))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    tty.debug('Concretized {0} specs with {1} jobs in {2:.2f}s'.format(
+        len(tasks), jobs, time.time() - start))
+
+    def read(spec_constraints, data):
+        if data is None:
+            return _concretize_from_constraints(spec_constraints, tests=tests)
+        return Spec.from_dict(data)
+
+    # Nodes can't be shared between specs with test dependencies, since
+    # these are not part of the hashes identifying the nodes
+    if tests:
+        return [read(c, d) for c, d in zip(constraints, results)]
+    with spack.spec.interned_nodes():
+        return [read(c, d) for c, d in zip(constraints, results)]
+
+
 def make_repo_path(root):
     """Make a RepoPath from the repo subdirectories in an environment."""
     path = spack.repo.RepoPath()
@@ -49,3 +49,11 @@ def __init__(self, deptype=('link', 'run'), package_hash=False, attr=None,
 package_hash = SpecHashDescriptor(
     deptype=(), package_hash=True, attr='_package_hash',
     override=lambda s: s.package.content_hash())
+
+
+#: Hash descriptor used only to send a DAG, with all of its dependency types,
+#: to another process. It is never stored: dependencies are referred to by
+#: their DAG hash, which is all that is needed to read the DAG back.
+process_hash = SpecHashDescriptor(
+    deptype=('build', 'link', 'run', 'test'), package_hash=False,
+    override=lambda s: s.dag_hash())
@@ -722,11 +722,13 @@ def _add_init_task(self, pkg, request, is_compiler, all_deps):
 
         self._push_task(task)
 
-    def _check_db(self, spec):
+    def _check_db(self, spec, records=None):
         """Determine if the spec is flagged as installed in the database
 
         Args:
             spec (Spec): spec whose database install status is being checked
+            records (dict or None): records already looked up with
+                ``Database.query_by_hashes()`` for this spec, if any
 
         Return:
             (rec, installed_in_db) tuple where rec is the database record, or
@@ -734,6 +736,13 @@ def _check_db(self, spec):
                 ``True`` if the spec is considered installed and ``False``
                 otherwise
         """
+        if records is not None:
+            # Hashes that were looked up and not found are not in any database
+            if spec.dag_hash() not in records:
+                return None, False
+            _, rec = records[spec.dag_hash()]
+            return rec, rec.installed
+
         try:
             rec = spack.store.db.get_record(spec)
             installed_in_db = rec.installed if rec else False
@@ -751,6 +760,7 @@ def _check_deps_status(self, request):
             request (BuildRequest): the associated install request
         """
         err = 'Cannot proceed with {0}: {1}'
+        locked = []
         for dep in request.traverse_dependencies():
             dep_pkg = dep.package
             dep_id = package_id(dep_pkg)
@@ -775,15 +785,21 @@ def _check_deps_status(self, request):
                 self._flag_installed(dep_pkg)
                 continue
 
-            # Check the database to see if the dependency has been installed
-            # and flag as such if appropriate
-            rec, installed_in_db = self._check_db(dep)
+            locked.append(dep)
+
+        # Check the database to see if the dependencies have been installed
+        # and flag them as such if appropriate. The records are read once all
+        # the dependencies are locked, so that no concurrent install or
+        # uninstall can change their status in between.
+        records = spack.store.db.query_by_hashes(d.dag_hash() for d in locked)
+        for dep in locked:
+            rec, installed_in_db = self._check_db(dep, records)
             if installed_in_db and (
                     dep.dag_hash() not in request.overwrite or
                     rec.installation_time > request.overwrite_time):
                 tty.debug('Flagging {0} as installed per the database'
-                          .format(dep_id))
-                self._flag_installed(dep_pkg)
+                          .format(package_id(dep.package)))
+                self._flag_installed(dep.package)
 
     def _prepare_for_install(self, task):
         """
@@ -1335,7 +1351,8 @@ def _update_failed(self, task, mark=False, exc=None):
         err = '' if exc is None else ': {0}'.format(str(exc))
         tty.debug('Flagging {0} as failed{1}'.format(pkg_id, err))
         if mark:
-            self.failed[pkg_id] = spack.store.db.mark_failed(task.pkg.spec)
+            self.failed[pkg_id] = spack.store.db.mark_failed(
+                task.pkg.spec, exc)
         else:
             self.failed[pkg_id] = None
         task.status = STATUS_FAILED
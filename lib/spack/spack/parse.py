@@ -3,7 +3,6 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
-import itertools
 import re
 import shlex
 import sys
@@ -89,11 +88,25 @@ def lex(self, text):
         return lexed
 
 
+#: Characters that shlex treats specially when splitting words
+_shlex_chars = re.compile(r'[\'"\\]')
+
+#: Whitespace that separates words in shlex
+_shlex_whitespace = re.compile(r'[ \t\r\n]+')
+
+
+def split_words(text):
+    """Same as ``shlex.split(text)``, but faster when nothing is quoted."""
+    if _shlex_chars.search(text):
+        return shlex.split(text)
+    return [word for word in _shlex_whitespace.split(text) if word]
+
+
 class Parser(object):
     """Base class for simple recursive descent parsers."""
 
     def __init__(self, lexer):
-        self.tokens = iter([])    # iterators over tokens, handled in order.
+        self.tokens = []          # stack of tokens to read, last one first.
         self.token = Token(None)  # last accepted token
         self.next = None          # next token
         self.lexer = lexer
@@ -101,20 +114,18 @@ def __init__(self, lexer):
 
     def gettok(self):
         """Puts the next token in the input stream into self.next."""
-        try:
-            self.next = next(self.tokens)
-        except StopIteration:
-            self.next = None
+        self.next = self.tokens.pop() if self.tokens else None
 
     def push_tokens(self, iterable):
         """Adds all tokens in some iterable to the token stream."""
-        self.tokens = itertools.chain(
-            iter(iterable), iter([self.next]), self.tokens)
+        if self.next is not None:
+            self.tokens.append(self.next)
+        self.tokens.extend(reversed(list(iterable)))
         self.gettok()
 
     def accept(self, id):
         """Put the next symbol in self.token if accepted, then call gettok()"""
-        if self.next and self.next.is_a(id):
+        if self.next is not None and self.next.type == id:
             self.token = self.next
             self.gettok()
             return True
@@ -144,7 +155,7 @@ def expect(self, id):
 
     def setup(self, text):
         if isinstance(text, string_types):
-            text = shlex.split(str(text))
+            text = split_words(str(text))
         self.text = text
         self.push_tokens(self.lexer.lex(text))
 
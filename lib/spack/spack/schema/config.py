@@ -90,7 +90,20 @@
                 'type': 'string',
                 'enum': ['original', 'clingo']
             },
+            'solver_cache': {'type': 'boolean'},
+            'solver_cache_size': {'type': 'integer', 'minimum': 1},
+            'solver_reuse': {'type': 'boolean'},
+            'concretize_jobs': {'type': 'integer', 'minimum': 1},
             'db_lock_timeout': {'type': 'integer', 'minimum': 1},
+            'db_journal': {'type': 'boolean'},
+            'db_journal_threshold': {'type': 'integer', 'minimum': 1},
+            'db_lazy_specs': {'type': 'boolean'},
+            'db_snapshot': {'type': 'boolean'},
+            'binary_specs': {'type': 'boolean'},
+            'db_storage': {
+                'type': 'string',
+                'enum': ['json', 'sqlite']
+            },
             'package_lock_timeout': {
                 'anyOf': [
                     {'type': 'integer', 'minimum': 1},
@@ -52,6 +52,7 @@
                     },
                 },
                 'version': {'type': 'string'},
+                'journal_sequence': {'type': 'integer', 'minimum': 0},
             }
         },
     },
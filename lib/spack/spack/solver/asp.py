@@ -6,12 +6,16 @@
 
 import collections
 import copy
+import hashlib
 import itertools
+import json
 import os
 import pprint
+import shutil
 import sys
 import types
 import warnings
+from typing import Any, Dict, Tuple  # novm
 
 from six import string_types
 
@@ -31,17 +35,24 @@
 
 import spack
 import spack.architecture
+import spack.binary_distribution
 import spack.bootstrap
+import spack.caches
 import spack.cmd
 import spack.compilers
 import spack.config
 import spack.dependency
 import spack.directives
 import spack.error
+import spack.hash_types as ht
 import spack.package
 import spack.package_prefs
+import spack.paths
 import spack.repo
 import spack.spec
+import spack.store
+import spack.util.spack_binary as sbinary
+import spack.util.spack_json as sjson
 import spack.util.timer
 import spack.variant
 import spack.version
@@ -309,7 +320,7 @@ def fact(self, head):
 
     def solve(
             self, solver_setup, specs, dump=None, nmodels=0,
-            timers=False, stats=False, tests=False
+            timers=False, stats=False, tests=False, reuse=None
     ):
         timer = spack.util.timer.Timer()
 
@@ -326,7 +337,7 @@ def solve(
         self.assumptions = []
         with self.control.backend() as backend:
             self.backend = backend
-            solver_setup.setup(self, specs, tests=tests)
+            solver_setup.setup(self, specs, tests=tests, reuse=reuse)
         timer.phase("setup")
 
         # read in the main ASP program and display logic -- these are
@@ -372,7 +383,7 @@ def stringify(x):
 
         if result.satisfiable:
             # build spec from the best model
-            builder = SpecBuilder(specs)
+            builder = SpecBuilder(specs, solver_setup.reusable_specs)
             min_cost, best_model = min(models)
             tuples = [
                 (sym.name, [stringify(a) for a in sym.arguments])
@@ -417,6 +428,64 @@ def stringify(x):
         return result
 
 
+class _ConditionId(int):
+    """Id of a condition in a block of cached package facts.
+
+    Ids in a block start from zero, and are shifted by the first free id
+    when the block is replayed.
+    """
+
+
+#: Facts generated from the directives of a package, with the number of
+#: conditions they define and the constraints recorded while generating them
+_PackageFacts = collections.namedtuple('_PackageFacts', [
+    'facts', 'conditions', 'version_constraints', 'target_constraints',
+    'compiler_version_constraints', 'variant_values_from_specs'
+])
+
+#: Blocks of package facts used in this process, by cache key
+_package_facts = {}  # type: Dict[str, _PackageFacts]
+
+#: Content hashes of source files, by path and modification time
+_source_hashes = {}  # type: Dict[Tuple[str, float], str]
+
+
+def _source_hash(path):
+    """Return the content hash of a source file."""
+    key = (path, os.stat(path).st_mtime)
+    if key not in _source_hashes:
+        with open(path, 'rb') as f:
+            _source_hashes[key] = hashlib.sha256(f.read()).hexdigest()
+    return _source_hashes[key]
+
+
+def _package_facts_cache_key(pkg):
+    """Return the misc cache key of the facts of a package."""
+    return 'solver/facts/{0}.bin'.format(pkg.name)
+
+
+def _fact_arg(arg):
+    """Return the plain value of a fact argument: the solver only sees
+    booleans, numbers and strings, so everything else becomes a string."""
+    if isinstance(arg, (bool, int)):
+        return arg
+    return str(arg)
+
+
+class _FactRecorder(object):
+    """Stand-in for the solver driver that records the facts it gets."""
+
+    def __init__(self):
+        self.facts = []
+
+    def fact(self, head):
+        self.facts.append(
+            (head.name, tuple(_fact_arg(arg) for arg in head.args)))
+
+    def newline(self):
+        self.facts.append(None)
+
+
 class SpackSolverSetup(object):
     """Class to set up and run a Spack concretization solve."""
 
@@ -434,11 +503,15 @@ def __init__(self):
         self.compiler_version_constraints = set()
         self.post_facts = []
 
+        # concrete specs that can be reused, by DAG hash
+        self.reusable_specs = {}
+
         # id for dummy variables
         self._condition_id_counter = itertools.count()
 
         # Caches to optimize the setup phase of the solver
         self.target_specs_cache = None
+        self._facts_key = None
 
     def pkg_version_rules(self, pkg):
         """Output declared versions of a package.
@@ -612,7 +685,216 @@ def pkg_rules(self, pkg, tests):
         self.pkg_version_rules(pkg)
         self.gen.newline()
 
-        # variants
+        # variants, conflicts, virtuals and dependencies
+        self.package_directive_rules(pkg, tests)
+
+        # default compilers for this package
+        self.package_compiler_defaults(pkg)
+
+        # virtual preferences
+        self.virtual_preferences(
+            pkg.name,
+            lambda v, p, i: self.gen.fact(
+                fn.pkg_provider_preference(pkg.name, v, p, i)
+            )
+        )
+
+    def package_directive_rules(self, pkg, tests):
+        """Output the facts derived from the directives of a package.
+
+        These facts only depend on the package, on the configuration and on
+        the repositories, so they are generated once and then replayed from
+        a cache, in memory and in the misc cache. They are not cached when
+        some repository is not backed by files, like mock repositories.
+        """
+        tests = tests is True or (
+            not isinstance(tests, bool) and pkg.name in tests)
+        key = self.package_facts_key(pkg, tests)
+
+        block = None if key is None else _package_facts.get(key)
+        if block is None and key is not None:
+            block = self._read_package_facts(pkg, key)
+        if block is None:
+            block = self._record_package_facts(pkg, tests)
+            if key is not None:
+                self._write_package_facts(pkg, key, block)
+        if key is not None:
+            _package_facts[key] = block
+
+        # Condition ids in the block start from zero
+        offset = next(self._condition_id_counter)
+        self._condition_id_counter = itertools.count(offset + block.conditions)
+        for entry in block.facts:
+            if entry is None:
+                self.gen.newline()
+                continue
+            name, args = entry
+            args = [offset + arg if type(arg) is _ConditionId else arg
+                    for arg in args]
+            self.gen.fact(AspFunction(name, args))
+
+        self.version_constraints.update(block.version_constraints)
+        self.target_constraints.update(block.target_constraints)
+        self.compiler_version_constraints.update(
+            block.compiler_version_constraints)
+        self.variant_values_from_specs.update(block.variant_values_from_specs)
+
+    def package_facts_key(self, pkg, tests):
+        """Return the key of the cached directive facts of a package.
+
+        The key hashes the source files defining the package class and its
+        bases, whether test dependencies are considered, and the state of
+        Spack, its repositories and the configuration the facts depend on.
+        Returns None if some repository has no root directory, since its
+        packages are not defined by their own source files.
+        """
+        roots = [getattr(repo, 'root', None)
+                 for repo in spack.repo.path.repos]
+        if not all(roots):
+            return None
+
+        if self._facts_key is None:
+            state = {
+                'spack': str(spack.spack_version),
+                'repos': roots,
+                'virtuals': sorted(spack.repo.path.provider_index.providers),
+                'packages': spack.config.get('packages'),
+                'compilers': spack.config.get('compilers'),
+                # The code generating the facts, and the rules reading them
+                'solver': [
+                    _source_hash(os.path.join(os.path.dirname(__file__), name))
+                    for name in ('asp.py', 'concretize.lp', 'display.lp')
+                ] + [_source_hash(
+                    os.path.join(spack.paths.module_path, 'directives.py'))],
+            }
+            self._facts_key = hashlib.sha256(json.dumps(
+                state, sort_keys=True, default=str).encode('utf-8')
+            ).hexdigest()
+
+        sha = hashlib.sha256(self._facts_key.encode('utf-8'))
+        sha.update(str(tests).encode('utf-8'))
+        pkg_cls = pkg if isinstance(pkg, type) else type(pkg)
+        for cls in pkg_cls.__mro__:
+            module = sys.modules.get(cls.__module__)
+            path = getattr(module, '__file__', None)
+            if path and os.path.exists(path):
+                sha.update(_source_hash(path).encode('utf-8'))
+        return sha.hexdigest()
+
+    def _record_package_facts(self, pkg, tests):
+        """Generate the directive facts of a package into a new block."""
+        saved = (
+            self.gen, self._condition_id_counter, self.version_constraints,
+            self.target_constraints, self.compiler_version_constraints,
+            self.variant_values_from_specs
+        )
+        ids = itertools.count()
+        recorder = _FactRecorder()
+        self.gen = recorder
+        self._condition_id_counter = (_ConditionId(i) for i in ids)
+        self.version_constraints = set()
+        self.target_constraints = set()
+        self.compiler_version_constraints = set()
+        self.variant_values_from_specs = set()
+        try:
+            self.variant_rules(pkg)
+            self.conflict_rules(pkg)
+            self.package_provider_rules(pkg)
+            self.package_dependencies_rules(pkg, tests)
+            return _PackageFacts(
+                recorder.facts, next(ids), self.version_constraints,
+                self.target_constraints, self.compiler_version_constraints,
+                self.variant_values_from_specs
+            )
+        finally:
+            (self.gen, self._condition_id_counter, self.version_constraints,
+             self.target_constraints, self.compiler_version_constraints,
+             self.variant_values_from_specs) = saved
+
+    def _read_package_facts(self, pkg, key):
+        """Return the block of facts of a package in the misc cache, or None
+        if it is missing or was stored for another key.
+
+        Blocks are stored as plain data, see ``_write_package_facts()``, and
+        the constraints they record are parsed again here.
+        """
+        cache = spack.caches.misc_cache
+        cache_key = _package_facts_cache_key(pkg)
+        try:
+            if not cache.init_entry(cache_key):
+                return None
+            with cache.read_transaction(cache_key, binary=True) as f:
+                data = sbinary.load(f)
+            if data['key'] != key:
+                return None
+
+            facts = []
+            for entry in data['facts']:
+                if entry is None:
+                    facts.append(None)
+                    continue
+                name, args, ids = entry
+                args = [_ConditionId(arg) if i in ids else arg
+                        for i, arg in enumerate(args)]
+                facts.append((name, tuple(args)))
+
+            return _PackageFacts(
+                facts, data['conditions'],
+                set((name, spack.version.VersionList(versions))
+                    for name, versions in data['version_constraints']),
+                set((name, spack.architecture.Target(target))
+                    for name, target in data['target_constraints']),
+                set((name, spack.spec.CompilerSpec(compiler))
+                    for name, compiler
+                    in data['compiler_version_constraints']),
+                set(tuple(v) for v in data['variant_values_from_specs'])
+            )
+        except Exception as e:
+            tty.debug('Unable to read facts of {0}: {1}'.format(pkg.name, e))
+            return None
+
+    def _write_package_facts(self, pkg, key, block):
+        """Store the block of facts of a package in the misc cache.
+
+        Only plain data is stored: positions of condition ids are listed
+        with each fact, and constraints are stored as strings.
+        """
+        facts = []
+        for entry in block.facts:
+            if entry is None:
+                facts.append(None)
+                continue
+            name, args = entry
+            ids = [i for i, arg in enumerate(args)
+                   if type(arg) is _ConditionId]
+            facts.append([name, [int(arg) if i in ids else arg
+                                 for i, arg in enumerate(args)], ids])
+
+        def strings(constraints):
+            return [[name, str(c)] for name, c in constraints]
+
+        data = {
+            'key': key,
+            'facts': facts,
+            'conditions': block.conditions,
+            'version_constraints': strings(block.version_constraints),
+            'target_constraints': strings(block.target_constraints),
+            'compiler_version_constraints': strings(
+                block.compiler_version_constraints),
+            'variant_values_from_specs': [
+                list(v) for v in block.variant_values_from_specs],
+        }
+
+        cache = spack.caches.misc_cache
+        cache_key = _package_facts_cache_key(pkg)
+        try:
+            cache.init_entry(cache_key)
+            with cache.write_transaction(cache_key, binary=True) as (old, new):
+                sbinary.dump(data, new)
+        except Exception as e:
+            tty.debug('Unable to write facts of {0}: {1}'.format(pkg.name, e))
+
+    def variant_rules(self, pkg):
         for name, variant in sorted(pkg.variants.items()):
             self.gen.fact(fn.variant(pkg.name, name))
 
@@ -655,26 +937,6 @@ def pkg_rules(self, pkg, tests):
 
             self.gen.newline()
 
-        # conflicts
-        self.conflict_rules(pkg)
-
-        # default compilers for this package
-        self.package_compiler_defaults(pkg)
-
-        # virtuals
-        self.package_provider_rules(pkg)
-
-        # dependencies
-        self.package_dependencies_rules(pkg, tests)
-
-        # virtual preferences
-        self.virtual_preferences(
-            pkg.name,
-            lambda v, p, i: self.gen.fact(
-                fn.pkg_provider_preference(pkg.name, v, p, i)
-            )
-        )
-
     def condition(self, required_spec, imposed_spec=None, name=None):
         """Generate facts for a dependency or virtual provider condition.
 
@@ -1340,7 +1602,174 @@ def define_variant_values(self):
         for pkg, variant, value in sorted(self.variant_values_from_specs):
             self.gen.fact(fn.variant_possible_value(pkg, variant, value))
 
-    def setup(self, driver, specs, tests=False):
+    def possible_packages(self, specs, reuse=None):
+        """Return the names of the packages that can be nodes of the DAG of
+        some of the input specs, and set ``self.possible_virtuals`` to the
+        virtuals they can depend on.
+
+        This is like ``spack.package.possible_dependencies()``, except that
+        dependencies are not followed when they can't be part of the solve:
+
+        1. conditional dependencies whose condition contradicts what the
+           input specs require of the dependent,
+        2. providers of a virtual that can't provide the virtual with the
+           constraints the input specs and the dependent impose on it,
+        3. packages that are not buildable and have no externals, and
+           dependencies of packages that are not buildable, since their
+           nodes can only be externals. Concrete specs that can be reused
+           are nodes too, so packages that are not buildable are kept if
+           they are in ``reuse``, along with the dependencies they have
+           there.
+
+        Arguments:
+            specs (list): input specs of the solve
+            reuse (list): concrete specs the solve can reuse, if any
+        """
+        self.possible_virtuals = set(x.name for x in specs if x.virtual)
+
+        # Dependencies of the nodes that can be reused, by package
+        reused = {}
+        for spec in reuse or ():
+            for node in spec.traverse():
+                reused.setdefault(node.name, set()).update(
+                    dep.name for dep in node.dependencies())
+
+        # Constraints of the input specs on each node
+        constraints = {}
+        for spec in specs:
+            for node in spec.traverse():
+                try:
+                    constraint = constraints.setdefault(
+                        node.name, spack.spec.Spec(node.name))
+                    constraint.constrain(node.copy(deps=False))
+                except spack.error.UnsatisfiableSpecError:
+                    # Leave it to the solver to report the error
+                    constraints[node.name] = spack.spec.Spec(node.name)
+
+        def compatible(name, spec):
+            constraint = constraints.get(name)
+            if constraint is None:
+                return True
+            # Variants are checked strictly against anonymous specs
+            if not spec.name:
+                spec = spec.copy(deps=False)
+                spec.name = name
+            return constraint.satisfies(spec, deps=False)
+
+        packages_yaml = _normalize_packages_yaml(spack.config.get('packages'))
+
+        def buildable(name):
+            return packages_yaml.get(name, {}).get('buildable', True)
+
+        def has_externals(name):
+            return bool(packages_yaml.get(name, {}).get('externals'))
+
+        def providers(vspec):
+            vspec = vspec.copy(deps=False)
+            try:
+                vspec.constrain(
+                    constraints.get(vspec.name, spack.spec.Spec(vspec.name)))
+            except spack.error.UnsatisfiableSpecError:
+                return []
+            return [p.name for p in spack.repo.path.providers_for(vspec)
+                    if compatible(p.name, p)]
+
+        stack = []
+        for spec in specs:
+            if spec.virtual:
+                stack.extend(providers(spec))
+            else:
+                stack.append(spec.name)
+        roots = set(stack)
+
+        possible = set()
+        while stack:
+            name = stack.pop()
+            if name in possible:
+                continue
+            if not buildable(name):
+                if name in roots or has_externals(name) or name in reused:
+                    possible.add(name)
+                stack.extend(reused.get(name, ()))
+                continue
+            possible.add(name)
+
+            try:
+                pkg_cls = spack.repo.path.get_pkg_class(name)
+            except spack.repo.UnknownPackageError:
+                continue
+
+            for dep_name, conditions in pkg_cls.dependencies.items():
+                deps = [dep for when, dep in conditions.items()
+                        if compatible(name, when)]
+                if not deps:
+                    continue
+
+                if spack.repo.path.is_virtual(dep_name):
+                    self.possible_virtuals.add(dep_name)
+                    for dep in deps:
+                        stack.extend(providers(dep.spec))
+                else:
+                    stack.append(dep_name)
+
+        return possible
+
+    def define_reusable_specs(self, reuse, possible):
+        """Declare the nodes of concrete specs that the solve can reuse.
+
+        Each node is declared with its DAG hash, and reusing the hash
+        imposes the attributes of the node, its dependencies and their
+        hashes. Specs with nodes that can't be part of the solve are not
+        declared. Versions that packages don't declare anymore are declared
+        as the least preferred ones, and can only be reused.
+
+        Arguments:
+            reuse (list): concrete specs to declare
+            possible (set): names of the packages that can be in the solve
+        """
+        # Packages developed in the environment are always built
+        env = spack.environment.get_env(None, None)
+        develop = env.dev_specs if env else {}
+
+        def reusable(node):
+            return (node.name in possible and node.name not in develop and
+                    'dev_path' not in node.variants)
+
+        for spec in reuse:
+            if not all(reusable(node) for node in spec.traverse()):
+                continue
+
+            for node in spec.traverse():
+                node_hash = node.dag_hash()
+                if node_hash in self.reusable_specs:
+                    continue
+                self.reusable_specs[node_hash] = node
+
+                self.gen.fact(fn.installed_hash(node.name, node_hash))
+                clauses = self.spec_clauses(node, body=True, transitive=False)
+                for dspec in sorted(node.dependencies_dict().values(),
+                                    key=lambda d: d.spec.name):
+                    dep = dspec.spec
+                    clauses.append(fn.hash(dep.name, dep.dag_hash()))
+                    for t in sorted(dspec.deptypes):
+                        clauses.append(fn.depends_on(node.name, dep.name, t))
+
+                for clause in clauses:
+                    # the node and its concreteness are implied by the hash
+                    if clause.name in ('node', 'concrete'):
+                        continue
+                    self.gen.fact(fn.imposed_constraint(
+                        node_hash, clause.name, *clause.args))
+
+                versions = self.possible_versions[node.name]
+                if node.version not in versions:
+                    self.gen.fact(fn.version_declared(
+                        node.name, node.version, len(versions)))
+                    self.gen.fact(fn.reusable_version(node.name, node.version))
+                    versions.add(node.version)
+                self.gen.newline()
+
+    def setup(self, driver, specs, tests=False, reuse=None):
         """Generate an ASP program with relevant constraints for specs.
 
         This calls methods on the solve driver to set up the problem with
@@ -1349,22 +1778,18 @@ def setup(self, driver, specs, tests=False):
 
         Arguments:
             specs (list): list of Specs to solve
+            reuse (list): concrete specs that the solve should reuse
+                wherever possible, or None not to reuse any spec
 
         """
         self._condition_id_counter = itertools.count()
+        self.reusable_specs = {}
 
         # preliminary checks
         check_packages_exist(specs)
 
         # get list of all possible dependencies
-        self.possible_virtuals = set(
-            x.name for x in specs if x.virtual
-        )
-        possible = spack.package.possible_dependencies(
-            *specs,
-            virtuals=self.possible_virtuals,
-            deptype=spack.dependency.all_deptypes
-        )
+        possible = self.possible_packages(specs, reuse)
         pkgs = set(possible)
 
         # driver is used by all the functions below to add facts and
@@ -1401,6 +1826,11 @@ def setup(self, driver, specs, tests=False):
             self.preferred_targets(pkg)
             self.preferred_versions(pkg)
 
+        if reuse is not None:
+            self.gen.h1('Reusable Specs')
+            self.gen.fact(fn.optimize_for_reuse())
+            self.define_reusable_specs(reuse, possible)
+
         # Inject dev_path from environment
         env = spack.environment.get_env(None, None)
         if env:
@@ -1439,12 +1869,20 @@ def setup(self, driver, specs, tests=False):
 
 class SpecBuilder(object):
     """Class with actions to rebuild a spec from ASP results."""
-    def __init__(self, specs):
+    def __init__(self, specs, reusable_specs=None):
         self._result = None
         self._command_line_specs = specs
+        self._reusable_specs = reusable_specs or {}
         self._flag_sources = collections.defaultdict(lambda: set())
         self._flag_compiler_defaults = set()
 
+    def hash(self, pkg, h):
+        # Reused nodes keep their cached hashes, and get their dependencies
+        # back from depends_on()
+        if pkg not in self._specs:
+            self._specs[pkg] = self._reusable_specs[h].copy(
+                deps=False, caches=True)
+
     def node(self, pkg):
         if pkg not in self._specs:
             self._specs[pkg] = spack.spec.Spec(pkg)
@@ -1586,6 +2024,7 @@ def build_specs(self, function_tuples):
         # them here so that directives that build objects (like node and
         # node_compiler) are called in the right order.
         function_tuples.sort(key=lambda f: {
+            "hash": -3,
             "node": -2,
             "node_compiler": -1,
         }.get(f[0], 0))
@@ -1608,11 +2047,18 @@ def build_specs(self, function_tuples):
             if spack.repo.path.is_virtual(pkg):
                 continue
 
+            # reused nodes are already complete, except for their edges
+            spec = self._specs.get(pkg)
+            if spec is not None and spec.concrete and name != 'depends_on':
+                continue
+
             action(*args)
 
         # namespace assignment is done after the fact, as it is not
         # currently part of the solve
         for spec in self._specs.values():
+            if spec.concrete:
+                continue
             repo = spack.repo.path.repo_for_pkg(spec)
             spec.namespace = repo.namespace
 
@@ -1644,6 +2090,121 @@ def build_specs(self, function_tuples):
         return self._specs
 
 
+def clear_solver_cache():
+    """Remove the cached package facts and solve results."""
+    _package_facts.clear()
+    shutil.rmtree(spack.caches.misc_cache.cache_path('solver'),
+                  ignore_errors=True)
+
+
+class _SolveCache(object):
+    """Results of earlier solves, cached in the misc cache.
+
+    Results are keyed on the input specs, on the specs they can reuse, on
+    the configuration, on the repositories and on the state of Spack itself.
+    Only the ``config:solver_cache_size`` most recently used results are
+    kept.
+    """
+
+    def __init__(self, specs, tests, reuse=None):
+        self.tests = tests
+        env = spack.environment.get_env(None, None)
+        state = {
+            'specs': [str(spec) for spec in specs],
+            'tests': tests,
+            'reuse': None if reuse is None else sorted(
+                spec.dag_hash() for spec in reuse),
+            'develop': env.dev_specs if env else {},
+            'config': dict(
+                (section, spack.config.get(section))
+                for section in ('compilers', 'packages', 'repos')
+            ),
+            'repos': [
+                (repo.root, repo.last_mtime(), len(repo.all_package_names()))
+                for repo in spack.repo.path.repos
+            ],
+            'arch': str(spack.architecture.default_arch()),
+            'spack': str(spack.spack_version),
+            'solver': [
+                _source_hash(os.path.join(os.path.dirname(__file__), name))
+                for name in ('asp.py', 'concretize.lp', 'display.lp')
+            ],
+        }
+        sha = hashlib.sha256(json.dumps(
+            state, sort_keys=True, default=str).encode('utf-8'))
+        self.key = 'solver/results/{0}.json'.format(sha.hexdigest())
+
+    def load(self, specs):
+        """Return the cached result of the solve, or None if there is no
+        result for it."""
+        cache = spack.caches.misc_cache
+        try:
+            if not cache.init_entry(self.key):
+                return None
+            with cache.read_transaction(self.key) as f:
+                data = sjson.load(f)
+
+            # Test dependencies are not part of the hashes identifying
+            # the nodes, so nodes with test dependencies aren't shared
+            if self.tests:
+                roots = [spack.spec.Spec.from_dict(d) for d in data['specs']]
+            else:
+                with spack.spec.interned_nodes():
+                    roots = [
+                        spack.spec.Spec.from_dict(d) for d in data['specs']]
+            # Mark the result as recently used
+            os.utime(cache.cache_path(self.key), None)
+        except Exception as e:
+            tty.debug('Unable to read cached solve: {0}'.format(e))
+            return None
+
+        answer = dict(
+            (node.name, node) for root in roots for node in root.traverse())
+        result = Result(specs)
+        result.satisfiable = True
+        result.answers.append((data['opt'], 0, answer))
+        result.criteria = data['criteria']
+        result.nmodels = data['nmodels']
+        return result
+
+    def save(self, result):
+        """Cache the result of a satisfiable solve."""
+        opt, _, answer = min(result.answers)
+        roots = sorted(
+            (spec for spec in answer.values() if not spec.dependents()),
+            key=lambda spec: spec.name)
+        data = {
+            'specs': [spec.to_dict(hash=ht.process_hash) for spec in roots],
+            'opt': list(opt),
+            'criteria': result.criteria,
+            'nmodels': result.nmodels,
+        }
+
+        cache = spack.caches.misc_cache
+        try:
+            cache.init_entry(self.key)
+            with cache.write_transaction(self.key) as (old, new):
+                sjson.dump(data, new)
+            self._evict()
+        except Exception as e:
+            tty.debug('Unable to cache solve: {0}'.format(e))
+
+    def _evict(self):
+        """Remove the least recently used results beyond the cache size."""
+        cache = spack.caches.misc_cache
+        size = spack.config.get('config:solver_cache_size', 256)
+        root = os.path.dirname(cache.cache_path(self.key))
+        entries = [name for name in os.listdir(root)
+                   if name.endswith('.json')]
+        if len(entries) <= size:
+            return
+
+        entries.sort(
+            key=lambda name: os.stat(os.path.join(root, name)).st_mtime)
+        for name in entries[:len(entries) - size]:
+            cache.remove('solver/results/{0}'.format(name))
+
+
 def _develop_specs_from_env(spec, env):
     dev_info = env.dev_specs.get(spec.name, {}) if env else {}
     if not dev_info:
@@ -1660,21 +2221,45 @@ def _develop_specs_from_env(spec, env):
     spec.constrain(dev_info['spec'])
 
 
+#: Specs that solves can reuse, with the state of the store and of the build
+#: cache indices they were computed from
+_reusable = (None, None)  # type: Tuple[Any, Any]
+
+
+def _reusable_specs():
+    """Return the specs installed in the store and the specs in the build
+    caches of the configured mirrors.
+
+    The specs are computed once per process, and again only when the store
+    or the build cache index of a mirror changed since.
+    """
+    global _reusable
+    binary_index = spack.binary_distribution.binary_index
+    binary_index.update()
+    state = (spack.store.db.root, spack.store.db.index_stamp(),
+             sorted(binary_index.index_hashes().items()))
+    if _reusable[0] != state:
+        with spack.store.db.read_transaction():
+            reusable = spack.store.db.query(installed=True)
+        reusable.extend(binary_index.get_all_built_specs())
+        _reusable = (state, reusable)
+    return _reusable[1]
+
+
 #
 # These are handwritten parts for the Spack ASP model.
 #
-def solve(specs, dump=(), models=0, timers=False, stats=False, tests=False):
+def solve(specs, dump=(), models=0, timers=False, stats=False, tests=False,
+          reuse=None):
     """Solve for a stable model of specs.
 
     Arguments:
         specs (list): list of Specs to solve.
         dump (tuple): what to dump
         models (int): number of models to search (default: 0)
+        reuse (bool): whether to reuse installed and cached specs (default:
+            ``config:solver_reuse``)
     """
-    driver = PyclingoDriver()
-    if "asp" in dump:
-        driver.out = sys.stdout
-
     # Check upfront that the variants are admissible
     for root in specs:
         for s in root.traverse():
@@ -1682,5 +2267,26 @@ def solve(specs, dump=(), models=0, timers=False, stats=False, tests=False):
                 continue
             spack.spec.Spec.ensure_valid_variants(s)
 
+    if reuse is None:
+        reuse = spack.config.get('config:solver_reuse', False)
+    reusable = _reusable_specs() if reuse else None
+
+    # Solves that are inspected are never taken from the cache
+    cache = None
+    if (spack.config.get('config:solver_cache', False) and
+            "asp" not in dump and not timers and not stats):
+        cache = _SolveCache(specs, tests, reusable)
+        result = cache.load(specs)
+        if result is not None:
+            return result
+
+    driver = PyclingoDriver()
+    if "asp" in dump:
+        driver.out = sys.stdout
+
     setup = SpackSolverSetup()
-    return driver.solve(setup, specs, dump, models, timers, stats, tests)
+    result = driver.solve(
+        setup, specs, dump, models, timers, stats, tests, reusable)
+    if cache and result.satisfiable:
+        cache.save(result)
+    return result
@@ -77,11 +77,13 @@
 expansion when it is the first character in an id typed on the command line.
 """
 import collections
+import contextlib
 import itertools
 import operator
 import os
 import re
 import sys
+from typing import Dict, Optional  # novm
 
 import ruamel.yaml as yaml
 import six
@@ -109,6 +111,7 @@
 import spack.util.hash
 import spack.util.module_cmd as md
 import spack.util.prefix
+import spack.util.spack_binary as sbinary
 import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 import spack.util.string
@@ -181,6 +184,83 @@
 default_format += '{variants}{arch=architecture}'
 
 
+#: Sub-objects shared by the concrete nodes read by ``Spec.from_node_dict()``,
+#: keyed by their serialized form. Concrete specs are not modified in place,
+#: and copying a spec copies them, so one instance can serve every node.
+#: Only the most recently used ones are kept.
+_interned_versions = lang.LRUCache(16384)
+_interned_archs = lang.LRUCache(1024)
+_interned_compilers = lang.LRUCache(1024)
+
+
+#: Concrete nodes read by ``Spec.from_dict()`` in an ``interned_nodes()``
+#: context, keyed by ``_node_key()``. None outside of such a context.
+_interned_nodes = None  # type: Optional[Dict[tuple, Spec]]
+
+
+@contextlib.contextmanager
+def interned_nodes():
+    """Share the concrete nodes read by ``Spec.from_dict()`` in this context.
+
+    Specs read from many spec files, like the ones of an install tree or of
+    a build cache, have most of their dependencies in common. In this
+    context, a node with the same hashes as a node read before is not read
+    again: the spec reuses the node read before, with its dependencies.
+
+    Shared nodes have the dependents of every spec that reuses them, so the
+    specs read in this context should not be modified.
+    """
+    global _interned_nodes
+    if _interned_nodes is not None:
+        yield
+        return
+
+    _interned_nodes = {}
+    try:
+        yield
+    finally:
+        _interned_nodes = None
+
+
+def _node_key(node):
+    """Key of a node dict in ``_interned_nodes``, or None if it can't be
+    shared. Build and full hashes are part of the key, since nodes with the
+    same DAG hash can have different build dependencies."""
+    name = next(iter(node))
+    node = node[name]
+    if not node.get('concrete', True) or not node.get('hash'):
+        return None
+    return (node['hash'], node.get('build_hash'), node.get('full_hash'))
+
+
+def _intern(value):
+    """Intern a string, or the strings in a list, read from a spec file."""
+    if isinstance(value, str):
+        return six.moves.intern(value)
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
+
+
+def _intern_node_field(table, key, make):
+    """Return the object stored in ``table`` for ``key``, calling ``make()``
+    to create it the first time."""
+    obj = table.get(key)
+    if obj is None:
+        obj = table[key] = make()
+    return obj
+
+
+def _arch_key(arch):
+    """Key of the ``arch`` field of a spec node in ``_interned_archs``."""
+    if not isinstance(arch, dict):
+        return arch
+    target = arch['target']
+    if isinstance(target, dict):
+        target = target['name']
+    return arch['platform'], arch.get('platform_os') or arch['os'], target
+
+
 def colorize_spec(spec):
     """Returns a spec colorized according to the colors specified in
        color_formats."""
@@ -203,6 +283,8 @@ def __call__(self, match):
 
 @lang.lazy_lexicographic_ordering
 class ArchSpec(object):
+    __slots__ = ('_platform', '_os', '_target')
+
     def __init__(self, spec_or_platform_tuple=(None, None, None)):
         """ Architecture specification a package should be built with.
 
@@ -539,6 +621,7 @@ class CompilerSpec(object):
     """The CompilerSpec field represents the compiler or range of compiler
        versions that a package should be built with.  CompilerSpecs have a
        name and a version list. """
+    __slots__ = ('name', 'versions')
 
     def __init__(self, *args):
         nargs = len(args)
@@ -664,6 +747,7 @@ class DependencySpec(object):
     - parent: Spec that depends on `spec`.
     - deptypes: list of strings, representing dependency relationships.
     """
+    __slots__ = ('parent', 'spec', 'deptypes')
 
     def __init__(self, parent, spec, deptypes):
         self.parent = parent
@@ -703,6 +787,7 @@ def __str__(self):
 
 
 class FlagMap(lang.HashableMap):
+    __slots__ = ('spec',)
 
     def __init__(self, spec):
         super(FlagMap, self).__init__()
@@ -744,8 +829,7 @@ def valid_compiler_flags():
 
     def copy(self):
         clone = FlagMap(None)
-        for name, value in self.items():
-            clone[name] = value
+        clone.dict.update(self.dict)
         return clone
 
     def _cmp_iter(self):
@@ -770,6 +854,7 @@ def __str__(self):
 class DependencyMap(lang.HashableMap):
     """Each spec has a DependencyMap containing specs for its dependencies.
        The DependencyMap is keyed by name. """
+    __slots__ = ()
 
     def __str__(self):
         return "{deps: %s}" % ', '.join(str(d) for d in sorted(self.values()))
@@ -1027,8 +1112,17 @@ def __init__(self, spec, name, query_parameters):
 @lang.lazy_lexicographic_ordering(set_hash=False)
 class Spec(object):
 
-    #: Cache for spec's prefix, computed lazily in the corresponding property
-    _prefix = None
+    # Specs are the most numerous objects in large DAGs and databases, so
+    # their fields are slots. Packages may still attach other attributes
+    # (e.g. ``spec.mpicc``), which go in a ``__dict__`` created on demand.
+    __slots__ = (
+        'name', 'versions', 'variants', 'architecture', 'compiler',
+        'compiler_flags', '_dependents', '_dependencies', 'namespace',
+        '_hash', '_build_hash', '_full_hash', '_package_hash', '_dunder_hash',
+        '_package', '_normal', '_concrete', 'external_path',
+        'external_modules', '_hashes_final', 'extra_attributes',
+        '_build_spec', '_prefix', '__dict__'
+    )
 
     def __init__(self, spec_like=None, normal=False,
                  concrete=False, external_path=None, external_modules=None):
@@ -1047,6 +1141,10 @@ def __init__(self, spec_like=None, normal=False,
         self.external_module = external_module
         """
 
+        #: Cache for spec's prefix, computed lazily in the corresponding
+        #: property
+        self._prefix = None
+
         # Copy if spec_like is a Spec.
         if isinstance(spec_like, Spec):
             self._dup(spec_like)
@@ -1101,15 +1199,62 @@ def __init__(self, spec_like=None, normal=False,
         self._build_spec = None
 
         if isinstance(spec_like, six.string_types):
-            spec_list = SpecParser(self).parse(spec_like)
-            if len(spec_list) > 1:
-                raise ValueError("More than one spec in string: " + spec_like)
-            if len(spec_list) < 1:
-                raise ValueError("String contains no specs: " + spec_like)
+            defaults = not (normal or concrete or external_path or
+                            external_modules)
+            if not (defaults and self._dup_parsed(spec_like)):
+                spec_list = SpecParser(self).parse(spec_like)
+                if len(spec_list) > 1:
+                    raise ValueError(
+                        "More than one spec in string: " + spec_like)
+                if len(spec_list) < 1:
+                    raise ValueError("String contains no specs: " + spec_like)
+                if defaults:
+                    self._cache_parsed(spec_like)
 
         elif spec_like is not None:
             raise TypeError("Can't make spec out of %s" % type(spec_like))
 
+    def _dup_parsed(self, string):
+        """Copy into this spec the spec previously parsed from ``string``.
+
+        Returns:
+            True if the string was found in the parse cache, False otherwise
+        """
+        cached = _parsed_specs.get(string)
+        if cached is None:
+            return False
+
+        # Architectures are completed using the current platform
+        platform, parsed = cached
+        current_platform = spack.architecture.platform()
+        if platform is not None and platform is not current_platform:
+            return False
+
+        self._dup(parsed)
+        return True
+
+    def _cache_parsed(self, string):
+        """Store a copy of this spec, just parsed from ``string``."""
+        # Hashes and spec files refer to installations, which may change
+        if '/' in string:
+            return
+
+        # Only pay for a copy when the same string is parsed again
+        if string not in _parsed_specs:
+            _parsed_specs[string] = None
+            return
+
+        # Copies match nodes by name, so they need distinct names, which
+        # e.g. an anonymous spec with an anonymous dependency doesn't have
+        nodes = list(self.traverse())
+        if len(set(s.name for s in nodes)) != len(nodes):
+            return
+
+        platform = None
+        if any(s.architecture for s in nodes):
+            platform = spack.architecture.platform()
+        _parsed_specs[string] = (platform, self.copy())
+
     @staticmethod
     def _format_module_list(modules):
         """Return a module list that is suitable for YAML serialization
@@ -1341,7 +1486,7 @@ def traverse_edges(self, visited=None, d=0, deptype='all',
         """Generic traversal of the DAG represented by this spec.
            This will yield each node in the spec.  Options:
 
-           order    [=pre|post]
+           order    [=pre|post|breadth]
                Order to traverse spec nodes. Defaults to preorder traversal.
                Options are:
 
@@ -1349,6 +1494,9 @@ def traverse_edges(self, visited=None, d=0, deptype='all',
                        children in the dependency DAG.
                'post': Post-order  traversal; each node is yielded after its
                        children in the dependency DAG.
+               'breadth': Breadth-first traversal; nodes are yielded by
+                       increasing depth, so with 'nodes' cover each node
+                       is yielded at its minimum depth.
 
            cover    [=nodes|edges|paths]
                Determines how extensively to cover the dag.  Possible values:
@@ -1389,16 +1537,6 @@ def traverse_edges(self, visited=None, d=0, deptype='all',
         direction = kwargs.get('direction', 'children')
         order = kwargs.get('order', 'pre')
 
-        # we don't want to run canonical_deptype every time through
-        # traverse, because it is somewhat expensive. This ensures we
-        # canonicalize only once.
-        canonical_deptype = kwargs.get("canonical_deptype", None)
-        if canonical_deptype is None:
-            deptype = dp.canonical_deptype(deptype)
-            kwargs["canonical_deptype"] = deptype
-        else:
-            deptype = canonical_deptype
-
         # Make sure kwargs have legal values; raise ValueError if not.
         def validate(name, val, allowed_values):
             if val not in allowed_values:
@@ -1406,57 +1544,90 @@ def validate(name, val, allowed_values):
                                  % (name, val, ",".join(allowed_values)))
         validate('cover',     cover,     ('nodes', 'edges', 'paths'))
         validate('direction', direction, ('children', 'parents'))
-        validate('order',     order,     ('pre', 'post'))
+        validate('order',     order,     ('pre', 'post', 'breadth'))
+
+        # Edges are filtered by intersecting the bitmasks of their types
+        deptype = kwargs.get('canonical_deptype') or \
+            dp.canonical_deptype(deptype)
+        mask = dp.deptype_mask(deptype)
+        deptype_mask = dp.deptype_mask
 
         if visited is None:
             visited = set()
-        key = key_fun(self)
-
-        # Node traversal does not yield visited nodes.
-        if key in visited and cover == 'nodes':
-            return
+        skip_visited = cover == 'nodes'
+        expand_visited = cover == 'paths'
+        children = direction == 'children'
+
+        def successors(spec, d):
+            where = spec._dependencies if children else spec._dependents
+            for name in sorted(where):
+                dspec = where[name]
+                flags = deptype_mask(dspec.deptypes)
+                if flags and not flags & mask:
+                    continue
+                yield dspec.spec if children else dspec.parent, d, dspec
 
-        def return_val(dspec):
+        def return_val(spec, d, dspec):
             if not dspec:
                 # make a fake dspec for the root.
-                if direction == 'parents':
-                    dspec = DependencySpec(self, None, ())
+                if children:
+                    dspec = DependencySpec(None, spec, ())
                 else:
-                    dspec = DependencySpec(None, self, ())
+                    dspec = DependencySpec(spec, None, ())
             return (d, dspec) if depth else dspec
 
-        yield_me = yield_root or d > 0
-
-        # Preorder traversal yields before successors
-        if yield_me and order == 'pre':
-            yield return_val(dep_spec)
-
-        # Edge traversal yields but skips children of visited nodes
-        if not (key in visited and cover == 'edges'):
-            visited.add(key)
-
-            # This code determines direction and yields the children/parents
-            if direction == 'children':
-                where = self._dependencies
-                succ = lambda dspec: dspec.spec
-            elif direction == 'parents':
-                where = self._dependents
-                succ = lambda dspec: dspec.parent
-            else:
-                raise ValueError('Invalid traversal direction: %s' % direction)
-
-            for name, dspec in sorted(where.items()):
-                dt = dspec.deptypes
-                if dt and not any(d in deptype for d in dt):
+        if order == 'breadth':
+            queue = collections.deque([(self, d, dep_spec)])
+            while queue:
+                spec, sd, dspec = queue.popleft()
+                key = key_fun(spec)
+                if skip_visited and key in visited:
                     continue
+                if yield_root or sd > 0:
+                    yield return_val(spec, sd, dspec)
+                if key in visited and not expand_visited:
+                    continue
+                visited.add(key)
+                queue.extend(successors(spec, sd + 1))
+            return
 
-                for child in succ(dspec).traverse_edges(
-                        visited, d + 1, deptype, dspec, **kwargs):
-                    yield child
+        # Depth-first traversals keep the successors still to be visited
+        # for each node on the current path in a stack
+        pre, post = order == 'pre', order == 'post'
+        stack = []
+        node = (self, d, dep_spec)
+        while True:
+            if node is not None:
+                spec, sd, dspec = node
+                node = None
+                key = key_fun(spec)
+
+                # Node traversal does not yield visited nodes.
+                if not (skip_visited and key in visited):
+                    yield_me = yield_root or sd > 0
+                    if yield_me and pre:
+                        yield return_val(spec, sd, dspec)
+
+                    # Edge traversal yields but skips children of visited
+                    # nodes
+                    if key in visited and not expand_visited:
+                        if yield_me and post:
+                            yield return_val(spec, sd, dspec)
+                    else:
+                        visited.add(key)
+                        stack.append((spec, sd, dspec,
+                                      successors(spec, sd + 1)))
+
+            if not stack:
+                return
 
-        # Postorder traversal yields after successors
-        if yield_me and order == 'post':
-            yield return_val(dep_spec)
+            spec, sd, dspec, todo = stack[-1]
+            node = next(todo, None)
+            if node is None:
+                stack.pop()
+                # Postorder traversal yields after successors
+                if post and (yield_root or sd > 0):
+                    yield return_val(spec, sd, dspec)
 
     @property
     def short_spec(self):
@@ -1502,7 +1673,7 @@ def _spec_hash(self, hash):
         if hash.override is not None:
             return hash.override(self)
         node_dict = self.to_node_dict(hash=hash)
-        yaml_text = syaml.dump(node_dict, default_flow_style=True)
+        yaml_text = syaml.dump_flow(node_dict)
         return spack.util.hash.b32_hash(yaml_text)
 
     def _cached_hash(self, hash, length=None):
@@ -1815,14 +1986,26 @@ def to_yaml(self, stream=None, hash=ht.dag_hash):
     def to_json(self, stream=None, hash=ht.dag_hash):
         return sjson.dump(self.to_dict(hash), stream)
 
+    def to_binary(self, stream=None, hash=ht.dag_hash):
+        """Encode this spec with ``spack.util.spack_binary``.
+
+        Raises:
+            ValueError: if the spec has attributes that can't be encoded
+        """
+        return sbinary.dump(self.to_dict(hash), stream)
+
     @staticmethod
     def from_node_dict(node):
         name = next(iter(node))
         node = node[name]
 
+        # Concrete nodes share their names, versions, architecture and
+        # compiler with the other nodes read in (see _intern_node_field)
+        concrete = node.get('concrete', True)
+
         spec = Spec()
-        spec.name = name
-        spec.namespace = node.get('namespace', None)
+        spec.name = _intern(name)
+        spec.namespace = _intern(node.get('namespace', None))
         spec._hash = node.get('hash', None)
         spec._build_hash = node.get('build_hash', None)
         spec._full_hash = node.get('full_hash', None)
@@ -1830,17 +2013,32 @@ def from_node_dict(node):
 
         if 'version' in node or 'versions' in node:
             spec.versions = vn.VersionList.from_dict(node)
+            if concrete:
+                spec.versions.versions = [
+                    _intern_node_field(_interned_versions, (type(v), str(v)),
+                                       lambda: v)
+                    for v in spec.versions.versions]
 
         if 'arch' in node:
-            spec.architecture = ArchSpec.from_dict(node)
+            if concrete:
+                spec.architecture = _intern_node_field(
+                    _interned_archs, _arch_key(node['arch']),
+                    lambda: ArchSpec.from_dict(node))
+            else:
+                spec.architecture = ArchSpec.from_dict(node)
 
         if 'compiler' in node:
             spec.compiler = CompilerSpec.from_dict(node)
+            if concrete:
+                spec.compiler = _intern_node_field(
+                    _interned_compilers, str(spec.compiler),
+                    lambda: spec.compiler)
         else:
             spec.compiler = None
 
         if 'parameters' in node:
             for name, value in node['parameters'].items():
+                name, value = _intern(name), _intern(value)
                 if name in _valid_compiler_flags:
                     spec.compiler_flags[name] = value
                 else:
@@ -1848,6 +2046,7 @@ def from_node_dict(node):
                         name, value)
         elif 'variants' in node:
             for name, value in node['variants'].items():
+                name, value = _intern(name), _intern(value)
                 spec.variants[name] = vt.MultiValuedVariant.from_node_dict(
                     name, value
                 )
@@ -1871,7 +2070,7 @@ def from_node_dict(node):
                 )
 
         # specs read in are concrete unless marked abstract
-        spec._concrete = node.get('concrete', True)
+        spec._concrete = concrete
 
         # this spec may have been built with older packages than we have
         # on-hand, and we may not have the build dependencies, so mark it
@@ -2087,24 +2286,33 @@ def from_dict(data):
         nodes = data['spec']
 
         # Read nodes out of list.  Root spec is the first element;
-        # dependencies are the following elements.
-        dep_list = [Spec.from_node_dict(node) for node in nodes]
+        # dependencies are the following elements.  In an interned_nodes()
+        # context, nodes read before are reused with their dependencies.
+        interned = _interned_nodes
+        keys = [interned is not None and _node_key(node) for node in nodes]
+        reused = [bool(key) and key in interned for key in keys]
+        dep_list = [interned[key] if shared else Spec.from_node_dict(node)
+                    for node, key, shared in zip(nodes, keys, reused)]
         if not dep_list:
             raise spack.error.SpecError("YAML spec contains no nodes.")
         deps = dict((spec.name, spec) for spec in dep_list)
         spec = dep_list[0]
 
-        for node in nodes:
+        for node, shared in zip(nodes, reused):
             # get dependency dict from the node.
             name = next(iter(node))
 
-            if 'dependencies' not in node[name]:
+            if shared or 'dependencies' not in node[name]:
                 continue
 
             yaml_deps = node[name]['dependencies']
             for dname, dhash, dtypes in Spec.read_yaml_dep_specs(yaml_deps):
                 deps[name]._add_dependency(deps[dname], dtypes)
 
+        for key, shared, node_spec in zip(keys, reused, dep_list):
+            if key and not shared:
+                interned[key] = node_spec
+
         return spec
 
     @staticmethod
@@ -2134,6 +2342,15 @@ def from_json(stream):
             tty.debug(e)
             raise sjson.SpackJSONError("error parsing JSON spec:", str(e))
 
+    @staticmethod
+    def from_binary(stream):
+        """Construct a spec from data encoded by ``to_binary()``.
+
+        Parameters:
+        stream -- bytes or binary file object to read from.
+        """
+        return Spec.from_dict(sbinary.load(stream))
+
     @staticmethod
     def from_detection(spec_str, extra_attributes=None):
         """Construct a spec from a spec string determined during external
@@ -2332,7 +2549,6 @@ def feq(cfield, sfield):
                 if spec._dup(replacement, deps=False, cleardeps=False):
                     changed = True
 
-                spec._dependencies.owner = spec
                 self_index.update(spec)
                 done = False
                 break
@@ -2516,12 +2732,10 @@ def ensure_no_deprecated(root):
         Raises:
             SpecDeprecatedError: is any deprecated spec is found
         """
-        deprecated = []
-        with spack.store.db.read_transaction():
-            for x in root.traverse():
-                _, rec = spack.store.db.query_by_spec_hash(x.dag_hash())
-                if rec and rec.deprecated_for:
-                    deprecated.append(rec)
+        hashes = [x.dag_hash() for x in root.traverse()]
+        records = spack.store.db.query_by_hashes(hashes)
+        deprecated = [records[h][1] for h in hashes
+                      if h in records and records[h][1].deprecated_for]
         if deprecated:
             msg = "\n    The following specs have been deprecated"
             msg += " in favor of specs with the hashes shown:\n"
@@ -2579,6 +2793,15 @@ def _mark_root_concrete(self, value=True):
         """Mark just this spec (not dependencies) concrete."""
         if (not value) and self.concrete and self.package.installed:
             return
+        if (not value) and self._concrete:
+            # Abstract specs may be constrained in place: stop sharing
+            # sub-objects with other concrete specs
+            self.versions = self.versions.copy()
+            if self.architecture:
+                self.architecture = self.architecture.copy()
+            if self.compiler:
+                self.compiler = self.compiler.copy()
+            self.variants = self.variants.copy()
         self._normal = value
         self._concrete = value
 
@@ -3190,7 +3413,54 @@ def satisfies(self, other, deps=True, strict=False, strict_deps=False):
 
           * `strict`: strict means that we *must* meet all the
             constraints specified on other.
+
+        Results for concrete specs and constraints on dependencies, which
+        need to traverse both DAGs, are cached.
         """
+        key = self._satisfies_key(other, deps, strict)
+        if key is None:
+            return self._satisfies(other, deps, strict)
+
+        cache = _satisfies_cache()
+        result = cache.get(key)
+        if result is None:
+            result = self._satisfies(other, deps, strict)
+            cache[key] = result
+        return result
+
+    def _satisfies_key(self, other, deps, strict):
+        """Key of the result of ``self.satisfies(other)`` in the cache, or
+        None if the result should not be cached.
+        """
+        if not (deps and self._concrete):
+            return None
+
+        if isinstance(other, six.string_types):
+            # Hashes refer to installations, which may change
+            if '^' not in other or '/' in other:
+                return None
+            constraint = other
+        elif isinstance(other, Spec) and other._dependencies:
+            # The string of a spec misses namespaces and concrete hashes,
+            # and can't be computed with anonymous dependencies
+            nodes = list(other.traverse())
+            if any(s.namespace or s._concrete or not s.name
+                   for s in nodes[1:]) or nodes[0].namespace:
+                return None
+            constraint = str(other)
+        else:
+            return None
+
+        # Constraints on dependencies are checked against build dependencies
+        # too, which the DAG hash doesn't account for
+        fingerprint = self._build_hash
+        if not fingerprint and not self._hashes_final:
+            fingerprint = self.build_hash()
+        elif not fingerprint:
+            fingerprint = tuple(sorted(s.dag_hash() for s in self.traverse()))
+        return fingerprint, constraint, type(other), strict
+
+    def _satisfies(self, other, deps=True, strict=False):
         other = self._autospec(other)
 
         # The only way to satisfy a concrete spec is to match its hash exactly.
@@ -3281,7 +3551,18 @@ def satisfies_dependencies(self, other, strict=False):
             # use list to prevent double-iteration
             selfdeps = list(self.traverse(root=False))
             otherdeps = list(other.traverse(root=False))
-            if not all(any(d.satisfies(dep, strict=True) for d in selfdeps)
+
+            # Nodes of a concrete spec have distinct names, and only the
+            # node with the same name can satisfy a non-virtual dependency
+            by_name = {}
+            if self._concrete:
+                by_name = dict((d.name, [d]) for d in selfdeps)
+                if any(dep.name and dep.name not in by_name and
+                       not dep.virtual for dep in otherdeps):
+                    return False
+
+            if not all(any(d.satisfies(dep, strict=True)
+                           for d in by_name.get(dep.name, selfdeps))
                        for dep in otherdeps):
                 return False
 
@@ -3393,28 +3674,38 @@ def _dup(self, other, deps=True, cleardeps=True, caches=None):
                        self.compiler_flags != other.compiler_flags)
 
         self._package = None
+        self._prefix = None
 
-        # Local node attributes get copied first.
+        # Local node attributes get copied first. Concrete specs are not
+        # modified in place, so copies of a concrete spec share its
+        # versions, architecture, compiler and variants, until they are
+        # marked abstract (see _mark_root_concrete).
+        shared = other._concrete
         self.name = other.name
-        self.versions = other.versions.copy()
-        self.architecture = other.architecture.copy() if other.architecture \
-            else None
-        self.compiler = other.compiler.copy() if other.compiler else None
+        self.versions = other.versions if shared else other.versions.copy()
+        self.architecture = other.architecture
+        if other.architecture and not shared:
+            self.architecture = other.architecture.copy()
+        self.compiler = other.compiler
+        if other.compiler and not shared:
+            self.compiler = other.compiler.copy()
         if cleardeps:
             self._dependents = DependencyMap()
             self._dependencies = DependencyMap()
         self.compiler_flags = other.compiler_flags.copy()
         self.compiler_flags.spec = self
-        self.variants = other.variants.copy()
+        self.variants = other.variants.copy(share_variants=shared)
         self._build_spec = other._build_spec
 
         # FIXME: we manage _patches_in_order_of_appearance specially here
         # to keep it from leaking out of spec.py, but we should figure
         # out how to handle it more elegantly in the Variant classes.
-        for k, v in other.variants.items():
-            patches = getattr(v, '_patches_in_order_of_appearance', None)
-            if patches:
-                self.variants[k]._patches_in_order_of_appearance = patches
+        # Shared variants already carry it.
+        if not shared:
+            for k, v in other.variants.items():
+                patches = getattr(v, '_patches_in_order_of_appearance', None)
+                if patches:
+                    self.variants[k]._patches_in_order_of_appearance = patches
 
         self.variants.spec = self
         self.external_path = other.external_path
@@ -3723,165 +4014,25 @@ def format(self, format_string=default_format, **kwargs):
                 that accepts a string and returns another one
 
         """
+        # Format strings are compiled once, see _compile_format()
+        compiled = _compile_format(format_string)
+
         # If we have an unescaped $ sigil, use the deprecated format strings
-        if re.search(r'[^\\]*\$', format_string):
+        if compiled is None:
             return self.old_format(format_string, **kwargs)
 
         color = kwargs.get('color', False)
+        if color is None:
+            color = clr.get_color_when()
         transform = kwargs.get('transform', {})
 
-        out = six.StringIO()
-
-        def write(s, c=None):
-            f = clr.cescape(s)
-            if c is not None:
-                f = color_formats[c] + f + '@.'
-            clr.cwrite(f, stream=out, color=color)
-
-        def write_attribute(spec, attribute, color):
-            current = spec
-            if attribute.startswith('^'):
-                attribute = attribute[1:]
-                dep, attribute = attribute.split('.', 1)
-                current = self[dep]
-
-            if attribute == '':
-                raise SpecFormatStringError(
-                    'Format string attributes must be non-empty')
-            attribute = attribute.lower()
-
-            sig = ''
-            if attribute[0] in '@%/':
-                # color sigils that are inside braces
-                sig = attribute[0]
-                attribute = attribute[1:]
-            elif attribute.startswith('arch='):
-                sig = ' arch='  # include space as separator
-                attribute = attribute[5:]
-
-            parts = attribute.split('.')
-            assert parts
-
-            # check that the sigil is valid for the attribute.
-            if sig == '@' and parts[-1] not in ('versions', 'version'):
-                raise SpecFormatSigilError(sig, 'versions', attribute)
-            elif sig == '%' and attribute not in ('compiler', 'compiler.name'):
-                raise SpecFormatSigilError(sig, 'compilers', attribute)
-            elif sig == '/' and not re.match(r'hash(:\d+)?$', attribute):
-                raise SpecFormatSigilError(sig, 'DAG hashes', attribute)
-            elif sig == ' arch=' and attribute not in ('architecture', 'arch'):
-                raise SpecFormatSigilError(sig, 'the architecture', attribute)
-
-            # find the morph function for our attribute
-            morph = transform.get(attribute, lambda s, x: x)
-
-            # Special cases for non-spec attributes and hashes.
-            # These must be the only non-dep component of the format attribute
-            if attribute == 'spack_root':
-                write(morph(spec, spack.paths.spack_root))
-                return
-            elif attribute == 'spack_install':
-                write(morph(spec, spack.store.layout.root))
-                return
-            elif re.match(r'hash(:\d)?', attribute):
-                col = '#'
-                if ':' in attribute:
-                    _, length = attribute.split(':')
-                    write(sig + morph(spec, spec.dag_hash(int(length))), col)
-                else:
-                    write(sig + morph(spec, spec.dag_hash()), col)
-                return
-
-            # Iterate over components using getattr to get next element
-            for idx, part in enumerate(parts):
-                if not part:
-                    raise SpecFormatStringError(
-                        'Format string attributes must be non-empty'
-                    )
-                if part.startswith('_'):
-                    raise SpecFormatStringError(
-                        'Attempted to format private attribute'
-                    )
-                else:
-                    if isinstance(current, vt.VariantMap):
-                        # subscript instead of getattr for variant names
-                        current = current[part]
-                    else:
-                        # aliases
-                        if part == 'arch':
-                            part = 'architecture'
-                        elif part == 'version':
-                            # Version requires concrete spec, versions does not
-                            # when concrete, they print the same thing
-                            part = 'versions'
-                        try:
-                            current = getattr(current, part)
-                        except AttributeError:
-                            parent = '.'.join(parts[:idx])
-                            m = 'Attempted to format attribute %s.' % attribute
-                            m += 'Spec.%s has no attribute %s' % (parent, part)
-                            raise SpecFormatStringError(m)
-                        if isinstance(current, vn.VersionList):
-                            if current == _any_version:
-                                # We don't print empty version lists
-                                return
-
-                    if callable(current):
-                        raise SpecFormatStringError(
-                            'Attempted to format callable object'
-                        )
-                    if not current:
-                        # We're not printing anything
-                        return
-
-            # Set color codes for various attributes
-            col = None
-            if 'variants' in parts:
-                col = '+'
-            elif 'architecture' in parts:
-                col = '='
-            elif 'compiler' in parts or 'compiler_flags' in parts:
-                col = '%'
-            elif 'version' in parts:
-                col = '@'
-
-            # Finally, write the ouptut
-            write(sig + morph(spec, str(current)), col)
-
-        attribute = ''
-        in_attribute = False
-        escape = False
-
-        for c in format_string:
-            if escape:
-                out.write(c)
-                escape = False
-            elif c == '\\':
-                escape = True
-            elif in_attribute:
-                if c == '}':
-                    write_attribute(self, attribute, color)
-                    attribute = ''
-                    in_attribute = False
-                else:
-                    attribute += c
+        out = []
+        for item in compiled:
+            if isinstance(item, _FormatAttribute):
+                item.write(self, out, color, transform)
             else:
-                if c == '}':
-                    raise SpecFormatStringError(
-                        'Encountered closing } before opening {'
-                    )
-                elif c == '{':
-                    in_attribute = True
-                else:
-                    out.write(c)
-        if in_attribute:
-            raise SpecFormatStringError(
-                'Format string terminated while reading attribute.'
-                'Missing terminating }.'
-            )
-
-        formatted_spec = out.getvalue()
-        return formatted_spec.strip()
+                out.append(item)
+        return ''.join(out).strip()
 
     def old_format(self, format_string='$_$@$%@+$+$=', **kwargs):
         """
@@ -4431,6 +4582,65 @@ def __init__(self):
              (r'\s+', lambda scanner, val: None)],
             [VAL])
 
+    def lex(self, text):
+        """Single pass version of ``Lexer.lex()``.
+
+        This produces the same tokens as the scanners above, which are kept
+        as the reference grammar, with one regular expression match per
+        token. Like the scanners, it reads the rest of a word after ``=``
+        as a value, and token positions are relative to where the last
+        value started or ended.
+        """
+        tokens = []
+        mode = 0
+        for word in text:
+            start = pos = 0
+            end = len(word)
+            while pos < end:
+                match = _token_res[mode].match(word, pos)
+                if match is None:
+                    remainder = word[pos:]
+                    raise spack.parse.LexError(
+                        "Invalid character", word[start:],
+                        word[start:].index(remainder))
+
+                token_type = _token_types[mode][match.lastindex]
+                if token_type is None:
+                    # Whitespace between tokens
+                    pos = match.end()
+                    continue
+
+                tokens.append(spack.parse.Token(
+                    token_type, match.group(),
+                    pos - start, match.end() - start))
+                pos = match.end()
+
+                if token_type == EQ or token_type == VAL:
+                    start = pos
+                    mode = 1 - mode
+        return tokens
+
+
+#: Token types and patterns read by ``SpecLexer.lex()`` in each lexer mode,
+#: in order of precedence. ``None`` is for whitespace.
+_token_patterns = [
+    [(None, r'\s+'),
+     (DEP, r'\^'), (AT, r'\@'), (COLON, r'\:'), (COMMA, r'\,'),
+     (ON, r'\+'), (OFF, r'\-'), (OFF, r'\~'), (PCT, r'\%'), (EQ, r'\='),
+     (FILE, r'[/\w.-]*/[/\w/-]+\.yaml[^\b]*'),
+     (HASH, r'/'),
+     (ID, spec_id_re)],
+    [(None, r'\s+'),
+     (VAL, r'[\S].*')],
+]
+
+#: One regular expression per mode, and the token type matched by each group
+_token_res = [
+    re.compile('|'.join('(%s)' % p for _, p in patterns))
+    for patterns in _token_patterns]
+_token_types = [
+    [None] + [t for t, _ in patterns] for patterns in _token_patterns]
+
 
 # Lexer is always the same for every parser.
 _lexer = SpecLexer()
@@ -4752,6 +4962,229 @@ def check_identifier(self, id=None):
                 "{0}: Identifier cannot contain '.'".format(id))
 
 
+class _FormatAttribute(object):
+    """An ``{attribute}`` of a compiled format string (see Spec.format).
+
+    Everything that depends only on the format string is computed once,
+    when the format string is compiled.
+    """
+    __slots__ = ('dep', 'attribute', 'sig', 'parts', 'names', 'special',
+                 'hash_length', 'color')
+
+    def __init__(self, attribute):
+        self.dep = None
+        if attribute.startswith('^'):
+            attribute = attribute[1:]
+            self.dep, attribute = attribute.split('.', 1)
+
+        if attribute == '':
+            raise SpecFormatStringError(
+                'Format string attributes must be non-empty')
+        attribute = attribute.lower()
+
+        sig = ''
+        if attribute[0] in '@%/':
+            # color sigils that are inside braces
+            sig = attribute[0]
+            attribute = attribute[1:]
+        elif attribute.startswith('arch='):
+            sig = ' arch='  # include space as separator
+            attribute = attribute[5:]
+
+        parts = attribute.split('.')
+        assert parts
+
+        # check that the sigil is valid for the attribute.
+        if sig == '@' and parts[-1] not in ('versions', 'version'):
+            raise SpecFormatSigilError(sig, 'versions', attribute)
+        elif sig == '%' and attribute not in ('compiler', 'compiler.name'):
+            raise SpecFormatSigilError(sig, 'compilers', attribute)
+        elif sig == '/' and not re.match(r'hash(:\d+)?$', attribute):
+            raise SpecFormatSigilError(sig, 'DAG hashes', attribute)
+        elif sig == ' arch=' and attribute not in ('architecture', 'arch'):
+            raise SpecFormatSigilError(sig, 'the architecture', attribute)
+
+        self.attribute = attribute
+        self.sig = sig
+        self.parts = parts
+
+        # Special cases for non-spec attributes and hashes.
+        # These must be the only non-dep component of the format attribute
+        self.special = None
+        self.hash_length = None
+        if attribute in ('spack_root', 'spack_install'):
+            self.special = attribute
+        elif re.match(r'hash(:\d)?', attribute):
+            self.special = 'hash'
+            if ':' in attribute:
+                _, length = attribute.split(':')
+                self.hash_length = int(length)
+
+        # aliases
+        aliases = {
+            'arch': 'architecture',
+            # Version requires concrete spec, versions does not
+            # when concrete, they print the same thing
+            'version': 'versions',
+        }
+        self.names = [aliases.get(part, part) for part in parts]
+
+        # Set color codes for various attributes
+        self.color = None
+        if 'variants' in parts:
+            self.color = '+'
+        elif 'architecture' in parts:
+            self.color = '='
+        elif 'compiler' in parts or 'compiler_flags' in parts:
+            self.color = '%'
+        elif 'version' in parts:
+            self.color = '@'
+
+    def write(self, spec, out, color, transform):
+        """Append the value of this attribute of ``spec`` to ``out``."""
+        def write(s, c=None):
+            if not color:
+                # Without colors, escaping and colorizing give back s
+                out.append(s)
+                return
+            f = clr.cescape(s)
+            if c is not None:
+                f = color_formats[c] + f + '@.'
+            out.append(clr.colorize(f, color=color))
+
+        current = spec
+        if self.dep is not None:
+            current = spec[self.dep]
+
+        # find the morph function for our attribute
+        morph = transform.get(self.attribute, lambda s, x: x)
+
+        if self.special == 'spack_root':
+            write(morph(spec, spack.paths.spack_root))
+            return
+        elif self.special == 'spack_install':
+            write(morph(spec, spack.store.layout.root))
+            return
+        elif self.special == 'hash':
+            write(self.sig + morph(spec, spec.dag_hash(self.hash_length)),
+                  '#')
+            return
+
+        # Iterate over components using getattr to get next element
+        for idx, (part, name) in enumerate(zip(self.parts, self.names)):
+            if not part:
+                raise SpecFormatStringError(
+                    'Format string attributes must be non-empty'
+                )
+            if part.startswith('_'):
+                raise SpecFormatStringError(
+                    'Attempted to format private attribute'
+                )
+            if isinstance(current, vt.VariantMap):
+                # subscript instead of getattr for variant names
+                current = current[part]
+            else:
+                try:
+                    current = getattr(current, name)
+                except AttributeError:
+                    parent = '.'.join(self.parts[:idx])
+                    m = 'Attempted to format attribute %s.' % self.attribute
+                    m += 'Spec.%s has no attribute %s' % (parent, name)
+                    raise SpecFormatStringError(m)
+                if isinstance(current, vn.VersionList):
+                    if current == _any_version:
+                        # We don't print empty version lists
+                        return
+
+            if callable(current):
+                raise SpecFormatStringError(
+                    'Attempted to format callable object'
+                )
+            if not current:
+                # We're not printing anything
+                return
+
+        # Finally, write the ouptut
+        write(self.sig + morph(spec, str(current)), self.color)
+
+
+@lang.memoized
+def _compile_format(format_string):
+    """Split a format string of Spec.format() into literal strings and
+    _FormatAttribute objects, or return None for the deprecated format
+    strings of Spec.old_format().
+    """
+    if re.search(r'[^\\]*\$', format_string):
+        return None
+
+    compiled = []
+    literal = ''
+    attribute = ''
+    in_attribute = False
+    escape = False
+
+    for c in format_string:
+        if escape:
+            literal += c
+            escape = False
+        elif c == '\\':
+            escape = True
+        elif in_attribute:
+            if c == '}':
+                if literal:
+                    compiled.append(literal)
+                    literal = ''
+                compiled.append(_FormatAttribute(attribute))
+                attribute = ''
+                in_attribute = False
+            else:
+                attribute += c
+        else:
+            if c == '}':
+                raise SpecFormatStringError(
+                    'Encountered closing } before opening {'
+                )
+            elif c == '{':
+                in_attribute = True
+            else:
+                literal += c
+    if in_attribute:
+        raise SpecFormatStringError(
+            'Format string terminated while reading attribute.'
+            'Missing terminating }.'
+        )
+    if literal:
+        compiled.append(literal)
+    return tuple(compiled)
+
+
+#: Abstract specs parsed by the Spec constructor, by spec string. Each entry
+#: records the platform its architectures depend on, if any, and is None
+#: for strings parsed only once so far.
+_parsed_specs = lang.LRUCache(4096)
+
+
+#: Results of Spec.satisfies() for concrete specs, see _satisfies_cache()
+_satisfied = lang.LRUCache(4096)
+
+#: Repositories the results in _satisfied were computed with
+_satisfied_repos = None
+
+
+def _satisfies_cache():
+    """Return the cache of Spec.satisfies() results, after emptying it if
+    the package repositories changed, as they tell which packages are
+    virtual and what they provide.
+    """
+    global _satisfied_repos
+    repos = spack.repo.path.repos
+    if _satisfied_repos is None or len(repos) != len(_satisfied_repos) or \
+            any(a is not b for a, b in zip(repos, _satisfied_repos)):
+        _satisfied.clear()
+        _satisfied_repos = list(repos)
+    return _satisfied
+
+
 def parse(string):
     """Returns a list of specs from an input string.
        For creating one spec, see Spec() constructor.
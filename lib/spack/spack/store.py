@@ -165,9 +165,9 @@ def __init__(
         self.layout = spack.directory_layout.YamlDirectoryLayout(
             root, projections=projections, hash_length=hash_length)
 
-    def reindex(self):
+    def reindex(self, jobs=None):
         """Convenience function to reindex the store DB with its own layout."""
-        return self.db.reindex(self.layout)
+        return self.db.reindex(self.layout, jobs=jobs)
 
     def serialize(self):
         """Return a pickle-able object that can be used to reconstruct
@@ -262,15 +262,25 @@ def retrieve_upstream_dbs():
     return _construct_upstream_dbs_from_install_roots(install_roots)
 
 
+#: Upstream databases already read by this process, keyed by their install
+#: root and the roots of their own upstreams. They are re-read only when
+#: their index changes on disk.
+_upstream_dbs = {}
+
+
 def _construct_upstream_dbs_from_install_roots(
         install_roots, _test=False):
     accumulated_upstream_dbs = []
     for install_root in reversed(install_roots):
         upstream_dbs = list(accumulated_upstream_dbs)
-        next_db = spack.database.Database(
-            install_root, is_upstream=True, upstream_dbs=upstream_dbs)
+        key = (install_root, tuple(db.root for db in upstream_dbs))
+        next_db = _upstream_dbs.get(key)
+        if next_db is None:
+            next_db = spack.database.Database(
+                install_root, is_upstream=True, upstream_dbs=upstream_dbs)
+            _upstream_dbs[key] = next_db
         next_db._fail_when_missing_deps = _test
-        next_db._read()
+        next_db._refresh()
         accumulated_upstream_dbs.insert(0, next_db)
 
     return accumulated_upstream_dbs
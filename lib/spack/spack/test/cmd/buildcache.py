@@ -10,6 +10,7 @@
 import pytest
 
 import spack.binary_distribution
+import spack.config
 import spack.environment as ev
 import spack.main
 import spack.spec
@@ -96,6 +97,21 @@ def tests_buildcache_create(
         os.path.join(str(tmpdir), 'build_cache', tarball))
 
 
+def tests_buildcache_create_binary_specs(
+        install_mockery, mock_fetch, monkeypatch, tmpdir):
+    """"Ensure that buildcache create works with binary spec files"""
+    pkg = 'trivial-install-test-package'
+    with spack.config.override('config:binary_specs', True):
+        install(pkg)
+        buildcache('create', '-d', str(tmpdir), '--unsigned', pkg)
+
+    spec = Spec(pkg).concretized()
+    tarball = spack.binary_distribution.tarball_name(spec, '.spec.yaml')
+    specfile = os.path.join(str(tmpdir), 'build_cache', tarball)
+    with open(specfile) as f:
+        assert Spec.from_yaml(f).dag_hash() == spec.dag_hash()
+
+
 def tests_buildcache_create_env(
         install_mockery, mock_fetch, monkeypatch,
         tmpdir, mutable_mock_env_path):
@@ -59,10 +59,6 @@ def env_deactivate():
     os.environ.pop('SPACK_ENV', None)
 
 
-def set_env_var(key, val):
-    os.environ[key] = val
-
-
 def test_specs_staging(config):
     """Make sure we achieve the best possible staging for the following
 spec DAG::
@@ -765,21 +761,21 @@ def fake_cdash_register(build_name, base_url, project, site, track):
         env_cmd('activate', '--without-view', '--sh', '-d', '.')
 
         # Create environment variables as gitlab would do it
-        set_env_var('SPACK_ARTIFACTS_ROOT', working_dir.strpath)
-        set_env_var('SPACK_JOB_LOG_DIR', log_dir)
-        set_env_var('SPACK_JOB_REPRO_DIR', repro_dir)
-        set_env_var('SPACK_LOCAL_MIRROR_DIR', mirror_dir.strpath)
-        set_env_var('SPACK_CONCRETE_ENV_DIR', env_dir.strpath)
-        set_env_var('CI_PIPELINE_ID', '7192')
-        set_env_var('SPACK_SIGNING_KEY', signing_key)
-        set_env_var('SPACK_ROOT_SPEC', root_spec_build_hash)
-        set_env_var('SPACK_JOB_SPEC_DAG_HASH', job_spec_dag_hash)
-        set_env_var('SPACK_JOB_SPEC_PKG_NAME', 'archive-files')
-        set_env_var('SPACK_COMPILER_ACTION', 'NONE')
-        set_env_var('SPACK_CDASH_BUILD_NAME', '(specs) archive-files')
-        set_env_var('SPACK_RELATED_BUILDS_CDASH', '')
-        set_env_var('SPACK_REMOTE_MIRROR_URL', mirror_url)
-        set_env_var('SPACK_PIPELINE_TYPE', 'spack_protected_branch')
+        monkeypatch.setenv('SPACK_ARTIFACTS_ROOT', working_dir.strpath)
+        monkeypatch.setenv('SPACK_JOB_LOG_DIR', log_dir)
+        monkeypatch.setenv('SPACK_JOB_REPRO_DIR', repro_dir)
+        monkeypatch.setenv('SPACK_LOCAL_MIRROR_DIR', mirror_dir.strpath)
+        monkeypatch.setenv('SPACK_CONCRETE_ENV_DIR', env_dir.strpath)
+        monkeypatch.setenv('CI_PIPELINE_ID', '7192')
+        monkeypatch.setenv('SPACK_SIGNING_KEY', signing_key)
+        monkeypatch.setenv('SPACK_ROOT_SPEC', root_spec_build_hash)
+        monkeypatch.setenv('SPACK_JOB_SPEC_DAG_HASH', job_spec_dag_hash)
+        monkeypatch.setenv('SPACK_JOB_SPEC_PKG_NAME', 'archive-files')
+        monkeypatch.setenv('SPACK_COMPILER_ACTION', 'NONE')
+        monkeypatch.setenv('SPACK_CDASH_BUILD_NAME', '(specs) archive-files')
+        monkeypatch.setenv('SPACK_RELATED_BUILDS_CDASH', '')
+        monkeypatch.setenv('SPACK_REMOTE_MIRROR_URL', mirror_url)
+        monkeypatch.setenv('SPACK_PIPELINE_TYPE', 'spack_protected_branch')
 
         ci_cmd('rebuild', fail_on_error=False)
 
@@ -867,16 +863,16 @@ def test_ci_nothing_to_rebuild(tmpdir, mutable_mock_env_path, env_deactivate,
                     job_spec_dag_hash = s.dag_hash()
 
             # Create environment variables as gitlab would do it
-            set_env_var('SPACK_ARTIFACTS_ROOT', working_dir.strpath)
-            set_env_var('SPACK_JOB_LOG_DIR', 'log_dir')
-            set_env_var('SPACK_JOB_REPRO_DIR', 'repro_dir')
-            set_env_var('SPACK_LOCAL_MIRROR_DIR', mirror_dir.strpath)
-            set_env_var('SPACK_CONCRETE_ENV_DIR', tmpdir.strpath)
-            set_env_var('SPACK_ROOT_SPEC', root_spec_build_hash)
-            set_env_var('SPACK_JOB_SPEC_DAG_HASH', job_spec_dag_hash)
-            set_env_var('SPACK_JOB_SPEC_PKG_NAME', 'archive-files')
-            set_env_var('SPACK_COMPILER_ACTION', 'NONE')
-            set_env_var('SPACK_REMOTE_MIRROR_URL', mirror_url)
+            monkeypatch.setenv('SPACK_ARTIFACTS_ROOT', working_dir.strpath)
+            monkeypatch.setenv('SPACK_JOB_LOG_DIR', 'log_dir')
+            monkeypatch.setenv('SPACK_JOB_REPRO_DIR', 'repro_dir')
+            monkeypatch.setenv('SPACK_LOCAL_MIRROR_DIR', mirror_dir.strpath)
+            monkeypatch.setenv('SPACK_CONCRETE_ENV_DIR', tmpdir.strpath)
+            monkeypatch.setenv('SPACK_ROOT_SPEC', root_spec_build_hash)
+            monkeypatch.setenv('SPACK_JOB_SPEC_DAG_HASH', job_spec_dag_hash)
+            monkeypatch.setenv('SPACK_JOB_SPEC_PKG_NAME', 'archive-files')
+            monkeypatch.setenv('SPACK_COMPILER_ACTION', 'NONE')
+            monkeypatch.setenv('SPACK_REMOTE_MIRROR_URL', mirror_url)
 
             def fake_dl_method(spec, dest, require_cdashid, m_url=None):
                 print('fake download buildcache {0}'.format(spec.name))
@@ -8,6 +8,7 @@
 import spack.caches
 import spack.main
 import spack.package
+import spack.solver.asp
 import spack.stage
 
 clean = spack.main.SpackCommand('clean')
@@ -36,6 +37,8 @@ def __call__(self, *args, **kwargs):
         spack.caches.misc_cache, 'destroy', Counter('caches'))
     monkeypatch.setattr(
         spack.installer, 'clear_failures', Counter('failures'))
+    monkeypatch.setattr(
+        spack.solver.asp, 'clear_solver_cache', Counter('solver'))
 
     yield counts
 
@@ -52,6 +55,7 @@ def __call__(self, *args, **kwargs):
     ('-sd',      ['stages', 'downloads']),
     ('-m',       ['caches']),
     ('-f',       ['failures']),
+    ('--solver-cache', ['solver']),
     ('-a',       all_effects),
     ('',         []),
 ])
@@ -62,5 +66,5 @@ def test_function_calls(command_line, effects, mock_calls_for_clean):
 
     # Assert that we called the expected functions the correct
     # number of times
-    for name in ['package'] + all_effects:
+    for name in ['package', 'solver'] + all_effects:
         assert mock_calls_for_clean[name] == (1 if name in effects else 0)
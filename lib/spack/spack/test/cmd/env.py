@@ -11,9 +11,13 @@
 import llnl.util.filesystem as fs
 import llnl.util.link_tree
 
+import spack.config
 import spack.environment as ev
+import spack.error
 import spack.hash_types as ht
 import spack.modules
+import spack.util.cpus
+import spack.util.spack_binary
 import spack.util.spack_json as sjson
 from spack.cmd.env import _env_create
 from spack.main import SpackCommand, SpackCommandError
@@ -139,6 +143,66 @@ def test_concretize():
     assert any(x.name == 'mpileaks' for x in env_specs)
 
 
+def test_concretize_in_parallel(monkeypatch):
+    user_specs = ['mpileaks', 'libelf', 'zmpi', 'callpath ^mpich']
+    serial = ev.create('serial')
+    for spec in user_specs:
+        serial.add(spec)
+    expected = [(u, c.build_hash()) for u, c in serial.concretize()]
+
+    monkeypatch.setattr(ev, 'parallel_concretization_threshold', 2)
+    monkeypatch.setattr(spack.util.cpus, 'cpus_available', lambda: 2)
+    e = ev.create('test')
+    for spec in user_specs:
+        e.add(spec)
+    assert [(u, c.build_hash()) for u, c in e.concretize()] == expected
+
+    # Errors in workers are reported by the parent process
+    e = ev.create('failing')
+    for spec in user_specs + ['libelf foo=bar']:
+        e.add(spec)
+    with pytest.raises(spack.error.SpackError, match='libelf'):
+        e.concretize()
+
+
+def test_concretize_in_parallel_with_tests(monkeypatch):
+    def edges(concretized):
+        return [(u, sorted((s.name, d.spec.name, tuple(sorted(d.deptypes)))
+                           for s in c.traverse(deptype='all')
+                           for d in s.dependencies_dict(deptype='all')
+                           .values()))
+                for u, c in concretized]
+
+    user_specs = ['a', 'b', 'libelf', 'zmpi']
+    serial = ev.create('serial')
+    for spec in user_specs:
+        serial.add(spec)
+    expected = edges(serial.concretize(tests=True))
+    assert ('a', 'test-dependency', ('test',)) in expected[0][1]
+
+    monkeypatch.setattr(ev, 'parallel_concretization_threshold', 2)
+    monkeypatch.setattr(spack.util.cpus, 'cpus_available', lambda: 2)
+    e = ev.create('test')
+    for spec in user_specs:
+        e.add(spec)
+    assert edges(e.concretize(tests=True)) == expected
+
+
+@pytest.mark.parametrize('jobs,config_jobs', [(1, 2), (None, 1)])
+def test_concretize_in_parallel_disabled(jobs, config_jobs, monkeypatch):
+    def fail(*args):
+        raise AssertionError('specs should not be concretized in parallel')
+
+    monkeypatch.setattr(ev, 'parallel_concretization_threshold', 2)
+    monkeypatch.setattr(spack.util.cpus, 'cpus_available', lambda: 2)
+    monkeypatch.setattr(ev, '_concretize_in_parallel', fail)
+    e = ev.create('test')
+    for spec in ['libelf', 'zmpi', 'b']:
+        e.add(spec)
+    with spack.config.override('config:concretize_jobs', config_jobs):
+        assert len(e.concretize(jobs=jobs)) == 3
+
+
 def test_env_uninstalled_specs(install_mockery, mock_fetch):
     e = ev.create('test')
     e.add('cmake-client')
@@ -491,6 +555,41 @@ def test_init_from_lockfile(tmpdir):
         assert s1 == s2
 
 
+def test_init_from_binary_lockfile(tmpdir, monkeypatch):
+    e1 = ev.create('test')
+    e1.add('mpileaks')
+    e1.concretize()
+    with spack.config.override('config:binary_specs', True):
+        e1.write()
+    binary_path = e1.lock_path + '.bin'
+    with open(binary_path, 'rb') as f:
+        assert spack.util.spack_binary.is_binary(f.read())
+
+    # The lockfile itself is still JSON
+    with open(e1.lock_path) as f:
+        assert sjson.load(f)['concrete_specs']
+
+    for e2 in (ev.read('test'), ev.Environment(str(tmpdir), e1.lock_path)):
+        assert e1.concretized_order == e2.concretized_order
+        assert e1.concretized_user_specs == e2.concretized_user_specs
+        for h in e1.concretized_order:
+            assert e1.specs_by_hash[h].eq_dag(e2.specs_by_hash[h])
+
+    # The binary copy is ignored once the lockfile is newer, and it is
+    # removed when the option is unset
+    def _read_binary(self):
+        raise AssertionError('the binary lockfile should not be read')
+
+    lock_mtime = os.stat(e1.lock_path).st_mtime
+    os.utime(e1.lock_path, (lock_mtime + 10, lock_mtime + 10))
+    monkeypatch.setattr(spack.util.spack_binary, 'load', _read_binary)
+    e3 = ev.read('test')
+    assert e3.concretized_order == e1.concretized_order
+
+    e3.write()
+    assert not os.path.exists(binary_path)
+
+
 def test_init_from_yaml(tmpdir):
     """Test that an environment can be instantiated from a lockfile."""
     initial_yaml = StringIO("""\
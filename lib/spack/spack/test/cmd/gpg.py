@@ -39,9 +39,9 @@ def test_find_gpg(cmd_name, version, tmpdir, mock_gnupghome, monkeypatch):
     monkeypatch.setitem(os.environ, "PATH", str(tmpdir))
     if version == 'undetectable' or version.endswith('1.3.4'):
         with pytest.raises(spack.util.gpg.SpackGPGError):
-            spack.util.gpg.init(force=True)
+            spack.util.gpg.init(mock_gnupghome, force=True)
     else:
-        spack.util.gpg.init(force=True)
+        spack.util.gpg.init(mock_gnupghome, force=True)
         assert spack.util.gpg.GPG is not None
         assert spack.util.gpg.GPGCONF is not None
 
@@ -49,7 +49,7 @@ def test_find_gpg(cmd_name, version, tmpdir, mock_gnupghome, monkeypatch):
 def test_no_gpg_in_path(tmpdir, mock_gnupghome, monkeypatch):
     monkeypatch.setitem(os.environ, "PATH", str(tmpdir))
     with pytest.raises(spack.util.gpg.SpackGPGError):
-        spack.util.gpg.init(force=True)
+        spack.util.gpg.init(mock_gnupghome, force=True)
 
 
 @pytest.mark.maybeslow
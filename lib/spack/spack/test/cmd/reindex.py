@@ -4,6 +4,10 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import os
 
+import pytest
+
+import spack.config
+import spack.database
 import spack.store
 from spack.main import SpackCommand
 
@@ -52,3 +56,41 @@ def test_reindex_with_deprecated_packages(mock_packages, mock_archive,
 
     assert spack.store.db.query(installed=any) == all_installed
     assert spack.store.db.query(installed=True) == non_deprecated
+
+
+def test_reindex_to_sqlite(mock_packages, mock_archive, mock_fetch,
+                           install_mockery):
+    pytest.importorskip('sqlite3')
+    install('libelf@0.8.13')
+    install('libelf@0.8.12')
+
+    all_installed = spack.store.db.query()
+
+    reindex('--to-sqlite')
+    assert os.path.exists(spack.store.db._sqlite_path)
+
+    with spack.config.override('config:db_storage', 'sqlite'):
+        db = spack.database.Database(spack.store.db.root)
+        assert db.query() == all_installed
+
+
+def test_reindex_to_json(mock_packages, mock_archive, mock_fetch,
+                         install_mockery):
+    pytest.importorskip('sqlite3')
+    install('libelf@0.8.13')
+    reindex('--to-sqlite')
+    install('libelf@0.8.12')
+    all_installed = spack.store.db.query()
+
+    with spack.config.override('config:db_storage', 'sqlite'):
+        out = reindex('--to-json', fail_on_error=False)
+    assert 'db_storage' in out
+    assert os.path.exists(spack.store.db._sqlite_path)
+
+    reindex('--to-json')
+    assert not os.path.exists(spack.store.db._sqlite_path)
+    assert os.path.exists(spack.store.db._sqlite_path + '.migrated')
+
+    db = spack.database.Database(spack.store.db.root)
+    assert db.query() == all_installed
+    assert db._sqlite is None
@@ -33,7 +33,8 @@ def flake8_package():
     try:
         shutil.copy(filename, tmp)
         package = FileFilter(filename)
-        package.filter("state = 'unmodified'", "state = 'modified'", string=True)
+        package.filter("state = 'unmodified'", "state = 'modified'", string=True,
+                       backup=False)
         yield filename
     finally:
         shutil.move(tmp, filename)
@@ -49,7 +50,8 @@ def flake8_package_with_errors(scope="function"):
     try:
         shutil.copy(filename, tmp)
         package = FileFilter(filename)
-        package.filter("state = 'unmodified'", "state    =    'modified'", string=True)
+        package.filter("state = 'unmodified'", "state    =    'modified'", string=True,
+                       backup=False)
         yield filename
     finally:
         shutil.move(tmp, filename)
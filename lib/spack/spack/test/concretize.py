@@ -2,6 +2,7 @@
 # Spack Project Developers. See the top-level COPYRIGHT file for details.
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import os
 import sys
 
 import jinja2
@@ -12,13 +13,21 @@
 import llnl.util.lang
 
 import spack.architecture
+import spack.binary_distribution
+import spack.caches
 import spack.compilers
 import spack.concretize
+import spack.database
 import spack.error
+import spack.paths
 import spack.platforms.test
 import spack.repo
+import spack.solver.asp
+import spack.store
+import spack.util.spack_binary
 from spack.concretize import find_spec
 from spack.spec import Spec
+from spack.util.file_cache import FileCache
 from spack.util.mock_package import MockPackageMultiRepo
 from spack.version import ver
 
@@ -1260,3 +1269,338 @@ def test_provider_must_meet_requirements(self):
         s = spack.spec.Spec('unsat-virtual-dependency')
         with pytest.raises((RuntimeError, spack.error.UnsatisfiableSpecError)):
             s.concretize()
+
+
+class _FactCollector(object):
+    """Solver driver that only collects the facts it gets."""
+
+    def __init__(self):
+        self.facts = []
+
+    def h1(self, name):
+        pass
+
+    def h2(self, name):
+        pass
+
+    def newline(self):
+        pass
+
+    def fact(self, head):
+        self.facts.append(str(head))
+
+
+def _setup_facts(spec_str):
+    driver = _FactCollector()
+    spack.solver.asp.SpackSolverSetup().setup(driver, [Spec(spec_str)])
+    return driver.facts
+
+
+def test_package_facts_are_cached(mock_packages, config, monkeypatch, tmpdir):
+    monkeypatch.setattr(
+        spack.caches, 'misc_cache', FileCache(str(tmpdir.join('cache'))))
+    monkeypatch.setattr(spack.solver.asp, '_package_facts', {})
+    expected = _setup_facts('mpileaks')
+
+    recorded = []
+    record = spack.solver.asp.SpackSolverSetup._record_package_facts
+
+    def _record(self, pkg, tests):
+        recorded.append(pkg.name)
+        return record(self, pkg, tests)
+
+    monkeypatch.setattr(
+        spack.solver.asp.SpackSolverSetup, '_record_package_facts', _record)
+
+    # Facts are replayed from memory, then from the misc cache
+    assert _setup_facts('mpileaks') == expected
+    monkeypatch.setattr(spack.solver.asp, '_package_facts', {})
+    assert _setup_facts('mpileaks') == expected
+    assert not recorded
+
+    # A change to the configuration invalidates the cached facts
+    with spack.config.override('packages:mpileaks', {'version': ['2.2']}):
+        _setup_facts('mpileaks')
+    assert 'mpileaks' in recorded
+
+    # So does a change to the code generating the facts
+    del recorded[:]
+    source_hash = spack.solver.asp._source_hash
+    directives = os.path.join(spack.paths.module_path, 'directives.py')
+
+    def _changed_source_hash(path):
+        if path == directives:
+            return 'changed'
+        return source_hash(path)
+
+    monkeypatch.setattr(
+        spack.solver.asp, '_source_hash', _changed_source_hash)
+    _setup_facts('mpileaks')
+    assert 'mpileaks' in recorded
+
+
+def test_package_facts_cache_holds_data_only(
+        mock_packages, config, monkeypatch, tmpdir):
+    monkeypatch.setattr(
+        spack.caches, 'misc_cache', FileCache(str(tmpdir.join('cache'))))
+
+    # Packages with version, compiler and target constraints in directives
+    for spec_str in ('cumulative-vrange-root', 'openblas',
+                     'impossible-concretization'):
+        monkeypatch.setattr(spack.solver.asp, '_package_facts', {})
+        expected = _setup_facts(spec_str)
+        monkeypatch.setattr(spack.solver.asp, '_package_facts', {})
+        assert _setup_facts(spec_str) == expected
+
+    def _check_plain(data):
+        if isinstance(data, dict):
+            for k, v in data.items():
+                _check_plain(k)
+                _check_plain(v)
+        elif isinstance(data, list):
+            for v in data:
+                _check_plain(v)
+        else:
+            assert data is None or type(data) in (str, int, bool)
+
+    facts = spack.caches.misc_cache.cache_path('solver/facts')
+    for name in os.listdir(facts):
+        if name.startswith('.'):
+            continue
+        with open(os.path.join(facts, name), 'rb') as f:
+            data = f.read()
+        assert spack.util.spack_binary.is_binary(data)
+        _check_plain(spack.util.spack_binary.load(data))
+
+
+def test_package_facts_from_mock_repo_are_not_cached(config, monkeypatch):
+    monkeypatch.setattr(spack.solver.asp, '_package_facts', {})
+    mock_repo = MockPackageMultiRepo()
+    bazpkg = mock_repo.add_package('bazpkg', [], [])
+    mock_repo.add_package('foopkg', [bazpkg], [('link', 'build')])
+
+    with spack.repo.use_repositories(mock_repo):
+        facts = _setup_facts('foopkg')
+    assert 'dependency_condition(0, "foopkg", "bazpkg")' in facts
+    assert not spack.solver.asp._package_facts
+
+
+@pytest.mark.parametrize('spec_str,expected,pruned', [
+    ('hdf5', ['hdf5', 'mpich', 'mpich2', 'zmpi', 'fake'], []),
+    # Conditional dependencies that the input specs contradict
+    ('hdf5~mpi', ['hdf5'], ['mpich', 'mpich2', 'zmpi', 'fake']),
+    # Providers that can't provide the virtual
+    ('mpi@3:', ['mpich', 'zmpi'], ['mpich2']),
+    ('hdf5 ^mpi@3:', ['hdf5', 'mpich', 'zmpi'], ['mpich2']),
+])
+def test_possible_packages(mock_packages, config, spec_str, expected, pruned):
+    setup = spack.solver.asp.SpackSolverSetup()
+    possible = setup.possible_packages([Spec(spec_str)])
+    assert all(name in possible for name in expected)
+    assert not any(name in possible for name in pruned)
+
+
+def test_possible_packages_with_externals(mock_packages, mutable_config):
+    spack.config.set('packages:callpath', {
+        'buildable': False,
+        'externals': [{'spec': 'callpath@1.0', 'prefix': '/usr'}]
+    })
+    spack.config.set('packages:zmpi', {'buildable': False})
+
+    setup = spack.solver.asp.SpackSolverSetup()
+    possible = setup.possible_packages([Spec('mpileaks')])
+    assert possible == set(['mpileaks', 'callpath', 'mpich', 'mpich2',
+                            'multi-provider-mpi'])
+    assert setup.possible_virtuals == set(['mpi'])
+
+
+def test_solve_cache(mock_packages, mutable_config, monkeypatch, tmpdir):
+    monkeypatch.setattr(
+        spack.caches, 'misc_cache', FileCache(str(tmpdir.join('cache'))))
+    spack.config.set('config:solver_cache', True)
+
+    solved = []
+
+    class _Driver(object):
+        """Solver driver concretizing specs with the original concretizer"""
+        def solve(self, setup, specs, dump, models, timers, stats, tests,
+                  *args):
+            solved.append([str(s) for s in specs])
+            answer = {}
+            for spec in specs:
+                concrete = spec.copy()
+                concrete._old_concretize(tests=tests)
+                answer.update((s.name, s) for s in concrete.traverse())
+
+            result = spack.solver.asp.Result(specs)
+            result.satisfiable = True
+            result.answers.append(([0], 0, answer))
+            result.criteria = ['criterion']
+            result.nmodels = 1
+            return result
+
+    monkeypatch.setattr(spack.solver.asp, 'PyclingoDriver', _Driver)
+
+    def _solve(spec_str):
+        result = spack.solver.asp.solve([Spec(spec_str)])
+        return [s.build_hash() for s in result.specs]
+
+    # The second solve is a hit
+    expected = _solve('mpileaks')
+    assert _solve('mpileaks') == expected
+    assert solved == [['mpileaks']]
+
+    # A change to the configuration is a miss
+    with spack.config.override('packages:mpileaks', {'version': ['2.2']}):
+        _solve('mpileaks')
+    assert len(solved) == 2
+
+    # Only the most recently used results are kept
+    spack.config.set('config:solver_cache_size', 1)
+    _solve('libelf')
+    results = spack.caches.misc_cache.cache_path('solver/results')
+    assert len([f for f in os.listdir(results) if f.endswith('.json')]) == 1
+
+    # Test dependencies are part of the cached results
+    def _test_deps(spec_str):
+        result = spack.solver.asp.solve([Spec(spec_str)], tests=True)
+        return [d.name for d in result.specs[0].dependencies(deptype='test')]
+
+    assert _test_deps('a') == ['test-dependency']
+    assert _test_deps('a') == ['test-dependency']
+    assert solved[-1] == ['a'] and len(solved) == 4
+
+    spack.solver.asp.clear_solver_cache()
+    assert not os.path.exists(results)
+
+
+@pytest.fixture()
+def no_build_caches(monkeypatch):
+    """No build cache has specs that solves can reuse."""
+    index = spack.binary_distribution.BinaryCacheIndex
+    monkeypatch.setattr(index, 'update', lambda self: None)
+    monkeypatch.setattr(index, 'index_hashes', lambda self: {})
+    monkeypatch.setattr(index, 'get_all_built_specs', lambda self: [])
+    monkeypatch.setattr(spack.solver.asp, '_reusable', (None, None))
+
+
+def test_reusable_specs_facts(database, no_build_caches):
+    reuse = spack.solver.asp._reusable_specs()
+    mpileaks = spack.store.db.query_one('mpileaks ^mpich')
+    assert mpileaks in reuse
+
+    driver = _FactCollector()
+    setup = spack.solver.asp.SpackSolverSetup()
+    setup.setup(driver, [Spec('mpileaks')], reuse=reuse)
+    assert 'optimize_for_reuse()' in driver.facts
+
+    # Every node can be reused, and imposes its attributes, its
+    # dependencies and their hashes
+    for node in mpileaks.traverse():
+        node_hash = node.dag_hash()
+        assert setup.reusable_specs[node_hash] is node
+        assert 'installed_hash("{0}", "{1}")'.format(
+            node.name, node_hash) in driver.facts
+        assert 'imposed_constraint("{0}", "version", "{1}", "{2}")'.format(
+            node_hash, node.name, node.version) in driver.facts
+        for dep in node.dependencies():
+            assert 'imposed_constraint("{0}", "hash", "{1}", "{2}")'.format(
+                node_hash, dep.name, dep.dag_hash()) in driver.facts
+
+    # Specs with nodes that can't be in the solve are not declared
+    smoke_test = spack.store.db.query_one('trivial-smoke-test')
+    assert smoke_test.dag_hash() not in setup.reusable_specs
+
+
+def test_reusable_specs_computed_once(
+        mutable_database, no_build_caches, monkeypatch):
+    mpileaks = mutable_database.query_one('mpileaks ^mpich')
+    queries = []
+    query = spack.database.Database.query
+
+    def _query(db, *args, **kwargs):
+        queries.append(args)
+        return query(db, *args, **kwargs)
+
+    monkeypatch.setattr(spack.database.Database, 'query', _query)
+    reuse = spack.solver.asp._reusable_specs()
+    assert spack.solver.asp._reusable_specs() is reuse
+    assert len(queries) == 1
+
+    # A change to the store, or to the build caches, is picked up
+    mutable_database.remove(mpileaks)
+    assert mpileaks not in spack.solver.asp._reusable_specs()
+    assert len(queries) == 2
+
+    libelf = Spec('libelf@0.8.12').concretized()
+    monkeypatch.setattr(
+        spack.binary_distribution.BinaryCacheIndex, 'index_hashes',
+        lambda self: {'file:///mirror': 'new-index-hash'})
+    monkeypatch.setattr(
+        spack.binary_distribution.BinaryCacheIndex, 'get_all_built_specs',
+        lambda self: [libelf])
+    assert libelf in spack.solver.asp._reusable_specs()
+
+
+def test_reusable_specs_not_buildable(database):
+    mpileaks = spack.store.db.query_one('mpileaks ^mpich')
+    callpath = mpileaks['callpath']
+    reuse = list(mpileaks.traverse())
+
+    with spack.config.override('packages:callpath', {'buildable': False}):
+        setup = spack.solver.asp.SpackSolverSetup()
+        assert 'callpath' not in setup.possible_packages([Spec('mpileaks')])
+
+        # Installed packages that are not buildable, and their installed
+        # dependencies, can be reused
+        possible = setup.possible_packages([Spec('mpileaks')], reuse)
+        assert all(node.name in possible for node in callpath.traverse())
+
+        setup.setup(_FactCollector(), [Spec('mpileaks')], reuse=reuse)
+        assert callpath.dag_hash() in setup.reusable_specs
+        assert mpileaks.dag_hash() in setup.reusable_specs
+
+
+def test_reusable_specs_undeclared_versions(mock_packages, config):
+    libelf = Spec('libelf@0.8.99').concretized()
+
+    driver = _FactCollector()
+    setup = spack.solver.asp.SpackSolverSetup()
+    setup.setup(driver, [Spec('libelf')], reuse=[libelf])
+    assert 'version_declared("libelf", "0.8.99", 3)' in driver.facts
+    assert 'reusable_version("libelf", "0.8.99")' in driver.facts
+
+
+def test_spec_builder_reuses_hashes(database):
+    mpileaks = spack.store.db.query_one('mpileaks ^mpich')
+    reusable_specs = dict((s.dag_hash(), s) for s in mpileaks.traverse())
+
+    functions = [('hash', [s.name, s.dag_hash()]) for s in mpileaks.traverse()]
+    for dspec in mpileaks.traverse_edges(root=False, cover='edges'):
+        functions.extend(
+            ('depends_on', [dspec.parent.name, dspec.spec.name, t])
+            for t in dspec.deptypes)
+
+    builder = spack.solver.asp.SpecBuilder([Spec('mpileaks')], reusable_specs)
+    specs = builder.build_specs(functions)
+    assert specs['mpileaks'].dag_hash() == mpileaks.dag_hash()
+    assert specs['mpileaks'] == mpileaks
+    assert specs['mpileaks'] is not mpileaks
+
+
+@pytest.mark.parametrize('spec_str,reused,built', [
+    ('mpileaks ^mpich', ['mpileaks', 'callpath', 'mpich'], []),
+    ('mpileaks+debug ^mpich', ['callpath', 'libelf', 'mpich'], ['mpileaks']),
+    ('mpileaks ^libelf@0.8.12', ['mpich'], ['mpileaks', 'libelf']),
+])
+def test_reuse_installed_specs(
+        database, no_build_caches, spec_str, reused, built):
+    if spack.config.get('config:concretizer') == 'original':
+        pytest.skip('Only the new concretizer can reuse specs')
+
+    result = spack.solver.asp.solve([Spec(spec_str)], reuse=True)
+    spec = result.specs[0]
+    for name in reused:
+        assert spack.store.db.query(spec[name], installed=True)
+    for name in built:
+        assert not spack.store.db.query(spec[name], installed=True)
@@ -473,7 +473,8 @@ def test_substitute_tempdir(mock_low_high_config):
      [full_padded_string, '/path', None]),
 ])
 def test_parse_install_tree(config_settings, expected, mutable_config):
-    expected_root = expected[0] or spack.store.default_install_tree_root
+    expected_root = expected[0] or mutable_config.get(
+        'config:install_tree:root')
     expected_unpadded_root = expected[1] or expected_root
     expected_proj = expected[2] or spack.directory_layout.default_projections
 
@@ -480,8 +480,9 @@ def configuration_dir(tmpdir_factory, linux_os):
     modules_root = tmpdir_factory.mktemp('share')
     tcl_root = modules_root.ensure('modules', dir=True)
     lmod_root = modules_root.ensure('lmod', dir=True)
+    install_root = tmpdir_factory.mktemp('opt')
     content = ''.join(config_yaml.read()).format(
-        solver, str(tcl_root), str(lmod_root)
+        solver, str(tcl_root), str(lmod_root), str(install_root)
     )
     t = tmpdir.join('site', 'config.yaml')
     t.write(content)
@@ -842,18 +843,18 @@ def mock_gnupghome(monkeypatch):
     # have to make our own tmpdir with a shorter name than pytest's.
     # This comes up because tmp paths on macOS are already long-ish, and
     # pytest makes them longer.
+    short_name_tmpdir = tempfile.mkdtemp()
     try:
-        spack.util.gpg.init()
+        # Initializing GnuPG here would create Spack's own GNUPGHOME
+        with spack.util.gpg.gnupghome_override(short_name_tmpdir):
+            yield short_name_tmpdir
     except spack.util.gpg.SpackGPGError:
         if not spack.util.gpg.GPG:
             pytest.skip('This test requires gpg')
-
-    short_name_tmpdir = tempfile.mkdtemp()
-    with spack.util.gpg.gnupghome_override(short_name_tmpdir):
-        yield short_name_tmpdir
-
-    # clean up, since we are doing this manually
-    shutil.rmtree(short_name_tmpdir)
+        raise
+    finally:
+        # clean up, since we are doing this manually
+        shutil.rmtree(short_name_tmpdir)
 
 ##########
 # Fake archives and repositories
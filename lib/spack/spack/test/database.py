@@ -11,6 +11,7 @@
 import functools
 import json
 import os
+import pickle
 
 import pytest
 
@@ -23,16 +24,22 @@
 
 from jsonschema import validate
 
+import llnl.util.filesystem as fs
 import llnl.util.lock as lk
 from llnl.util.tty.colify import colify
 
+import spack.caches
 import spack.database
+import spack.directory_layout
 import spack.package
 import spack.repo
 import spack.spec
 import spack.store
+import spack.util.spack_binary
+import spack.util.spack_json
 from spack.schema.database_index import schema
 from spack.util.executable import Executable
+from spack.util.file_cache import FileCache
 from spack.util.mock_package import MockPackageMultiRepo
 
 pytestmark = pytest.mark.db
@@ -242,6 +249,43 @@ def test_recursive_upstream_dbs(tmpdir_factory, gen_mock_layout):
                 spec['z'], direction='parents') == set([spec, spec['y']]))
 
 
+@pytest.mark.usefixtures('config', 'temporary_store')
+def test_upstream_dbs_cached_and_refreshed(tmpdir_factory, gen_mock_layout,
+                                           monkeypatch):
+    roots = [str(tmpdir_factory.mktemp(x)) for x in ['a', 'b']]
+    layout = gen_mock_layout('/rb/')
+    monkeypatch.setattr(spack.store, '_upstream_dbs', {})
+
+    mock_repo = MockPackageMultiRepo()
+    mock_repo.add_package('x', [], [])
+    mock_repo.add_package('y', [], [])
+
+    with spack.repo.use_repositories(mock_repo):
+        x = spack.spec.Spec('x').concretized()
+        y = spack.spec.Spec('y').concretized()
+
+        upstream_write_db = spack.database.Database(roots[1])
+        upstream_write_db.add(x, layout)
+
+        upstream_dbs = spack.store._construct_upstream_dbs_from_install_roots(
+            [roots[1]], _test=True)
+        db = spack.database.Database(roots[0], upstream_dbs=upstream_dbs)
+        db.add(y, gen_mock_layout('/ra/'))
+
+        # The upstream database is read once per process
+        assert spack.store._construct_upstream_dbs_from_install_roots(
+            [roots[1]], _test=True) == upstream_dbs
+        assert db.query_by_hashes([x.dag_hash(), y.dag_hash(), 'none']) == {
+            x.dag_hash(): (True, upstream_dbs[0]._data[x.dag_hash()]),
+            y.dag_hash(): (False, db._data[y.dag_hash()]),
+        }
+
+        # ... and re-read when it changes on disk
+        upstream_write_db.remove(x)
+        assert db.query_by_hashes([x.dag_hash()]) == {}
+        assert db.query('x', installed=any) == []
+
+
 @pytest.fixture()
 def usr_folder_exists(monkeypatch):
     """The ``/usr`` folder is assumed to be existing in some tests. This
@@ -507,6 +551,17 @@ def test_026_reindex_after_deprecate(mutable_database):
     _check_db_sanity(mutable_database)
 
 
+def test_027_reindex_in_parallel(mutable_database, monkeypatch):
+    """Make sure reading spec files with a pool of processes gives the
+    same database as reading them serially."""
+    expected = mutable_database.query(installed=any)
+    monkeypatch.setattr(spack.directory_layout, 'parallel_read_threshold', 1)
+
+    spack.store.store.reindex(jobs=2)
+    _check_db_sanity(mutable_database)
+    assert mutable_database.query(installed=any) == expected
+
+
 class ReadModify(object):
     """Provide a function which can execute in a separate process that removes
     a spec from the database.
@@ -781,11 +836,11 @@ def test_query_spec_with_non_conditional_virtual_dependency(database):
     assert len(results) == 1
 
 
-def test_failed_spec_path_error(database):
+def test_failure_key_error(database):
     """Ensure spec not concrete check is covered."""
     s = spack.spec.Spec('a')
     with pytest.raises(ValueError, match='Concrete spec required'):
-        spack.store.db._failed_spec_path(s)
+        spack.store.db._failure_key(s)
 
 
 @pytest.mark.db
@@ -824,7 +879,7 @@ def _is(db, spec):
 @pytest.mark.db
 def test_mark_failed(mutable_database, monkeypatch, tmpdir, capsys):
     """Add coverage to mark_failed."""
-    def _raise_exc(lock):
+    def _raise_exc(lock, timeout=None):
         raise lk.LockTimeoutError('Mock acquire_write failure')
 
     # Ensure attempt to acquire write lock on the mark raises the exception
@@ -866,6 +921,68 @@ def _is(db, spec):
     assert spack.store.db.prefix_failed(s)
 
 
+@pytest.mark.db
+def test_failure_log(mutable_database, monkeypatch):
+    """Check that failures are shared through the failure log."""
+    monkeypatch.setattr(spack.database._FailureLog, 'compaction_threshold', 4)
+    a = spack.spec.Spec('a').concretized()
+    b = spack.spec.Spec('b').concretized()
+
+    spack.store.db.mark_failed(a, Exception('Build failed\nin phase'))
+    spack.store.db.clear_failure(a, force=True)
+    spack.store.db.mark_failed(a, 'Build failed again')
+
+    # A line truncated by a crash does not hide the next entries
+    with open(spack.store.db._failure_log_path, 'a') as f:
+        f.write('{"hash": "trunc')
+    spack.store.db.mark_failed(b)
+
+    other_db = spack.database.Database(spack.store.db.root)
+    failures = other_db._failures.failures()
+    assert sorted(failures) == sorted([a.full_hash(), b.full_hash()])
+    assert failures[a.full_hash()]['error'] == 'Build failed again'
+    assert failures[b.full_hash()]['error'] is None
+    assert other_db.prefix_failure_marked(a)
+
+    # Clearing a failure from another process compacts the log
+    other_db.clear_failure(a, force=True)
+    assert not spack.store.db.prefix_failure_marked(a)
+    assert spack.store.db.prefix_failure_marked(b)
+    with open(spack.store.db._failure_log_path) as f:
+        assert len(f.readlines()) == 1
+
+    spack.store.db.clear_all_failures()
+    assert not spack.store.db.prefix_failed(b)
+
+
+@pytest.mark.db
+def test_failure_log_imports_legacy_markers(mutable_database):
+    """Check that failures marked by older versions are not lost."""
+    a = spack.spec.Spec('a').concretized()
+    b = spack.spec.Spec('b').concretized()
+    db = spack.store.db
+    db.clear_all_failures()
+
+    # Markers of older versions are files named after the spec
+    fs.mkdirp(db._failure_dir)
+    for spec in (a, b):
+        fs.touch(os.path.join(
+            db._failure_dir, '{0}-{1}'.format(spec.name, spec.full_hash())))
+    assert db.prefix_failure_marked(a)
+    assert db.prefix_failure_marked(b)
+
+    # They are moved to the log when it is first written
+    db.clear_failure(a, force=True)
+    assert not os.path.exists(db._failure_dir)
+    assert not db.prefix_failure_marked(a)
+    assert db.prefix_failure_marked(b)
+    other_db = spack.database.Database(db.root)
+    assert sorted(other_db._failures.failures()) == [b.full_hash()]
+
+    db.clear_all_failures()
+    assert not db.prefix_failed(b)
+
+
 def test_prefix_read_lock_error(mutable_database, monkeypatch):
     """Cover the prefix read lock exception."""
     def _raise(db, spec):
@@ -894,3 +1011,539 @@ def _raise(db, spec):
     with pytest.raises(Exception):
         with spack.store.db.prefix_write_lock(s):
             assert False
+
+
+@pytest.fixture()
+def journaled_database(mutable_database, monkeypatch):
+    """Writeable database using the journaled write mode."""
+    monkeypatch.setattr(mutable_database, '_journal_enabled', True)
+    yield mutable_database
+
+
+def _db_state(database):
+    """Return the hashes of all records in the DB with their ref counts and
+    install status."""
+    with database.read_transaction():
+        return dict((k, (rec.ref_count, rec.installed, rec.explicit))
+                    for k, rec in database._data.items())
+
+
+def test_journal_appends_instead_of_rewriting(journaled_database):
+    with open(journaled_database._index_path) as f:
+        index_before = f.read()
+
+    _mock_remove('mpileaks ^zmpi')
+    _mock_install('cmake')
+    journaled_database.update_explicit(
+        journaled_database.query_one('callpath ^mpich'), True)
+
+    # Transactions only appended to the journal
+    with open(journaled_database._index_path) as f:
+        assert f.read() == index_before
+    with open(journaled_database._journal_path) as f:
+        assert len(f.readlines()) == 3
+
+    # A new process replays the journal on top of the index
+    expected = _db_state(journaled_database)
+    db = spack.database.Database(journaled_database.root)
+    assert _db_state(db) == expected
+    db._check_ref_counts()
+
+
+def test_journal_compaction(journaled_database, monkeypatch):
+    monkeypatch.setattr(journaled_database, '_journal_threshold', 3)
+
+    # The first transaction updates a couple of records and is journaled
+    journaled_database.update_explicit(
+        journaled_database.query_one('callpath ^mpich'), True)
+    assert os.path.exists(journaled_database._journal_path)
+
+    # Removing a root touches more records, which triggers a compaction
+    _mock_remove('mpileaks ^zmpi')
+    assert not os.path.exists(journaled_database._journal_path)
+    assert journaled_database._journal_entries == 0
+
+    expected = _db_state(journaled_database)
+    db = spack.database.Database(journaled_database.root)
+    assert _db_state(db) == expected
+
+
+def test_journal_incomplete_transaction_is_discarded(journaled_database):
+    _mock_remove('mpileaks ^zmpi')
+    expected = _db_state(journaled_database)
+
+    # Simulate a process killed while appending a transaction
+    with open(journaled_database._journal_path, 'a') as f:
+        f.write('[{"remove":"%s"' % next(iter(expected)))
+
+    db = spack.database.Database(journaled_database.root)
+    assert _db_state(db) == expected
+
+    # The next write compacts the journal, dropping the truncated line
+    with db.write_transaction():
+        pass
+    assert not os.path.exists(db._journal_path)
+
+    db = spack.database.Database(journaled_database.root)
+    assert _db_state(db) == expected
+
+
+def test_journal_replay_after_interrupted_compaction(journaled_database):
+    _mock_remove('mpileaks ^zmpi')
+    with open(journaled_database._journal_path) as f:
+        journal = f.read()
+
+    # Compact, then put back the journal as if the process died before
+    # removing it: replaying it again must not change the database.
+    with journaled_database.write_transaction():
+        journaled_database._journal_full_write = True
+    expected = _db_state(journaled_database)
+    with open(journaled_database._journal_path, 'w') as f:
+        f.write(journal)
+
+    db = spack.database.Database(journaled_database.root)
+    assert _db_state(db) == expected
+    db._check_ref_counts()
+
+
+@pytest.mark.parametrize('compacting_change', ['remove', 'mark'])
+def test_journal_skipped_after_interrupted_compaction(
+        journaled_database, monkeypatch, compacting_change):
+    _mock_install('cmake')
+    cmake = journaled_database.query_one('cmake')
+    assert os.path.exists(journaled_database._journal_path)
+
+    # The process dies after writing the compacted index, and before
+    # removing the journal that added cmake
+    remove = os.remove
+
+    def _crash_on_journal(path):
+        if path == journaled_database._journal_path:
+            raise KeyboardInterrupt()
+        remove(path)
+
+    monkeypatch.setattr(os, 'remove', _crash_on_journal)
+    with pytest.raises(KeyboardInterrupt):
+        with journaled_database.write_transaction():
+            journaled_database._journal_full_write = True
+            if compacting_change == 'remove':
+                journaled_database.remove(cmake)
+            else:
+                journaled_database.update_explicit(cmake, False)
+    monkeypatch.setattr(os, 'remove', remove)
+    assert os.path.exists(journaled_database._journal_path)
+
+    db = spack.database.Database(journaled_database.root)
+    state = _db_state(db)
+    if compacting_change == 'remove':
+        assert cmake.dag_hash() not in state
+    else:
+        assert state[cmake.dag_hash()] == (0, True, False)
+    db._check_ref_counts()
+
+    # Later transactions are journaled after the stale ones, and replayed
+    db._journal_enabled = True
+    mpileaks = db.query_one('mpileaks ^zmpi')
+    with db.write_transaction():
+        db.remove(mpileaks)
+    with open(db._journal_path) as f:
+        assert len(f.readlines()) == 2
+
+    db = spack.database.Database(journaled_database.root)
+    state = _db_state(db)
+    assert mpileaks.dag_hash() not in state
+    if compacting_change == 'remove':
+        assert cmake.dag_hash() not in state
+    else:
+        assert state[cmake.dag_hash()] == (0, True, False)
+    db._check_ref_counts()
+
+
+@pytest.fixture()
+def lazy_database(database, monkeypatch):
+    """Database reading specs lazily from its index."""
+    monkeypatch.setattr(database, '_lazy_specs', True)
+    database.last_seen_verifier = ''
+    with database.read_transaction():
+        pass
+    yield database
+    database.last_seen_verifier = ''
+
+
+def _materialized(database):
+    return set(k for k, rec in database._data.items()
+               if rec.spec_materialized)
+
+
+def test_lazy_read_builds_specs_on_demand(lazy_database):
+    assert not _materialized(lazy_database)
+
+    # Querying by name builds only the matching specs and their deps
+    results = lazy_database.query('mpileaks ^zmpi')
+    assert len(results) == 1
+    expected = set(s.dag_hash() for s in lazy_database.query('mpileaks'))
+    expected.update(s.dag_hash() for m in lazy_database.query('mpileaks')
+                    for s in m.traverse())
+    assert _materialized(lazy_database) == expected
+
+    # Lookups by hash build only the requested DAG
+    callpath = lazy_database.query_one('callpath ^mpich')
+    rec = lazy_database.get_record(callpath)
+    assert rec.spec is callpath
+
+
+def test_lazy_read_matches_eager_read(lazy_database, monkeypatch):
+    lazy = sorted(lazy_database.query(installed=any))
+    lazy_counts = dict((s.dag_hash(), lazy_database.get_record(s).ref_count)
+                       for s in lazy)
+    _check_merkleiness()
+
+    monkeypatch.setattr(lazy_database, '_lazy_specs', False)
+    lazy_database.last_seen_verifier = ''
+    eager = sorted(lazy_database.query(installed=any))
+    assert lazy == eager
+    assert all(lazy_database.get_record(s).ref_count == lazy_counts[h]
+               for h, s in ((s.dag_hash(), s) for s in eager))
+
+
+def test_lazy_read_installed_dependents(lazy_database):
+    dependents = lazy_database.installed_relatives(
+        'libelf', direction='parents', transitive=False)
+    assert set(s.name for s in dependents) == set(['libdwarf', 'dyninst'])
+    assert len(_materialized(lazy_database)) < len(lazy_database._data)
+
+
+def test_lazy_read_write_unmaterialized(mutable_database, monkeypatch):
+    monkeypatch.setattr(mutable_database, '_lazy_specs', True)
+    expected = _db_state(mutable_database)
+    with open(mutable_database._index_path) as f:
+        installs = json.load(f)['database']['installs']
+
+    # Records that were never built are written back as they were read
+    mutable_database.update_explicit(
+        mutable_database.query_one('callpath ^mpich'), True)
+    assert len(_materialized(mutable_database)) < len(mutable_database._data)
+
+    with open(mutable_database._index_path) as f:
+        new_installs = json.load(f)['database']['installs']
+    assert sorted(new_installs) == sorted(installs)
+    for key, rec in installs.items():
+        assert new_installs[key]['spec'] == rec['spec']
+
+    mutable_database.last_seen_verifier = ''
+    new_state = _db_state(mutable_database)
+    assert [h for h in expected if new_state[h] != expected[h]] == [
+        mutable_database.query_one('callpath ^mpich').dag_hash()]
+
+
+def _check_indexes(database):
+    """Ensure the secondary indexes are consistent with the records."""
+    with database.read_transaction():
+        records = dict(database._data.items())
+
+        by_name = {}
+        for key, rec in records.items():
+            by_name.setdefault(rec.spec.name, set()).add(key)
+        explicit = set(k for k, rec in records.items() if rec.explicit)
+
+        dependents = {}
+        for key, rec in records.items():
+            for name, dspec in rec.spec._dependencies.items():
+                dependents.setdefault(dspec.spec.dag_hash(), {})[key] = tuple(
+                    dspec.deptypes)
+
+        if database._sqlite is None:
+            assert database._by_name == by_name
+            assert database._explicit_hashes == explicit
+            assert database._dependents == dependents
+            assert database._sorted_hashes in (None, sorted(records))
+
+        for name, keys in by_name.items():
+            assert database._hashes_for_name(name) == keys
+        assert database._explicit_keys() == explicit
+        for key in set(records) | set(dependents):
+            assert database._dependents_edges(key) == dependents.get(key, {})
+
+
+def test_secondary_indexes(mutable_database):
+    with mutable_database.read_transaction():
+        _check_indexes(mutable_database)
+
+    # The sorted hashes are kept up to date once built
+    mutable_database.get_by_hash_local('a')
+    sorted_hashes = mutable_database._sorted_hashes
+    assert sorted_hashes == sorted(mutable_database._data)
+
+    _mock_remove('mpileaks ^zmpi')
+    _check_indexes(mutable_database)
+
+    _mock_install('cmake')
+    _check_indexes(mutable_database)
+
+    callpath = mutable_database.query_one('callpath ^mpich')
+    mutable_database.update_explicit(callpath, True)
+    _check_indexes(mutable_database)
+    assert callpath in mutable_database.query(explicit=True)
+
+    mutable_database.mark(callpath, 'explicit', False)
+    _check_indexes(mutable_database)
+    assert callpath not in mutable_database.query(explicit=True)
+    assert mutable_database._sorted_hashes is sorted_hashes
+
+    spack.store.store.reindex()
+    _check_indexes(mutable_database)
+
+
+def test_query_by_hash_prefix(database):
+    for spec in database.query(installed=any):
+        dag_hash = spec.dag_hash()
+        matches = database.get_by_hash_local(dag_hash[:7])
+        assert spec in matches
+        assert all(s.dag_hash().startswith(dag_hash[:7]) for s in matches)
+
+    assert database.get_by_hash_local('zzzzzzz') is None
+
+
+@pytest.mark.parametrize('transitive', [True, False])
+def test_installed_dependents_from_index(database, transitive):
+    all_specs = database.query(installed=any)
+    for spec in all_specs:
+        # Links from dependencies to dependents in specs are stored by name,
+        # so compute the expected result from the dependencies instead.
+        expected = set()
+        for other in database.query():
+            if transitive:
+                deps = other.traverse(root=False)
+            else:
+                deps = other.dependencies()
+            if any(d.dag_hash() == spec.dag_hash() for d in deps):
+                expected.add(other)
+
+        relatives = database.installed_relatives(
+            spec, direction='parents', transitive=transitive)
+        assert relatives == expected
+
+
+def test_installed_dependents_missing_from_db(mutable_database):
+    callpath = mutable_database.query_one('callpath ^mpich')
+    mpich = mutable_database.query_one('mpich')
+
+    # A dependent in the index without an install record
+    with mutable_database.write_transaction():
+        mutable_database._dependents[mpich.dag_hash()]['x' * 32] = ('link',)
+        relatives = mutable_database.installed_relatives(
+            mpich, direction='parents', transitive=False)
+        assert callpath in relatives
+
+        mutable_database._fail_when_missing_deps = True
+        with pytest.raises(spack.database.MissingDependenciesError):
+            mutable_database.installed_relatives(
+                mpich, direction='parents', transitive=False)
+        mutable_database._fail_when_missing_deps = False
+
+
+@pytest.fixture()
+def sqlite_database(mutable_database, monkeypatch):
+    """Writeable database using the SQLite storage."""
+    if not spack.database._use_sqlite:
+        pytest.skip('sqlite3 is not available')
+    monkeypatch.setattr(mutable_database, '_storage', 'sqlite')
+    mutable_database.last_seen_verifier = ''
+    yield mutable_database
+
+
+def test_sqlite_migration_from_json(sqlite_database):
+    expected = _db_state(sqlite_database)
+    assert os.path.exists(sqlite_database._sqlite_path)
+
+    # The JSON index is moved out of the way
+    assert not os.path.exists(sqlite_database._index_path)
+    assert os.path.exists(sqlite_database._index_path + '.migrated')
+
+    with spack.config.override('config:db_storage', 'sqlite'):
+        db = spack.database.Database(sqlite_database.root)
+    assert _db_state(db) == expected
+
+
+def test_sqlite_writes_seen_by_all_readers(sqlite_database):
+    sqlite_database.query()
+    _mock_install('cmake')
+    cmake = sqlite_database.query_one('cmake')
+
+    def upstream_state(upstream_db):
+        # Upstream databases can't take locks: read them directly
+        upstream_db._refresh()
+        return dict((k, (rec.ref_count, rec.installed, rec.explicit))
+                    for k, rec in upstream_db._data.items())
+
+    # Databases configured for JSON storage, and upstream databases, read
+    # a migrated database from SQLite
+    json_db = spack.database.Database(sqlite_database.root)
+    upstream_db = spack.database.Database(
+        sqlite_database.root, is_upstream=True)
+    upstream_db._read()
+    expected = _db_state(sqlite_database)
+    assert _db_state(json_db) == expected
+    assert upstream_state(upstream_db) == expected
+    assert cmake.dag_hash() in expected
+
+    # ...and see the writes of each other
+    json_db.update_explicit(cmake, False)
+    assert not os.path.exists(sqlite_database._index_path)
+    expected = _db_state(json_db)
+    assert not expected[cmake.dag_hash()][2]
+    assert _db_state(sqlite_database) == expected
+    assert upstream_state(upstream_db) == expected
+
+
+def test_sqlite_writes_modified_rows(sqlite_database):
+    sqlite_database.query()
+    migrated_path = sqlite_database._index_path + '.migrated'
+    with open(migrated_path) as f:
+        index_before = f.read()
+
+    _mock_remove('mpileaks ^zmpi')
+    _mock_install('cmake')
+    sqlite_database.update_explicit(
+        sqlite_database.query_one('callpath ^mpich'), True)
+    _check_indexes(sqlite_database)
+
+    # The migrated JSON index is left untouched
+    assert not os.path.exists(sqlite_database._index_path)
+    with open(migrated_path) as f:
+        assert f.read() == index_before
+
+    expected = _db_state(sqlite_database)
+    with spack.config.override('config:db_storage', 'sqlite'):
+        db = spack.database.Database(sqlite_database.root)
+    assert _db_state(db) == expected
+    db._check_ref_counts()
+
+    # Rows are queryable directly
+    import sqlite3
+    conn = sqlite3.connect(db._sqlite_path)
+    names = [r[0] for r in conn.execute(
+        "SELECT name FROM installs WHERE explicit = 1 AND installed = 1")]
+    conn.close()
+    assert sorted(names) == sorted(
+        s.name for s in db.query(explicit=True))
+
+
+def test_sqlite_reindex(sqlite_database):
+    expected = _db_state(sqlite_database)
+    spack.store.store.reindex()
+    assert _db_state(sqlite_database) == expected
+
+    with spack.config.override('config:db_storage', 'sqlite'):
+        db = spack.database.Database(sqlite_database.root)
+    assert _db_state(db) == expected
+
+
+def test_sqlite_queries_use_indexes(sqlite_database):
+    sqlite_database.query()
+    conn = sqlite_database._sqlite.lock.connection
+    indexes = set(r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"))
+    assert set(['installs_name', 'installs_path', 'installs_explicit',
+                'dependencies_dependent']) <= indexes
+
+    plan = ' '.join(str(r) for r in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT hash, record FROM installs '
+        'WHERE name = ?', ('mpileaks',)))
+    assert 'installs_name' in plan
+
+    # Queries only read the records they match
+    db = spack.database.Database(sqlite_database.root)
+    libelf = db.query('libelf')
+    assert set(db._sqlite._cache) == set(s.dag_hash() for s in libelf)
+    assert db.get_record('libelf').spec == libelf[0]
+    assert len(db._sqlite._cache) < len(db.query(installed=any))
+
+
+def test_sqlite_transactions_leave_lock_file(sqlite_database, monkeypatch):
+    sqlite_database.query()
+
+    def lock_file_used(*args, **kwargs):
+        raise AssertionError('the database lock file was used')
+
+    monkeypatch.setattr(sqlite_database.lock, 'acquire_read', lock_file_used)
+    monkeypatch.setattr(sqlite_database.lock, 'acquire_write', lock_file_used)
+    _mock_install('cmake')
+    cmake = sqlite_database.query_one('cmake')
+    assert cmake
+
+    # Readers keep a consistent snapshot, and don't hold back writers
+    reader = spack.database.Database(sqlite_database.root)
+    with reader.read_transaction():
+        assert reader.query('cmake') == [cmake]
+        _mock_remove('cmake')
+        assert not sqlite_database.query('cmake')
+        assert reader.query('cmake') == [cmake]
+    assert not reader.query('cmake')
+
+    # Errors roll back the write transaction
+    with pytest.raises(Exception):
+        with sqlite_database.write_transaction():
+            _mock_remove('mpileaks ^zmpi')
+            raise Exception()
+    assert len(reader.query('mpileaks ^zmpi')) == 1
+    assert len(sqlite_database.query('mpileaks ^zmpi')) == 1
+
+
+@pytest.fixture()
+def snapshot_database(mutable_database, monkeypatch, tmpdir):
+    """Database caching snapshots of its index in a temporary misc cache."""
+    monkeypatch.setattr(
+        spack.caches, 'misc_cache', FileCache(str(tmpdir.join('cache'))))
+    monkeypatch.setattr(mutable_database, '_use_snapshot', True)
+    mutable_database.last_seen_verifier = ''
+    yield mutable_database
+
+
+def test_snapshot_cache(snapshot_database):
+    expected = _db_state(snapshot_database)
+    snapshot = spack.database._IndexSnapshot(snapshot_database._index_path)
+    assert os.path.exists(spack.caches.misc_cache.cache_path(snapshot.key))
+
+    # On a hit the index is not parsed
+    def _fail(*args, **kwargs):
+        raise AssertionError('index.json should not be parsed')
+
+    # monkeypatch.context() is not available in the vendored pytest, and
+    # monkeypatch.undo() would also revert the patches of the fixture.
+    load = spack.util.spack_json.load
+    spack.util.spack_json.load = _fail
+    try:
+        snapshot_database.last_seen_verifier = ''
+        assert _db_state(snapshot_database) == expected
+    finally:
+        spack.util.spack_json.load = load
+
+    # After a change of the index, the snapshot is not used anymore
+    _mock_remove('mpileaks ^zmpi')
+    expected = _db_state(snapshot_database)
+    assert snapshot.load() is None
+
+    snapshot_database.last_seen_verifier = ''
+    assert _db_state(snapshot_database) == expected
+    assert snapshot.load() is not None
+
+
+class _RunsCode(object):
+    def __reduce__(self):
+        return (os.mkdir, ('pickle-payload-ran',))
+
+
+def test_snapshot_cache_holds_data_only(snapshot_database, tmpdir):
+    _db_state(snapshot_database)
+    snapshot = spack.database._IndexSnapshot(snapshot_database._index_path)
+    path = spack.caches.misc_cache.cache_path(snapshot.key)
+    with open(path, 'rb') as f:
+        assert spack.util.spack_binary.is_binary(f.read())
+
+    # Anything else in the cache is ignored, without being run
+    with open(path, 'wb') as f:
+        pickle.dump((snapshot._signature(), _RunsCode()), f)
+    with tmpdir.as_cwd():
+        assert snapshot.load() is None
+        assert not os.path.exists('pickle-payload-ran')
@@ -11,10 +11,16 @@
 
 import pytest
 
+import spack.config
+import spack.directory_layout
+import spack.hash_types
 import spack.paths
 import spack.repo
+import spack.spec
+import spack.util.spack_binary
 from spack.directory_layout import (
     InvalidDirectoryLayoutParametersError,
+    SpecReadError,
     YamlDirectoryLayout,
 )
 from spack.spec import Spec
@@ -154,6 +160,83 @@ def test_read_and_write_spec(temporary_store, config, mock_packages):
         assert not os.path.exists(install_dir)
 
 
+def test_read_and_write_binary_spec(temporary_store, config, mock_packages):
+    layout = temporary_store.layout
+    spec = Spec('mpileaks').concretized()
+
+    with spack.config.override('config:binary_specs', True):
+        layout.create_install_directory(spec)
+
+    # The spec file stays YAML, with a binary copy next to it
+    spec_path = layout.spec_file_path(spec)
+    binary_path = spack.directory_layout.binary_spec_path(spec_path)
+    assert binary_path == os.path.join(os.path.dirname(spec_path), 'spec.bin')
+    with open(binary_path, 'rb') as f:
+        data = f.read()
+    assert spack.util.spack_binary.is_binary(data)
+    assert Spec.from_binary(data).full_hash() == spec.full_hash()
+    with open(spec_path) as f:
+        assert Spec.from_yaml(f).full_hash() == spec.full_hash()
+    assert spack.spec.parse(spec_path)[0].full_hash() == spec.full_hash()
+
+    # Binary spec files are read whatever the configuration is
+    spec_from_file = layout.read_spec(spec_path)
+    expected = spec.copy(deps=spack.hash_types.full_hash)
+    assert spec_from_file.concrete
+    assert expected.eq_dag(spec_from_file)
+    assert spec_from_file.full_hash() == spec.full_hash()
+    assert [spec_from_file] == layout.all_specs()
+
+    # Without the setting, the binary copy is removed when rewriting
+    layout.write_spec(spec, spec_path)
+    assert not os.path.exists(binary_path)
+
+
+def test_binary_spec_from_other_python(
+        temporary_store, config, mock_packages):
+    layout = temporary_store.layout
+    spec = Spec('libelf').concretized()
+    with spack.config.override('config:binary_specs', True):
+        layout.create_install_directory(spec)
+
+    # Binary data written by another Python falls back to the YAML file
+    binary_path = spack.directory_layout.binary_spec_path(
+        layout.spec_file_path(spec))
+    with open(binary_path, 'rb') as f:
+        data = bytearray(f.read())
+    data[len(spack.util.spack_binary.magic)] += 1
+    with open(binary_path, 'wb') as f:
+        f.write(data)
+
+    spec_from_file = layout.read_spec(layout.spec_file_path(spec))
+    assert spec_from_file.full_hash() == spec.full_hash()
+    assert [s.full_hash() for s in layout.all_specs()] == [spec.full_hash()]
+
+
+def test_binary_spec_older_than_yaml(temporary_store, config, mock_packages):
+    layout = temporary_store.layout
+    spec = Spec('libelf').concretized()
+    with spack.config.override('config:binary_specs', True):
+        layout.create_install_directory(spec)
+
+    # The YAML spec file is rewritten by a Spack that doesn't write binary
+    # copies, leaving a stale one behind
+    spec_path = layout.spec_file_path(spec)
+    binary_path = spack.directory_layout.binary_spec_path(spec_path)
+    other = Spec('libelf@0.8.12').concretized()
+    with open(spec_path, 'w') as f:
+        other.to_yaml(f, hash=spack.hash_types.full_hash)
+    mtime = os.stat(binary_path).st_mtime
+    os.utime(spec_path, (mtime + 1, mtime + 1))
+
+    assert layout.read_spec(spec_path).full_hash() == other.full_hash()
+    assert [s.full_hash() for s in layout.all_specs()] == [other.full_hash()]
+
+    # The binary copy is used again once it is up to date
+    os.utime(binary_path, (mtime + 2, mtime + 2))
+    assert layout.read_spec(spec_path).full_hash() == spec.full_hash()
+
+
 def test_handle_unknown_package(temporary_store, config, mock_packages):
     """This test ensures that spack can at least do *some*
     operations with packages that are installed but that it
@@ -226,6 +309,61 @@ def test_find(temporary_store, config, mock_packages):
         assert found_specs[name].eq_dag(spec)
 
 
+def test_find_in_parallel(temporary_store, config, mock_packages,
+                          monkeypatch):
+    """Test that reading spec files in parallel gives the same specs, in the
+    same order, as reading them serially."""
+    layout = temporary_store.layout
+    for pkg in list(spack.repo.path.all_packages())[:max_packages]:
+        if not pkg.name.startswith('external'):
+            layout.create_install_directory(pkg.spec.concretized())
+
+    # A prefix without a spec file is skipped
+    os.makedirs(os.path.join(layout.root, 'stale', 'prefix', 'dir'))
+
+    serial_specs = layout.all_specs(jobs=1)
+    monkeypatch.setattr(spack.directory_layout, 'parallel_read_threshold', 1)
+    parallel_specs = layout.all_specs(jobs=2)
+
+    assert len(parallel_specs) == len(serial_specs) > 1
+    for serial, parallel in zip(serial_specs, parallel_specs):
+        assert serial.eq_dag(parallel)
+        assert serial.dag_hash() == parallel.dag_hash()
+        assert parallel.concrete
+
+
+def test_find_reports_invalid_spec_files(temporary_store, config,
+                                         mock_packages, monkeypatch):
+    """Test that parse errors in worker processes are reported."""
+    layout = temporary_store.layout
+    spec = Spec('libelf').concretized()
+    layout.create_install_directory(spec)
+    with open(layout.spec_file_path(spec), 'w') as f:
+        f.write('spec: [unclosed')
+
+    monkeypatch.setattr(spack.directory_layout, 'parallel_read_threshold', 1)
+    with spack.config.override('config:debug', False):
+        with pytest.raises(SpecReadError):
+            layout.all_specs(jobs=2)
+
+
+def test_find_skips_files_in_layout(temporary_store, config, mock_packages):
+    """Test that files at the depth of the prefixes are not read as
+    prefixes, like the gpg keys below the default install root."""
+    layout = temporary_store.layout
+    spec = Spec('libelf').concretized()
+    layout.create_install_directory(spec)
+
+    keys = os.path.join(layout.root, 'gpg', 'private-keys-v1.d')
+    os.makedirs(keys)
+    with open(os.path.join(keys, 'stray.key'), 'w') as f:
+        f.write('not a prefix')
+
+    assert [s.dag_hash() for s in layout.all_specs()] == [spec.dag_hash()]
+    assert spack.directory_layout._read_spec_data(
+        os.path.join(keys, 'stray.key', '.spack', 'spec.yaml')) == (None, None)
+
+
 def test_yaml_directory_layout_build_path(tmpdir, config):
     """This tests build path method."""
     spec = Spec('python')
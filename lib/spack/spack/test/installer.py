@@ -546,7 +546,9 @@ def test_clear_failures_success(install_mockery):
         tty.warn('Failed to write lock the test install failure')
     spack.store.db._prefix_failures['test'] = lock
 
-    # Set up a fake failure mark (or file)
+    # Set up a fake failure mark, and one left by an older version
+    spack.store.db._failures.add('test', 'test', 'Mock failure')
+    fs.mkdirp(spack.store.db._failure_dir)
     fs.touch(os.path.join(spack.store.db._failure_dir, 'test'))
 
     # Now clear failure tracking
@@ -554,10 +556,11 @@ def test_clear_failures_success(install_mockery):
 
     # Ensure there are no cached failure locks or failure marks
     assert len(spack.store.db._prefix_failures) == 0
-    assert len(os.listdir(spack.store.db._failure_dir)) == 0
+    assert spack.store.db._failures.failures() == {}
+    assert not os.path.exists(spack.store.db._failure_log_path)
+    assert not os.path.exists(spack.store.db._failure_dir)
 
-    # Ensure the core directory and failure lock file still exist
-    assert os.path.isdir(spack.store.db._failure_dir)
+    # Ensure the failure lock file still exists
     assert os.path.isfile(spack.store.db.prefix_fail_path)
 
 
@@ -569,8 +572,8 @@ def test_clear_failures_errs(install_mockery, monkeypatch, capsys):
     def _raise_except(path):
         raise OSError(err_msg)
 
-    # Set up a fake failure mark (or file)
-    fs.touch(os.path.join(spack.store.db._failure_dir, 'test'))
+    # Set up a fake failure mark
+    spack.store.db._failures.add('test', 'test')
 
     monkeypatch.setattr(os, 'remove', _raise_except)
 
@@ -658,6 +661,48 @@ def test_check_deps_status_upstream(install_mockery, monkeypatch):
     assert list(installer.installed)[0].startswith('b')
 
 
+def test_check_deps_status_reads_db_after_locking(
+        install_mockery, monkeypatch):
+    const_arg = installer_args(['dependent-install'], {})
+    installer = create_installer(const_arg)
+    request = installer.build_requests[0]
+
+    events = []
+    ensure_locked = inst.PackageInstaller._ensure_locked
+    query_by_hashes = spack.database.Database.query_by_hashes
+
+    def _ensure_locked(installer, lock_type, pkg):
+        events.append('lock ' + pkg.name)
+        return ensure_locked(installer, lock_type, pkg)
+
+    def _query_by_hashes(db, hashes):
+        events.append('query')
+        return query_by_hashes(db, hashes)
+
+    monkeypatch.setattr(inst.PackageInstaller, '_ensure_locked',
+                        _ensure_locked)
+    monkeypatch.setattr(spack.database.Database, 'query_by_hashes',
+                        _query_by_hashes)
+    installer._check_deps_status(request)
+
+    # The install status is only read once the dependencies are locked
+    assert events == ['lock dependency-install', 'query']
+
+
+def test_check_deps_status_queries_db_once(install_mockery, monkeypatch):
+    const_arg = installer_args(['dependent-install'], {})
+    installer = create_installer(const_arg)
+    request = installer.build_requests[0]
+
+    def _get_record(db, spec, **kwargs):
+        raise AssertionError('{0} looked up again'.format(spec.name))
+
+    # Dependencies missing from the bulk query are not looked up one by one
+    monkeypatch.setattr(spack.database.Database, 'get_record', _get_record)
+    installer._check_deps_status(request)
+    assert not installer.installed
+
+
 def test_add_bootstrap_compilers(install_mockery, monkeypatch):
     from collections import defaultdict
 
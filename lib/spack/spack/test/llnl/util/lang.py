@@ -150,8 +150,47 @@ def test_load_modules_from_file(module_path):
     assert foo.path == os.path.join('/usr', 'bin')
 
 
+def test_object_wrapper_with_slots():
+    class Slotted(object):
+        __slots__ = ('value', '__dict__')
+
+    class Wrapper(llnl.util.lang.ObjectWrapper):
+        def __init__(self, wrapped, query):
+            super(Wrapper, self).__init__(wrapped)
+            self.query = query
+
+    obj = Slotted()
+    obj.value = 1
+    obj.other = 2
+
+    wrapper = Wrapper(obj, 'query')
+    assert isinstance(wrapper, Slotted) and isinstance(wrapper, Wrapper)
+    assert (wrapper.value, wrapper.other, wrapper.query) == (1, 2, 'query')
+
+    # Attributes in __dict__ are shared with the wrapped object
+    wrapper.other = 3
+    assert obj.other == 3
+
+
 def test_uniq():
     assert [1, 2, 3] == llnl.util.lang.uniq([1, 2, 3])
     assert [1, 2, 3] == llnl.util.lang.uniq([1, 1, 1, 1, 2, 2, 2, 3, 3])
     assert [1, 2, 1] == llnl.util.lang.uniq([1, 1, 1, 1, 2, 2, 2, 1, 1])
     assert [] == llnl.util.lang.uniq([])
+
+
+def test_lru_cache():
+    cache = llnl.util.lang.LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache.get('a') == 1
+
+    # 'b' is now the least recently used item
+    cache['c'] = 3
+    assert 'b' not in cache and cache.get('b', 'missing') == 'missing'
+    assert len(cache) == 2 and cache.get('a') == 1 and cache.get('c') == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
@@ -40,11 +40,10 @@
 php_line_patched = "<?php #!/this/" + ('x' * too_long) + "/is/php\n"
 php_line_patched2 = "?>\n"
 
-sbang_line = '#!/bin/sh %s/bin/sbang\n' % spack.store.store.unpadded_root
 last_line  = "last!\n"
 
 
-@pytest.fixture  # type: ignore[no-redef]
+@pytest.fixture
 def sbang_line():
     yield '#!/bin/sh %s/bin/sbang\n' % spack.store.layout.root
 
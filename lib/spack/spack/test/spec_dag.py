@@ -11,6 +11,7 @@
 import spack.error
 import spack.package
 import spack.util.hash as hashutil
+import spack.version
 from spack.dependency import Dependency, all_deptypes, canonical_deptype
 from spack.spec import Spec
 from spack.util.mock_package import MockPackageMultiRepo
@@ -292,6 +293,42 @@ def test_postorder_path_traversal(self):
         traversal = dag.traverse(cover='paths', depth=True, order='post')
         assert [(x, y.name) for x, y in traversal] == pairs
 
+    def test_breadth_first_node_traversal(self):
+        dag = Spec('mpileaks ^zmpi')
+        dag.normalize()
+
+        names = ['mpileaks', 'callpath', 'zmpi', 'dyninst', 'fake',
+                 'libdwarf', 'libelf']
+        pairs = list(zip([0, 1, 1, 2, 2, 3, 3], names))
+
+        traversal = dag.traverse(order='breadth')
+        assert [x.name for x in traversal] == names
+
+        traversal = dag.traverse(depth=True, order='breadth')
+        assert [(x, y.name) for x, y in traversal] == pairs
+
+    def test_breadth_first_edge_traversal(self):
+        dag = Spec('mpileaks ^zmpi')
+        dag.normalize()
+
+        names = ['mpileaks', 'callpath', 'zmpi', 'dyninst', 'zmpi', 'fake',
+                 'libdwarf', 'libelf', 'libelf']
+        pairs = list(zip([0, 1, 1, 2, 2, 2, 3, 3, 4], names))
+
+        traversal = dag.traverse(cover='edges', depth=True, order='breadth')
+        assert [(x, y.name) for x, y in traversal] == pairs
+
+    def test_deep_traversal(self):
+        # Deeper than the recursion limit
+        nodes = [Spec('node{0}'.format(i)) for i in range(2000)]
+        for parent, child in zip(nodes, nodes[1:]):
+            parent._add_dependency(child, ('build', 'link'))
+
+        assert list(nodes[0].traverse()) == nodes
+        assert list(nodes[0].traverse(order='post')) == nodes[::-1]
+        assert list(nodes[-1].traverse(direction='parents')) == nodes[::-1]
+        assert list(nodes[0].traverse(deptype='run')) == nodes[:1]
+
     def test_conflicting_spec_constraints(self):
         mpileaks = Spec('mpileaks ^mpich ^callpath ^dyninst ^libelf ^libdwarf')
 
@@ -618,6 +655,33 @@ def test_copy_concretized(self):
         copy_ids = set(id(s) for s in copy.traverse())
         assert not orig_ids.intersection(copy_ids)
 
+    def test_copy_concretized_shares_fields(self):
+        orig = Spec('mpileaks')
+        orig.concretize()
+        copy = orig.copy()
+
+        # Concrete nodes share the fields they are not modified through
+        for s, c in zip(orig.traverse(), copy.traverse()):
+            assert c.versions is s.versions
+            assert c.architecture is s.architecture
+            assert c.compiler is s.compiler
+            assert all(c.variants[v] is s.variants[v] for v in s.variants)
+            assert c.variants is not s.variants
+            assert c.variants.spec is c
+
+        # ...until they are marked abstract and may be constrained
+        copy._mark_concrete(False)
+        copy.versions.intersect(spack.version.ver('2.2'))
+        copy.variants['debug'].value = 'true'
+        copy.architecture.os = 'fake_os'
+        copy.compiler.versions.intersect(spack.version.ver('10'))
+
+        assert orig.concrete and orig.satisfies(str(orig))
+        assert orig.versions != copy.versions
+        assert orig.variants != copy.variants
+        assert orig.architecture != copy.architecture
+        assert orig.compiler != copy.compiler
+
     """
     Here is the graph with deptypes labeled (assume all packages have a 'dt'
     prefix). Arrows are marked with the deptypes ('b' for 'build', 'l' for
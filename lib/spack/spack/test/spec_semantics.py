@@ -10,6 +10,9 @@
 import spack.architecture
 import spack.directives
 import spack.error
+import spack.paths
+import spack.repo
+import spack.spec
 from spack.error import SpecError, UnsatisfiableSpecError
 from spack.spec import (
     Spec,
@@ -863,6 +866,24 @@ def test_spec_formatting_escapes(self):
             with pytest.raises(SpecFormatStringError):
                 spec.format(fmt_str)
 
+    def test_spec_formatting_compiled_once(self):
+        fmt = r'{name}{@version} \{{hash:7}\} {variants.shared}'
+        first, second = Spec('libelf'), Spec('mpileaks+shared')
+        first.concretize()
+        second.concretize()
+
+        assert first.format(fmt) == '{0}@{1} {{{2}}}'.format(
+            first.name, first.version, first.dag_hash(7))
+        assert second.format(fmt) == '{0}@{1} {{{2}}} +shared'.format(
+            second.name, second.version, second.dag_hash(7))
+        assert (fmt,) in spack.spec._compile_format.cache
+
+        # Colors and transforms are applied when formatting
+        assert first.format('{name}', transform={
+            'name': lambda s, x: x.upper()}) == 'LIBELF'
+        assert first.format('{@version}', color=True) == \
+            '\x1b[0;36m@{0}\x1b[0m'.format(first.version)
+
     def test_spec_deprecated_formatting(self):
         spec = Spec("libelf cflags=-O2")
         spec.concretize()
@@ -1135,3 +1156,28 @@ def test_is_extension_after_round_trip_to_dict(config, spec_str):
     # Using 'y' since the round-trip make us lose build dependencies
     for d in y.traverse():
         assert x[d.name].package.is_extension == y[d.name].package.is_extension
+
+
+@pytest.mark.parametrize('constraint,expected', [
+    ('mpileaks ^mpich', True),
+    ('mpileaks ^mpi@1:', True),
+    ('^callpath ^libelf', True),
+    ('mpileaks ^zmpi', False),
+    ('mpileaks ^fake', False),
+    ('mpileaks ^mpich@:1', False),
+])
+def test_satisfies_cache(mock_packages, config, constraint, expected):
+    s = Spec('mpileaks ^mpich').concretized()
+    cache = spack.spec._satisfies_cache()
+    cache.clear()
+
+    # The string and the parsed constraint are cached separately
+    for other in (constraint, Spec(constraint)):
+        assert s.satisfies(other, strict=True) is expected
+        assert s.satisfies(other, strict=True) is expected
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # Different repositories may have different virtual packages
+    with spack.repo.use_repositories(spack.paths.mock_packages_path):
+        assert not spack.spec._satisfies_cache()
+        assert s.satisfies(constraint, strict=True) is expected
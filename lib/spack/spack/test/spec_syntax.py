@@ -10,11 +10,14 @@
 
 import llnl.util.filesystem as fs
 
+import spack.architecture
 import spack.hash_types as ht
+import spack.parse
 import spack.repo
 import spack.spec as sp
 import spack.store
 from spack.parse import Token
+from spack.platforms.test import Test
 from spack.spec import (
     AmbiguousHashError,
     DuplicateArchitectureError,
@@ -810,6 +813,55 @@ def test_kv_with_spaces(self):
     def test_target_tokenization(self, expected_tokens, spec_string):
         self.check_lex(expected_tokens, spec_string)
 
+    @pytest.mark.parametrize('spec_string', [
+        'mvapich_foo^_openmpi@1.2:1.4,1.6%intel@12.1:12.6+debug-qt_4',
+        'mvapich_foo debug= 4 ^ _openmpi @1.2 : 1.4 , 1.6 % intel @ 12.1',
+        'cflags="-O3 -g" ldflags=  -lfoo target=:broadwell,icelake',
+        'libdwarf^../libelf.yaml /abc123 subdir/spec.yamlfoo',
+        'builtin.yaml foo=bar=baz os= fe',
+        'foo cflags="a\nb" +bar',
+    ])
+    def test_lex_matches_scanners(self, spec_string):
+        """SpecLexer.lex() must agree with the reference regex scanners."""
+        words = shlex.split(spec_string)
+        expected = spack.parse.Lexer.lex(sp.SpecLexer(), words)
+        tokens = sp.SpecLexer().lex(words)
+        assert [(t.type, t.value, t.start, t.end) for t in tokens] == \
+            [(t.type, t.value, t.start, t.end) for t in expected]
+
+    def test_lex_invalid_character(self):
+        with pytest.raises(spack.parse.LexError) as exc_info:
+            sp.SpecLexer().lex(['foo@1.2', 'bar$'])
+        assert exc_info.value.string == 'bar$'
+        assert exc_info.value.pos == 3
+
+    def test_parse_cache_returns_copies(self):
+        first = Spec('mpileaks@2.3 +debug ^mpich cflags=-O3 arch=test-fe-fe')
+        second = Spec('mpileaks@2.3 +debug ^mpich cflags=-O3 arch=test-fe-fe')
+        assert first == second and first is not second
+        assert first['mpich'] is not second['mpich']
+
+        # Changes to a parsed spec are not seen by later parses
+        first.variants['debug'].value = False
+        first['mpich'].constrain('@1.0')
+        first['mpich'].architecture.target = 'be'
+        third = Spec('mpileaks@2.3 +debug ^mpich cflags=-O3 arch=test-fe-fe')
+        assert third == second and third.eq_dag(second)
+
+    @pytest.mark.parametrize('spec_string', [
+        '^dev_path=*', 'foo ^foo', 'mpileaks ^@1.0'
+    ])
+    def test_parse_cache_with_unnamed_nodes(self, spec_string):
+        specs = [Spec(spec_string) for _ in range(3)]
+        assert all(s.eq_dag(specs[0]) for s in specs)
+        assert str(specs[-1]) == str(sp.parse(spec_string)[0])
+
+    def test_parse_cache_checks_platform(self):
+        Spec('mpileaks os=fe')
+        with spack.architecture.use_platform(Test()) as platform:
+            Spec('mpileaks os=fe')
+            assert sp._parsed_specs.get('mpileaks os=fe')[0] is platform
+
     @pytest.mark.regression('20310')
     def test_compare_abstract_specs(self):
         """Spec comparisons must be valid for abstract specs.
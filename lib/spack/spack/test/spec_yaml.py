@@ -18,6 +18,7 @@
 import spack.architecture
 import spack.hash_types as ht
 import spack.spec
+import spack.util.hash
 import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 import spack.version
@@ -86,6 +87,50 @@ def test_yaml_subdag(config, mock_packages):
         assert spec[dep].eq_dag(yaml_spec[dep])
 
 
+def test_yaml_shares_concrete_node_fields(config, mock_packages):
+    spec = Spec('mpileaks^mpich+debug')
+    spec.concretize()
+    first = Spec.from_yaml(spec.to_yaml())
+    second = Spec.from_yaml(spec.to_yaml())
+
+    assert first.architecture is second['callpath'].architecture
+    assert first.compiler is second['callpath'].compiler
+    assert first.versions[0] is second.versions[0]
+    assert first.eq_dag(spec) and second.eq_dag(spec)
+
+    # Specs marked abstract stop sharing the fields they may modify
+    first._mark_concrete(False)
+    first.architecture.os = 'redhat6'
+    first.compiler.versions.add(spack.version.ver('1.0'))
+    assert second.architecture == spec.architecture
+    assert second.compiler == spec.compiler
+
+
+def test_interned_nodes_are_shared_between_specs(config, mock_packages):
+    mpileaks = Spec('mpileaks^mpich+debug')
+    mpileaks.concretize()
+    callpath = mpileaks['callpath'].copy()
+    data = [s.to_dict(hash=ht.build_hash) for s in (callpath, mpileaks)]
+
+    def nodes(spec):
+        return dict((s.name, s) for s in spec.traverse())
+
+    with spack.spec.interned_nodes():
+        first, second = [Spec.from_dict(d) for d in data]
+        # A modified full hash makes a different node
+        data[0]['spec'][0]['callpath']['full_hash'] = 'x' * 32
+        third = Spec.from_dict(data[0])
+
+    assert nodes(second)['callpath'] is first
+    assert nodes(second)['mpich'] is nodes(first)['mpich']
+    assert third is not first
+    assert nodes(third)['mpich'] is nodes(first)['mpich']
+    assert first.eq_dag(callpath) and second.eq_dag(mpileaks)
+
+    # Nodes are only shared in an interned_nodes() context
+    assert Spec.from_dict(data[1]) is not second
+
+
 def test_using_ordered_dict(mock_packages):
     """ Checks that dicts are ordered
 
@@ -223,6 +268,34 @@ def test_ordered_read_not_required_for_consistent_dag_hash(
             assert spec.full_hash() == round_trip_reversed_json_spec.full_hash()
 
 
+def serialized_node_hash(spec, hash_type):
+    """Hash a node the way Spack always has: by dumping it with ruamel."""
+    node_yaml = syaml.dump(spec.to_node_dict(hash=hash_type),
+                           default_flow_style=True)
+    return spack.util.hash.b32_hash(node_yaml)
+
+
+@pytest.mark.parametrize("hash_type", [
+    ht.dag_hash,
+    ht.build_hash,
+    ht.full_hash
+])
+def test_hashes_match_serialized_nodes(hash_type, database):
+    """Hashes must be bit-identical to the ones of serialized node dicts."""
+    specs = database.query_local(installed=any)
+    for abstract in ('mpileaks ^zmpi', 'dttop', 'dtuse', 'externaltool',
+                     'multivalue-variant', 'patch-several-dependencies'):
+        specs.append(Spec(abstract).concretized())
+    assert specs
+
+    for spec in specs:
+        for node in spec.traverse(deptype=hash_type.deptype):
+            expected = serialized_node_hash(node, hash_type)
+            assert node._spec_hash(hash_type) == expected
+            if hash_type is ht.dag_hash:
+                assert node.dag_hash() == expected
+
+
 @pytest.mark.parametrize("module", [
     spack.spec,
     spack.architecture,
@@ -29,6 +29,16 @@ def test_write_and_read_cache_file(file_cache):
         assert text == "foobar\n"
 
 
+def test_write_and_read_binary_cache_file(file_cache):
+    """Test writing then reading a cached file in binary mode."""
+    with file_cache.write_transaction('test.bin', binary=True) as (old, new):
+        assert old is None
+        new.write(b"\x00foobar\n")
+
+    with file_cache.read_transaction('test.bin', binary=True) as stream:
+        assert stream.read() == b"\x00foobar\n"
+
+
 def test_write_and_remove_cache_file(file_cache):
     """Test two write transactions on a cached file. Then try to remove an
     entry from it.
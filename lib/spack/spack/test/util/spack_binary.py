@@ -0,0 +1,62 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import io
+import sys
+
+import pytest
+
+import spack.util.spack_binary as sbinary
+import spack.util.spack_json as sjson
+import spack.util.spack_yaml as syaml
+
+data = syaml.syaml_dict([
+    ('spec', [{'zlib': {'version': '1.2.11', 'hash': 'abcdef',
+                        'parameters': {'cflags': [], 'shared': True}}},
+              {'libelf': {'version': '0.8.13', 'hash': 'ghijkl',
+                          'dependencies': {'zlib': {'hash': 'abcdef'}}}}]),
+    ('versions', ('1.2.11', 1, 2.5, None)),
+])
+
+plain_data = sjson.load(sjson.dump(data))
+
+
+def test_binary_round_trip():
+    encoded = sbinary.dump(data)
+    assert sbinary.is_binary(encoded)
+    assert sbinary.load(encoded) == plain_data
+
+    stream = io.BytesIO()
+    sbinary.dump(data, stream)
+    assert stream.getvalue() == encoded
+    stream.seek(0)
+    assert sbinary.load(stream) == plain_data
+
+
+@pytest.mark.skipif(sys.version_info[0] < 3, reason='needs marshal refs')
+def test_binary_strings_are_shared():
+    spec = sbinary.load(sbinary.dump(data))['spec']
+    zlib = spec[0]['zlib']['hash']
+    assert spec[1]['libelf']['dependencies']['zlib']['hash'] is zlib
+
+
+@pytest.mark.parametrize('encoded', [
+    sjson.dump(data), sjson.dump(data).encode('utf-8')
+])
+def test_binary_load_falls_back_to_json(encoded):
+    assert not sbinary.is_binary(encoded)
+    assert sbinary.load(encoded) == plain_data
+
+
+def test_binary_from_other_python():
+    encoded = bytearray(sbinary.dump(data))
+    encoded[len(sbinary.magic)] += 1
+    with pytest.raises(sbinary.SpackBinaryError):
+        sbinary.load(bytes(encoded))
+
+
+def test_binary_unsupported_data():
+    with pytest.raises(ValueError):
+        sbinary.dump({'spec': object()})
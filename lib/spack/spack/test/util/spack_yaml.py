@@ -5,7 +5,10 @@
 
 import re
 
+import pytest
+
 import spack.config
+import spack.util.spack_yaml as syaml
 from spack.main import SpackCommand
 
 config_cmd = SpackCommand('config')
@@ -93,3 +96,25 @@ def get_file_lines(filename):
             lines = get_file_lines(filename)
             assert key in lines[line]
             assert val in lines[line]
+
+
+@pytest.mark.parametrize('value', [
+    'zlib', 'builtin.mock', '1.2.11', '2.3', '20130729', 'x' * 200,
+    'kkvsxj6gpbbxozjtz6zwp2m7e4sfbcz4zx257by36472cynzx6sa====',
+    '/path/to/prefix', 'true', 'True', 'null', 'yes', '~', '', ' a', 'a: b',
+    'a #b', '@x', '-a', 'a,b', "it's", 'a"b', 'a\tb', 'a\nb', u'\xe9',
+    None, True, False, 0, -5, 1.5, [], {}, ('a', 1),
+])
+def test_dump_flow_matches_ruamel(value):
+    """dump_flow() must emit the same text as ruamel, as it's hashed."""
+    docs = [
+        [value],
+        syaml.syaml_dict([('key', value), ('list', [value, value])]),
+        {'nested': {'deeper': [value]}},
+    ]
+    if not isinstance(value, (list, dict, tuple, float)):
+        docs.append({value: 'value'})
+
+    for doc in docs:
+        expected = syaml.dump(doc, default_flow_style=True)
+        assert syaml.dump_flow(doc) == expected
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 
+import itertools
 import numbers
 
 import pytest
@@ -21,6 +22,8 @@
     Variant,
     VariantMap,
     disjoint_sets,
+    mask_values,
+    value_mask,
 )
 
 
@@ -757,3 +760,41 @@ def test_disjoint_set_fluent_methods():
         assert 'none' not in d
         assert 'none' not in [x for x in d]
         assert 'none' not in d.feature_values
+
+
+def test_value_mask_round_trip():
+    values = set(['bar', 'baz', 'foobar'])
+    mask = value_mask('masked', values)
+    assert mask_values('masked', mask) == values
+    assert value_mask('masked', values) == mask
+
+    # Values have the same bit regardless of the other values
+    for value in values:
+        assert value_mask('masked', [value]) & mask
+
+    # ... and the values of different variants don't interfere
+    assert mask_values('other', mask) == set()
+
+
+@pytest.mark.parametrize('a,b', itertools.product(
+    [('bar',), ('baz',), ('bar', 'baz'), ('bar', 'baz', 'foobar')],
+    repeat=2
+))
+def test_variant_masks_match_values(a, b):
+    x = MultiValuedVariant('foo', ','.join(a))
+    y = MultiValuedVariant('foo', ','.join(b))
+    assert mask_values('foo', x.mask) == set(x.value)
+
+    expected = set(x.value) >= set(y.value)
+    assert x.satisfies(y) == expected
+
+    # The mask follows the changes of the value
+    expected = not set(x.value) >= set(y.value)
+    assert x.constrain(y) == expected
+    assert mask_values('foo', x.mask) == set(x.value) == set(a) | set(b)
+
+    x.value = 'foobar'
+    assert mask_values('foo', x.mask) == set(['foobar'])
+
+    y.append('foobar')
+    assert mask_values('foo', y.mask) == set(b) | set(['foobar'])
@@ -7,8 +7,14 @@
 We try to maintain compatibility with RPM's version semantics
 where it makes sense.
 """
+import copy
+import pickle
+
 import pytest
 
+import llnl.util.lang
+
+import spack.version
 from spack.version import Version, VersionList, ver
 
 
@@ -576,3 +582,58 @@ def test_invalid_versions(version_str):
     """Ensure invalid versions are rejected with a ValueError"""
     with pytest.raises(ValueError):
         Version(version_str)
+
+
+def test_versions_are_interned():
+    v = Version('1.2.3')
+    assert Version(' 1.2.3 ') is v
+    assert ver('1.2.3') is v
+    assert ver('1.2.3:1.3').start is v
+    assert pickle.loads(pickle.dumps(v)) is v
+    assert copy.deepcopy(v) is v
+
+
+def test_interned_versions_are_bounded(monkeypatch):
+    monkeypatch.setattr(
+        spack.version, '_versions', llnl.util.lang.LRUCache(2))
+    v = Version('1.2.3')
+    Version('1.2.4')
+    assert Version('1.2.3') is v
+
+    # Only the most recently used versions are kept
+    Version('1.2.5')
+    assert len(spack.version._versions) == 2
+    assert '1.2.4' not in spack.version._versions
+    assert Version('1.2.4') == Version('1.2.4')
+
+
+@pytest.mark.parametrize('versions', [
+    ['1.2', '1.2a', '1.2.3', '1.2.10', '1.10', '2', 'master', 'develop'],
+    ['a', 'b1', '1', '1.0', '1.0.1', '1.0.1a', 'trunk', 'head', 'main'],
+])
+def test_sort_keys_match_comparisons(versions):
+    versions = [Version(v) for v in versions]
+    keys = [v.key for v in versions]
+    assert keys == sorted(keys)
+    for i, a in enumerate(versions):
+        for b in versions[i + 1:]:
+            assert_ver_lt(a, b)
+
+
+@pytest.mark.parametrize('vlist,other', [
+    ('1.0,1.2:1.4,1.6,2.0:2.4,3', '1.1:2.2'),
+    ('1.0,1.2:1.4,1.6,2.0:2.4,3', '1.3,1.5:1.6.1,2.2:'),
+    ('1:1.2,1.4,1.8:', '1.1.5:1.3,1.7'),
+    ('1.0,2.0', '1.5,3:'),
+])
+def test_intersection_of_long_lists(vlist, other):
+    """Intersections and overlaps only compare the elements that overlap,
+    and must agree with the pairwise ones."""
+    vlist, other = VersionList(vlist.split(',')), VersionList(other.split(','))
+    expected = VersionList()
+    for a in vlist:
+        for b in other:
+            expected.add(a.intersection(b))
+    assert vlist.intersection(other) == expected
+    assert other.intersection(vlist) == expected
+    assert vlist.overlaps(other) == other.overlaps(vlist) == bool(expected)
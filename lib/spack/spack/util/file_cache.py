@@ -96,7 +96,7 @@ def init_entry(self, key):
             self._get_lock(key)
         return exists
 
-    def read_transaction(self, key):
+    def read_transaction(self, key, binary=False):
         """Get a read transaction on a file cache item.
 
         Returns a ReadTransaction context manager and opens the cache file for
@@ -105,19 +105,25 @@ def read_transaction(self, key):
            with file_cache_object.read_transaction(key) as cache_file:
                cache_file.read()
 
+        The file is opened in binary mode if ``binary`` is True.
         """
+        mode = 'rb' if binary else 'r'
         return ReadTransaction(
-            self._get_lock(key), acquire=lambda: open(self.cache_path(key))
+            self._get_lock(key),
+            acquire=lambda: open(self.cache_path(key), mode)
         )
 
-    def write_transaction(self, key):
+    def write_transaction(self, key, binary=False):
         """Get a write transaction on a file cache item.
 
         Returns a WriteTransaction context manager that opens a temporary file
         for writing.  Once the context manager finishes, if nothing went wrong,
         moves the file into place on top of the old file atomically.
 
+        The files are opened in binary mode if ``binary`` is True.
         """
+        mode = 'b' if binary else ''
+
         # TODO: this nested context manager adds a lot of complexity and
         # TODO: is pretty hard to reason about in llnl.util.lock. At some
         # TODO: point we should just replace it with functions and simplify
@@ -128,10 +134,10 @@ def __enter__(cm):  # noqa
                 cm.orig_filename = self.cache_path(key)
                 cm.orig_file = None
                 if os.path.exists(cm.orig_filename):
-                    cm.orig_file = open(cm.orig_filename, 'r')
+                    cm.orig_file = open(cm.orig_filename, 'r' + mode)
 
                 cm.tmp_filename = self.cache_path(key) + '.tmp'
-                cm.tmp_file = open(cm.tmp_filename, 'w')
+                cm.tmp_file = open(cm.tmp_filename, 'w' + mode)
 
                 return cm.orig_file, cm.tmp_file
 
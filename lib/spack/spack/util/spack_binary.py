@@ -0,0 +1,101 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Compact binary encoding for the data of spec files and lockfiles.
+
+The data is the same as in the JSON files, and is encoded with ``marshal``,
+which decodes it several times faster than ``json``. Strings are interned
+before encoding, so each distinct string (package names, hashes, variant
+values, ...) is stored once, and decoded into a single shared object.
+
+Binary data starts with a header recording the Python major version and
+marshal version it was written with. ``load()`` reads JSON data as well, so
+readers don't need to know which encoding a file uses.
+
+Unlike ``pickle``, ``marshal`` cannot run code when loading data, but it is
+still not meant for untrusted input: only local files, written by Spack
+itself, use this encoding.
+"""
+import marshal
+import sys
+
+from six import binary_type, iteritems, string_types, text_type
+
+import spack.error
+import spack.util.spack_json as sjson
+
+__all__ = ['load', 'dump', 'is_binary', 'SpackBinaryError']
+
+#: Start of binary data, which is not valid JSON or YAML
+magic = b'\x00spack-marshal'
+
+#: Marshal version used for writing: version 2 is the latest one that
+#: Python 2 reads
+marshal_version = 2 if sys.version_info[0] < 3 else 4
+
+_header = magic + bytearray([sys.version_info[0], marshal_version])
+
+_intern = sys.intern if sys.version_info[0] >= 3 else intern  # noqa: F821
+
+
+def is_binary(data):
+    """Whether some data read from a file starts with a binary header."""
+    return isinstance(data, binary_type) and data.startswith(magic)
+
+
+def dump(data, stream=None):
+    """Encode data, and write it to a binary stream if one is given.
+
+    Returns:
+        bytes: the encoded data if no stream is given
+
+    Raises:
+        ValueError: if the data contains objects other than dicts, lists,
+            strings, numbers, booleans and None
+    """
+    encoded = bytes(_header) + marshal.dumps(_plain(data), marshal_version)
+    if stream is None:
+        return encoded
+    stream.write(encoded)
+
+
+def load(stream):
+    """Decode data from a file object, bytes or a string, which may be JSON.
+
+    Raises:
+        SpackBinaryError: if the binary data was written by a Python version
+            that can't read it back
+    """
+    data = stream if isinstance(stream, string_types + (binary_type,)) \
+        else stream.read()
+    if not is_binary(data):
+        if isinstance(data, binary_type):
+            data = data.decode('utf-8')
+        return sjson.load(data)
+
+    python, version = bytearray(data[len(magic):len(_header)])
+    if python != sys.version_info[0] or version > marshal_version:
+        raise SpackBinaryError(
+            'cannot read binary data written by Python {0}'.format(python),
+            'write it again as JSON with the Python version that wrote it')
+    return marshal.loads(data[len(_header):])
+
+
+def _plain(data):
+    """Convert ordered dicts and tuples to the builtin types marshal
+    supports, and intern strings.
+    """
+    if isinstance(data, text_type if sys.version_info[0] >= 3 else str):
+        # Only exact strings can be interned
+        return _intern(str(data))
+    if isinstance(data, dict):
+        return dict((_plain(k), _plain(v)) for k, v in iteritems(data))
+    if isinstance(data, (list, tuple)):
+        return [_plain(v) for v in data]
+    return data
+
+
+class SpackBinaryError(spack.error.SpackError):
+    """Raised when binary data cannot be decoded."""
@@ -15,7 +15,7 @@
 import ctypes
 import re
 import sys
-from typing import List  # novm
+from typing import Any, Dict, List  # novm
 
 import ruamel.yaml as yaml
 from ordereddict_backport import OrderedDict
@@ -220,6 +220,100 @@ def dump(obj, default_flow_style=False, stream=None):
                      Dumper=SafeDumper, stream=stream)
 
 
+class _FlowFallback(Exception):
+    """Raised when dump_flow() can't reproduce what ruamel would emit."""
+
+
+#: Plain scalars that no YAML resolver can read as something other than a
+#: string, and that ruamel never quotes (e.g., hashes and package names)
+_plain_scalar = re.compile(r'^[A-Za-z_][A-Za-z0-9_./=+-]{5,}$')
+
+#: Characters that make ruamel emit a scalar on more than one line
+_line_breaks = re.compile(u'[\n\r\x85\u2028\u2029]')
+
+#: Memoized flow rendering of the scalars that need ruamel to be emitted
+_flow_scalars = {}  # type: Dict[Any, str]
+
+#: Types dump_flow() can emit without ruamel
+_flow_containers = (dict, syaml_dict, list, syaml_list, tuple)
+_flow_scalar_types = tuple(string_types) + (
+    syaml_str, bool, int, syaml_int, type(None))
+
+
+def _flow_scalar(value):
+    if value is None:
+        return "!!null ''"
+
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+
+    if isinstance(value, string_types):
+        if _plain_scalar.match(value):
+            return value
+        key = value
+    elif isinstance(value, int):
+        return str(int(value))
+    else:
+        key = (type(value), value)
+
+    text = _flow_scalars.get(key)
+    if text is None:
+        if isinstance(value, string_types) and _line_breaks.search(value):
+            raise _FlowFallback()
+        if len(_flow_scalars) > 2 ** 16:
+            _flow_scalars.clear()
+        # Strip the '[' ... ']\n' of a one element sequence
+        text = dump([value], default_flow_style=True)[1:-2]
+        _flow_scalars[key] = text
+    return text
+
+
+def _emit_flow(obj, write):
+    obj_type = type(obj)
+    if obj_type in (dict, syaml_dict):
+        write('{')
+        for i, (key, value) in enumerate(obj.items()):
+            if key is None or type(key) not in _flow_scalar_types:
+                raise _FlowFallback()
+            key_text = _flow_scalar(key)
+            # ruamel uses explicit "? key" entries for empty and long keys
+            if not key or len(key_text) >= 128:
+                raise _FlowFallback()
+            write(', ' + key_text + ': ' if i else key_text + ': ')
+            _emit_flow(value, write)
+        write('}')
+    elif obj_type in (list, syaml_list, tuple):
+        write('[')
+        for i, value in enumerate(obj):
+            if i:
+                write(', ')
+            _emit_flow(value, write)
+        write(']')
+    elif obj_type in _flow_scalar_types:
+        write(_flow_scalar(obj))
+    else:
+        raise _FlowFallback()
+
+
+def dump_flow(obj):
+    """Fast equivalent of ``dump(obj, default_flow_style=True)``.
+
+    The text is built directly for plain dicts, lists and scalars, which
+    is what Spack hashes, and is identical to what ruamel would emit. Any
+    other object is handed over to ruamel.
+    """
+    parts = []
+    try:
+        # ruamel ends documents with a bare scalar differently
+        if type(obj) not in _flow_containers:
+            raise _FlowFallback()
+        _emit_flow(obj, parts.append)
+    except _FlowFallback:
+        return dump(obj, default_flow_style=True)
+    parts.append('\n')
+    return ''.join(parts)
+
+
 def file_line(mark):
     """Format a mark as <file>:<line> information."""
     result = mark.name
@@ -7,11 +7,13 @@
 variants both in packages and in specs.
 """
 
+import collections
 import functools
 import inspect
 import itertools
 import re
 import sys
+from typing import Any, Dict  # novm
 
 from six import StringIO
 
@@ -29,6 +31,29 @@
 
 special_variant_values = [None, 'none', '*']
 
+#: Bit of each value of each variant, by variant name. Values are given a
+#: bit the first time they are seen, so that the values held by variants
+#: can be compared as bitsets.
+_value_bits = collections.defaultdict(dict)  # type: Dict[str, Dict[Any, int]]
+
+
+def value_mask(name, values):
+    """Bitset of some values of the variant ``name``."""
+    bits = _value_bits[name]
+    mask = 0
+    for value in values:
+        bit = bits.get(value)
+        if bit is None:
+            bit = bits[value] = 1 << len(bits)
+        mask |= bit
+    return mask
+
+
+def mask_values(name, mask):
+    """Values of the variant ``name`` in a bitset from ``value_mask()``."""
+    return set(value for value, bit in _value_bits[name].items()
+               if mask & bit)
+
 
 class Variant(object):
     """Represents a variant in a package, as declared in the
@@ -192,6 +217,10 @@ def implicit_variant_conversion(method):
     """
     @functools.wraps(method)
     def convert(self, other):
+        # Variants of the same type need no conversion
+        if type(other) is type(self):
+            return method(self, other)
+
         # We don't care if types are different as long as I can convert
         # other to type(self)
         try:
@@ -213,6 +242,8 @@ class AbstractVariant(object):
     do it if it grows up to be a multi valued variant with the right set of
     values.
     """
+    __slots__ = ('name', '_value', '_original_value', '_mask',
+                 '_patches_in_order_of_appearance')
 
     def __init__(self, name, value):
         self.name = name
@@ -221,6 +252,7 @@ def __init__(self, name, value):
         # done by the property setter
         self._value = None
         self._original_value = None
+        self._mask = None
 
         # Invokes property setter
         self.value = value
@@ -261,6 +293,21 @@ def value(self):
     @value.setter
     def value(self, value):
         self._value_setter(value)
+        self._mask = None
+
+    @property
+    def mask(self):
+        """Bitset of the values stored in the variant (see ``value_mask()``).
+
+        Returns:
+            int: bitset of the values
+        """
+        if self._mask is None:
+            value = self._value
+            if not isinstance(value, tuple):
+                value = (value,)
+            self._mask = value_mask(self.name, value)
+        return self._mask
 
     def _value_setter(self, value):
         # Store the original value
@@ -352,6 +399,10 @@ def constrain(self, other):
         if self.name != other.name:
             raise ValueError('variants must have the same name')
 
+        # Nothing to add if other has no value that self doesn't have
+        if not other.mask & ~self.mask:
+            return False
+
         old_value = self.value
 
         values = list(sorted(set(self.value + other.value)))
@@ -379,6 +430,8 @@ def __str__(self):
 
 class MultiValuedVariant(AbstractVariant):
     """A variant that can hold multiple values at once."""
+    __slots__ = ()
+
     @implicit_variant_conversion
     def satisfies(self, other):
         """Returns true if ``other.name == self.name`` and ``other.value`` is
@@ -393,17 +446,19 @@ def satisfies(self, other):
         super_sat = super(MultiValuedVariant, self).satisfies(other)
 
         # Otherwise we want all the values in `other` to be also in `self`
-        return super_sat and (all(v in self.value for v in other.value) or
+        return super_sat and (not other.mask & ~self.mask or
                               '*' in other or '*' in self)
 
     def append(self, value):
         """Add another value to this multi-valued variant."""
         self._value = tuple(sorted((value,) + self._value))
         self._original_value = ",".join(self._value)
+        self._mask = None
 
 
 class SingleValuedVariant(AbstractVariant):
     """A variant that can hold multiple values, but one at a time."""
+    __slots__ = ()
 
     def _value_setter(self, value):
         # Treat the value as a multi-valued variant
@@ -421,7 +476,7 @@ def __str__(self):
     def satisfies(self, other):
         abstract_sat = super(SingleValuedVariant, self).satisfies(other)
 
-        return abstract_sat and (self.value == other.value or
+        return abstract_sat and (self.mask == other.mask or
                                  other.value == '*' or self.value == '*')
 
     def compatible(self, other):
@@ -455,6 +510,7 @@ class BoolValuedVariant(SingleValuedVariant):
 
     BoolValuedVariant can also hold the value '*', for coerced
     comparisons between ``foo=*`` and ``+foo`` or ``~foo``."""
+    __slots__ = ()
 
     def _value_setter(self, value):
         # Check the string representation of the value and turn
@@ -484,6 +540,7 @@ class VariantMap(lang.HashableMap):
     """Map containing variant instances. New values can be added only
     if the key is not already present.
     """
+    __slots__ = ('spec',)
 
     def __init__(self, spec):
         super(VariantMap, self).__init__()
@@ -589,15 +646,23 @@ def concrete(self):
             v in self for v in self.spec.package_class.variants
         )
 
-    def copy(self):
+    def copy(self, share_variants=False):
         """Return an instance of VariantMap equivalent to self.
 
+        Args:
+            share_variants (bool): if True, the copy holds the same variant
+                objects as self instead of copies, so they must not be
+                modified in place
+
         Returns:
             VariantMap: a copy of self
         """
         clone = VariantMap(self.spec)
-        for name, variant in self.items():
-            clone[name] = variant.copy()
+        if share_variants:
+            clone.dict.update(self.dict)
+        else:
+            for name, variant in self.items():
+                clone[name] = variant.copy()
         return clone
 
     def __str__(self):
@@ -31,6 +31,8 @@
 
 from six import string_types
 
+import llnl.util.lang
+
 import spack.error
 from spack.util.spack_yaml import syaml_dict
 
@@ -47,6 +49,11 @@
 
 iv_min_len = min(len(s) for s in infinity_versions)
 
+#: Versions created recently, keyed by their string. Versions are immutable,
+#: so a version string used again is not parsed again, and its uses share
+#: one object. Only the most recently used versions are kept.
+_versions = llnl.util.lang.LRUCache(16384)
+
 
 def coerce_versions(a, b):
     """
@@ -68,25 +75,30 @@ def check_type(t):
         return (a, b)
     elif order.index(ta) > order.index(tb):
         if ta == VersionRange:
-            return (a, VersionRange(b, b))
+            return (a, b.as_range())
         else:
             return (a, VersionList([b]))
     else:
         if tb == VersionRange:
-            return (VersionRange(a, a), b)
+            return (a.as_range(), b)
         else:
             return (VersionList([a]), b)
 
 
+def _call_coerced(a, b, name, *args, **kwargs):
+    """Call the method ``name`` of ``a`` and ``b`` coerced to the same type."""
+    ca, cb = coerce_versions(a, b)
+    return getattr(ca, name)(cb, *args, **kwargs)
+
+
 def coerced(method):
     """Decorator that ensures that argument types of a method are coerced."""
     @wraps(method)
     def coercing_method(a, b, *args, **kwargs):
-        if type(a) == type(b) or a is None or b is None:
+        if type(a) is type(b) or a is None or b is None:
             return method(a, b, *args, **kwargs)
         else:
-            ca, cb = coerce_versions(a, b)
-            return getattr(ca, method.__name__)(cb, *args, **kwargs)
+            return _call_coerced(a, b, method.__name__, *args, **kwargs)
     return coercing_method
 
 
@@ -149,27 +161,63 @@ def __gt__(self, other):
         return not self.__lt__(other)
 
 
+def _sort_key(components):
+    """Sort key of the components of a version.
+
+    Each component is mapped to a pair of a rank and a value, so that keys
+    are compared like the components, without calling Python code: strings
+    sort before numbers, which sort before infinity versions (the ones
+    listed earlier in ``infinity_versions`` being the largest).
+    """
+    key = []
+    for component in components:
+        if isinstance(component, int):
+            key.extend((1, component))
+        elif component.inf_ver is not None:
+            key.extend((2, -component.inf_ver))
+        else:
+            key.extend((0, component.data))
+    return tuple(key)
+
+
 class Version(object):
-    """Class to represent versions"""
-    __slots__ = ['version', 'separators', 'string']
+    """Class to represent versions.
 
-    def __init__(self, string):
+    Versions are interned: creating a version from a string returns the
+    version created before from the same string, if any.
+    """
+    __slots__ = ['version', 'separators', 'string', 'key', '_range']
+
+    def __new__(cls, string):
         if not isinstance(string, str):
             string = str(string)
 
         # preserve the original string, but trimmed.
         string = string.strip()
-        self.string = string
+        version = _versions.get(string)
+        if version is not None:
+            return version
 
         if not VALID_VERSION.match(string):
             raise ValueError("Bad characters in version string: %s" % string)
 
+        version = object.__new__(cls)
+        version.string = string
+
         # Split version into alphabetical and numeric segments simultaneously
         segments = SEGMENT_REGEX.findall(string)
-        self.version = tuple(
+        version.version = tuple(
             int(m[0]) if m[0] else VersionStrComponent(m[1]) for m in segments
         )
-        self.separators = tuple(m[2] for m in segments)
+        version.separators = tuple(m[2] for m in segments)
+        version.key = _sort_key(version.version)
+        version._range = None
+
+        _versions[string] = version
+        return version
+
+    def __reduce__(self):
+        return Version, (self.string,)
 
     @property
     def dotted(self):
@@ -260,6 +308,16 @@ def lowest(self):
     def highest(self):
         return self
 
+    def as_range(self):
+        """The range made of this version only.
+
+        Versions are coerced to this range whenever they are compared to a
+        range, so it is created once and kept with the version.
+        """
+        if self._range is None:
+            self._range = VersionRange(self, self)
+        return self._range
+
     def isdevelop(self):
         """Triggers on the special case of the `@develop-like` version."""
         for inf in infinity_versions:
@@ -277,9 +335,7 @@ def satisfies(self, other):
         a suitable compiler.
         """
 
-        nself = len(self.version)
-        nother = len(other.version)
-        return nother <= nself and self.version[:nother] == other.version
+        return self.key[:len(other.key)] == other.key
 
     def __iter__(self):
         return iter(self.version)
@@ -321,48 +377,51 @@ def __format__(self, format_spec):
     def concrete(self):
         return self
 
-    @coerced
+    # Versions are mostly compared to other versions, so comparisons
+    # check for them before coercing their arguments, and compare the
+    # precomputed sort keys of the components.
+
     def __lt__(self, other):
         """Version comparison is designed for consistency with the way RPM
            does things.  If you need more complicated versions in installed
            packages, you should override your package's version string to
            express it more sensibly.
         """
-        if other is None:
-            return False
-
-        # Use tuple comparison assisted by VersionStrComponent for performance
-        return self.version < other.version
+        if type(other) is Version:
+            return self.key < other.key
+        return other is not None and _call_coerced(self, other, '__lt__')
 
-    @coerced
     def __eq__(self, other):
-        return (other is not None and
-                type(other) == Version and self.version == other.version)
+        if type(other) is Version:
+            return self is other or self.key == other.key
+        return other is not None and _call_coerced(self, other, '__eq__')
 
-    @coerced
     def __ne__(self, other):
         return not (self == other)
 
-    @coerced
     def __le__(self, other):
-        return self == other or self < other
+        if type(other) is Version:
+            return self.key <= other.key
+        return other is not None and _call_coerced(self, other, '__le__')
 
-    @coerced
     def __ge__(self, other):
-        return not (self < other)
+        if type(other) is Version:
+            return self.key >= other.key
+        return other is None or _call_coerced(self, other, '__ge__')
 
-    @coerced
     def __gt__(self, other):
-        return not (self == other) and not (self < other)
+        if type(other) is Version:
+            return self.key > other.key
+        return other is None or _call_coerced(self, other, '__gt__')
 
     def __hash__(self):
-        return hash(self.version)
+        return hash(self.key)
 
     @coerced
     def __contains__(self, other):
         if other is None:
             return False
-        return other.version[:len(self.version)] == self.version
+        return other.key[:len(self.key)] == self.key
 
     def is_predecessor(self, other):
         """True if the other version is the immediate predecessor of this one.
@@ -687,20 +746,38 @@ def preferred(self):
             latest = self.highest()
         return latest
 
+    def _overlapping(self, other):
+        """Yield the indices ``(i, j)`` of the elements ``self[i]`` and
+        ``other[j]`` that overlap.
+
+        The elements of a list are sorted and don't overlap each other, so
+        the elements of the longer list that overlap an element of the
+        shorter one are contiguous, and follow the ones overlapping the
+        previous element. They are found by bisection, in time logarithmic
+        in the length of the longer list.
+        """
+        swap = len(other) < len(self)
+        shorter, longer = (other, self) if swap else (self, other)
+
+        lo = 0
+        for i, version in enumerate(shorter.versions):
+            j = bisect_left(longer.versions, version, lo)
+            while j > lo and longer[j - 1].overlaps(version):
+                j -= 1
+            lo = j
+
+            for j in range(j, len(longer)):
+                if longer[j].overlaps(version):
+                    yield (j, i) if swap else (i, j)
+                elif version < longer[j]:
+                    break
+
     @coerced
     def overlaps(self, other):
         if not other or not self:
             return False
 
-        s = o = 0
-        while s < len(self) and o < len(other):
-            if self[s].overlaps(other[o]):
-                return True
-            elif self[s] < other[o]:
-                s += 1
-            else:
-                o += 1
-        return False
+        return any(True for _ in self._overlapping(other))
 
     def to_dict(self):
         """Generate human-readable dict for YAML."""
@@ -763,11 +840,10 @@ def union(self, other):
 
     @coerced
     def intersection(self, other):
-        # TODO: make this faster.  This is O(n^2).
+        # Only overlapping elements have a non-empty intersection
         result = VersionList()
-        for s in self:
-            for o in other:
-                result.add(s.intersection(o))
+        for i, j in sorted(self._overlapping(other)):
+            result.add(self[i].intersection(other[j]))
         return result
 
     @coerced
@@ -0,0 +1,60 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Compare eager and lazy reads of the installation database.
+
+Run it with ``spack python``, optionally passing the specs to query::
+
+    $ spack python share/spack/qa/benchmarks/database_read.py zlib
+
+For each mode, this prints the time and memory needed to read the index
+and to run the queries, and the number of specs that were built.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import spack.database
+import spack.store
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+def read_and_query(lazy, queries):
+    db = spack.database.Database(spack.store.db.root)
+    db._lazy_specs = lazy
+
+    if tracemalloc:
+        tracemalloc.start()
+    start = time.time()
+    db._read_from_file(db._index_path)
+    read_time = time.time() - start
+
+    start = time.time()
+    for query in queries:
+        db._query(query)
+    query_time = time.time() - start
+
+    memory = 0
+    if tracemalloc:
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    built = sum(1 for rec in db._data.values() if rec.spec_materialized)
+    print('{0:>6}: read {1:8.3f}s  query {2:8.3f}s  memory {3:8.1f}MB  '
+          'specs built {4}/{5}'.format(
+              'lazy' if lazy else 'eager', read_time, query_time,
+              memory / 2.0 ** 20, built, len(db._data)))
+
+
+queries = sys.argv[1:] or ['zlib']
+print('Database: {0}'.format(spack.store.db._index_path))
+print('Queries: {0}'.format(' '.join(queries)))
+for lazy in (False, True):
+    read_and_query(lazy, queries)
@@ -0,0 +1,45 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed to concretize the specs of an environment
+separately, in one process and with a pool of processes.
+
+Run it with ``spack python``, passing the user specs::
+
+    $ spack python share/spack/qa/benchmarks/env_concretize.py hdf5 zlib
+
+Each spec is concretized separately, in a temporary environment. This prints
+the time needed in a single process and with a pool of processes, and checks
+that both give the same concrete specs.
+"""
+from __future__ import print_function
+
+import shutil
+import sys
+import tempfile
+import time
+
+import spack.environment as ev
+
+
+def measure(label, user_specs, threshold):
+    ev.parallel_concretization_threshold = threshold
+    path = tempfile.mkdtemp()
+    try:
+        env = ev.Environment(path)
+        env.concretization = 'separately'
+        for spec in user_specs:
+            env.add(spec)
+        start = time.time()
+        concretized = env.concretize()
+        print('{0:>10}: {1:.2f}s'.format(label, time.time() - start))
+    finally:
+        shutil.rmtree(path)
+    return [(str(u), c.build_hash()) for u, c in concretized]
+
+
+serial = measure('serial', sys.argv[1:], float('inf'))
+parallel = measure('parallel', sys.argv[1:], 2)
+assert serial == parallel, 'parallel concretization differs'
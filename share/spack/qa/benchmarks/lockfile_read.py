@@ -0,0 +1,47 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed to read lockfiles encoded as JSON and as binary.
+
+Run it with ``spack python``, passing environment lockfiles::
+
+    $ spack python share/spack/qa/benchmarks/lockfile_read.py spack.lock
+
+For each lockfile, this prints the size of its JSON and binary encodings,
+the time needed to decode each of them, and the time needed to build the
+specs from the decoded data, which is the same for both encodings.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import spack.spec
+import spack.util.spack_binary as sbinary
+import spack.util.spack_json as sjson
+
+
+def measure(label, function, repeat=5):
+    start = time.time()
+    for _ in range(repeat):
+        result = function()
+    print('{0:>16}: {1:8.3f}s'.format(label, (time.time() - start) / repeat))
+    return result
+
+
+for path in sys.argv[1:]:
+    with open(path, 'rb') as f:
+        text = f.read().decode('utf-8')
+    data = sjson.load(text)
+    binary = sbinary.dump(data)
+    nodes = data['concrete_specs'].values()
+
+    print('{0}: {1} nodes, {2} bytes as JSON, {3} bytes as binary'.format(
+        path, len(nodes), len(text), len(binary)))
+    measure('json', lambda: sjson.load(text))
+    decoded = measure('binary', lambda: sbinary.load(binary))
+    assert decoded == data, 'decoded data differs'
+    measure('from_node_dict', lambda: [
+        spack.spec.Spec.from_node_dict(node) for node in nodes])
@@ -0,0 +1,50 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure how many packages are built when the solver reuses specs.
+
+Run it with ``spack python``, passing the specs to concretize::
+
+    $ spack python share/spack/qa/benchmarks/solver_reuse.py hdf5 mpileaks
+
+This needs clingo. For each spec, it concretizes the spec with and without
+reusing the specs installed in the store and in the build caches of the
+configured mirrors, and prints the time needed by each solve and the number
+of packages that would have to be built, i.e. the nodes of the concrete spec
+that are neither installed nor in a build cache.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import spack.cmd
+import spack.solver.asp
+import spack.spec
+
+reusable = spack.solver.asp._reusable_specs()
+hashes = set(node.dag_hash() for spec in reusable for node in spec.traverse())
+print('{0} reusable specs'.format(len(hashes)))
+
+
+def measure(label, spec, reuse):
+    start = time.time()
+    result = spack.solver.asp.solve([spec], reuse=reuse)
+    elapsed = time.time() - start
+    if not result.satisfiable:
+        print('{0:>12}: unsatisfiable'.format(label))
+        return
+
+    concrete = result.specs[0]
+    nodes = list(concrete.traverse())
+    builds = [node for node in nodes if node.dag_hash() not in hashes]
+    print('{0:>12}: {1:4} of {2:4} nodes to build  {3:.3f}s'.format(
+        label, len(builds), len(nodes), elapsed))
+
+
+for spec in spack.cmd.parse_specs(sys.argv[1:]):
+    print(spec)
+    measure('preferred', spec, reuse=False)
+    measure('reuse', spec, reuse=True)
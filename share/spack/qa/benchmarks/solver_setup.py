@@ -0,0 +1,88 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed to generate the facts of a concretization.
+
+Run it with ``spack python``, passing the specs to concretize::
+
+    $ spack python share/spack/qa/benchmarks/solver_setup.py hdf5 mpileaks
+
+This runs the setup phase of the ASP-based solver without solving, so it
+doesn't need clingo. It prints the number of facts, and the time needed to
+generate them with no cached package facts, with the package facts in the
+misc cache, and with the package facts in memory. Then it prints the number
+of possible packages and of facts when every possible dependency is
+considered, as the solver did before pruning unreachable packages.
+"""
+from __future__ import print_function
+
+import shutil
+import sys
+import time
+
+import spack.caches
+import spack.dependency
+import spack.package
+import spack.repo
+import spack.solver.asp
+import spack.spec
+
+
+class FactCounter(object):
+    """Solver driver that only counts the facts it gets."""
+
+    def __init__(self):
+        self.facts = 0
+
+    def h1(self, name):
+        pass
+
+    def h2(self, name):
+        pass
+
+    def newline(self):
+        pass
+
+    def fact(self, head):
+        self.facts += 1
+
+
+def measure(label, specs):
+    driver = FactCounter()
+    start = time.time()
+    setup = spack.solver.asp.SpackSolverSetup()
+    setup.setup(driver, specs)
+    print('{0:>12}: {1:8} facts  {2:.3f}s'.format(
+        label, driver.facts, time.time() - start))
+    return driver.facts
+
+
+def all_possible_packages(self, specs):
+    self.possible_virtuals = set(x.name for x in specs if x.virtual)
+    return set(spack.package.possible_dependencies(
+        *specs, virtuals=self.possible_virtuals,
+        deptype=spack.dependency.all_deptypes))
+
+
+specs = [spack.spec.Spec(s) for s in sys.argv[1:]]
+
+# Import the package classes beforehand, as the solver needs them anyway
+possible = spack.package.possible_dependencies(
+    *specs, virtuals=set(), deptype=spack.dependency.all_deptypes)
+for name in possible:
+    spack.repo.path.get_pkg_class(name)
+
+shutil.rmtree(spack.caches.misc_cache.cache_path('solver/facts'),
+              ignore_errors=True)
+measure('uncached', specs)
+spack.solver.asp._package_facts.clear()
+measure('misc cache', specs)
+pruned_facts = measure('memory', specs)
+pruned = spack.solver.asp.SpackSolverSetup().possible_packages(specs)
+
+spack.solver.asp.SpackSolverSetup.possible_packages = all_possible_packages
+facts = measure('unpruned', specs)
+print('{0} possible packages and {1} facts, {2} and {3} after pruning'.format(
+    len(possible), facts, len(pruned), pruned_facts))
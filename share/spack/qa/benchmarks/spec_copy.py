@@ -0,0 +1,55 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time and memory needed to copy the specs of a lockfile.
+
+Run it with ``spack python``, passing environment lockfiles::
+
+    $ spack python share/spack/qa/benchmarks/spec_copy.py spack.lock
+
+For each lockfile, this rebuilds the concrete DAGs like ``spack env``
+does, and prints the time needed to copy the root specs, or every spec if
+the lockfile has no roots, and the memory used by the copies.
+"""
+from __future__ import print_function
+
+import json
+import sys
+import time
+
+import spack.spec
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+def read_lockfile(data):
+    nodes = data['concrete_specs']
+    specs = dict((h, spack.spec.Spec.from_node_dict(node))
+                 for h, node in nodes.items())
+    for h, node in nodes.items():
+        for _, dep_hash, deptypes in \
+                spack.spec.Spec.dependencies_from_node_dict(node):
+            specs[h]._add_dependency(specs[dep_hash], deptypes)
+
+    roots = [r['hash'] for r in data.get('roots', [])] or list(specs)
+    return [specs[h] for h in roots]
+
+
+for path in sys.argv[1:]:
+    with open(path) as f:
+        roots = read_lockfile(json.load(f))
+
+    if tracemalloc:
+        tracemalloc.start()
+    start = time.time()
+    copies = [s.copy() for s in roots]
+    elapsed = time.time() - start
+    memory = tracemalloc.get_traced_memory()[0] if tracemalloc else 0
+
+    print('{0}: {1} roots  {2:.3f}s  {3:.1f}MB'.format(
+        path, len(copies), elapsed, memory / 2.0 ** 20))
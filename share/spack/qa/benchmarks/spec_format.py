@@ -0,0 +1,51 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed to format the specs of the installation database.
+
+Run it with ``spack python``, optionally passing a format string::
+
+    $ spack python share/spack/qa/benchmarks/spec_format.py '{name}-{hash:7}'
+
+This prints the time needed by ``spack find --format`` to render every
+installed spec, and by ``Spec.format`` with and without compiling the
+format string again for each spec.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import spack.spec
+import spack.store
+from spack.main import SpackCommand
+
+find = SpackCommand('find')
+
+fmt = sys.argv[1] if len(sys.argv) > 1 else (
+    '{name}-{version}-{compiler.name}-{compiler.version}-{hash}')
+
+specs = spack.store.db.query()
+print('{0} installed specs'.format(len(specs)))
+
+
+def measure(label, render, repeat=5):
+    start = time.time()
+    for _ in range(repeat):
+        render()
+    elapsed = (time.time() - start) / repeat
+    print('{0:>24}: {1:8.3f}s  {2:6.1f}us/spec'.format(
+        label, elapsed, elapsed / max(len(specs), 1) * 1e6))
+
+
+def format_uncompiled():
+    for spec in specs:
+        spack.spec._compile_format.cache.clear()
+        spec.format(fmt)
+
+
+measure('spack find --format', lambda: find('--format', fmt))
+measure('Spec.format', lambda: [s.format(fmt) for s in specs])
+measure('Spec.format (recompiled)', format_uncompiled)
@@ -0,0 +1,52 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed to hash the spec nodes of lockfiles.
+
+Run it with ``spack python``, passing environment lockfiles::
+
+    $ spack python share/spack/qa/benchmarks/spec_hash.py spack.lock
+
+For each lockfile, this prints the time needed to compute the DAG and build
+hashes of every node, both with ``Spec._spec_hash`` and by dumping the node
+dictionaries with ruamel, and checks that the two agree.
+"""
+from __future__ import print_function
+
+import json
+import sys
+import time
+
+import spack.hash_types as ht
+import spack.spec
+import spack.util.hash
+import spack.util.spack_yaml as syaml
+
+hash_types = (ht.dag_hash, ht.build_hash)
+
+
+def serialized_hash(spec, hash_type):
+    node_yaml = syaml.dump(spec.to_node_dict(hash=hash_type),
+                           default_flow_style=True)
+    return spack.util.hash.b32_hash(node_yaml)
+
+
+def measure(label, specs, compute):
+    start = time.time()
+    hashes = [compute(s, h) for s in specs for h in hash_types]
+    print('{0:>12}: {1:8.3f}s'.format(label, time.time() - start))
+    return hashes
+
+
+for path in sys.argv[1:]:
+    with open(path) as f:
+        nodes = json.load(f)['concrete_specs'].values()
+    # Nodes are hashed independently, as the lockfile has no dependency edges
+    specs = [spack.spec.Spec.from_node_dict(node) for node in nodes]
+
+    print('{0}: {1} nodes'.format(path, len(specs)))
+    fast = measure('_spec_hash', specs, lambda s, h: s._spec_hash(h))
+    slow = measure('ruamel', specs, serialized_hash)
+    assert fast == slow, 'hashes differ'
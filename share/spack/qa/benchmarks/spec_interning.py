@@ -0,0 +1,78 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the nodes shared by specs read in an ``interned_nodes()`` context.
+
+Run it with ``spack python``, passing build cache ``index.json`` files::
+
+    $ spack python share/spack/qa/benchmarks/spec_interning.py index.json
+
+For each index, the spec file of every indexed spec is rebuilt in memory,
+with build hashes, since indexes don't record the package hashes needed to
+compute full hashes. This prints the number of distinct spec nodes, the time
+needed and the memory used to read all the spec files, with and without
+sharing their nodes.
+"""
+from __future__ import print_function
+
+import shutil
+import sys
+import tempfile
+import time
+
+import spack.database
+import spack.hash_types as ht
+import spack.spec
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+def read_all(spec_dicts):
+    return [spack.spec.Spec.from_dict(d) for d in spec_dicts]
+
+
+def read_all_interned(spec_dicts):
+    with spack.spec.interned_nodes():
+        return read_all(spec_dicts)
+
+
+def measure(label, read, spec_dicts):
+    if tracemalloc:
+        tracemalloc.start()
+    start = time.time()
+    specs = read(spec_dicts)
+    elapsed = time.time() - start
+
+    memory = 0
+    if tracemalloc:
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    nodes = set(id(node) for spec in specs for node in spec.traverse())
+    print('{0:>12}: {1:7} nodes  {2:.3f}s  {3:.1f}MB'.format(
+        label, len(nodes), elapsed, memory / 2.0 ** 20))
+
+
+for path in sys.argv[1:]:
+    tmpdir = tempfile.mkdtemp()
+    try:
+        db = spack.database.Database(None, db_dir=tmpdir,
+                                     enable_transaction_locking=False)
+        db._read_from_file(path)
+        # Indexes have no build hashes: compute them before writing any
+        # spec file, so that every spec file records them
+        for rec in db._data.values():
+            rec.spec.build_hash()
+        spec_dicts = [rec.spec.to_dict(hash=ht.build_hash)
+                      for rec in db._data.values()]
+    finally:
+        shutil.rmtree(tmpdir)
+
+    print('{0}: {1} specs'.format(path, len(spec_dicts)))
+    measure('from_dict', read_all, spec_dicts)
+    measure('interned', read_all_interned, spec_dicts)
@@ -0,0 +1,72 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the memory used by the spec nodes of a lockfile and the database.
+
+Run it with ``spack python``, optionally passing environment lockfiles::
+
+    $ spack python share/spack/qa/benchmarks/spec_memory.py spack.lock
+
+For each lockfile, and for the installation database, this prints the number
+of spec nodes read, the time needed to build them, and the memory they use.
+The JSON data is decoded before measuring, so only spec objects are counted.
+"""
+from __future__ import print_function
+
+import json
+import sys
+import time
+
+import spack.database
+import spack.spec
+import spack.store
+from spack.version import Version
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+def measure(label, build):
+    if tracemalloc:
+        tracemalloc.start()
+    start = time.time()
+    nodes = build()
+    elapsed = time.time() - start
+
+    memory = 0
+    if tracemalloc:
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    print('{0}: {1} nodes  {2:.3f}s  {3:.1f}MB  {4:.0f}B/node'.format(
+        label, len(nodes), elapsed, memory / 2.0 ** 20,
+        memory / float(max(len(nodes), 1))))
+
+
+def lockfile_nodes(data):
+    def build():
+        return [spack.spec.Spec.from_node_dict(node)
+                for node in data['concrete_specs'].values()]
+    return build
+
+
+def database_nodes(db, data):
+    def build():
+        db._lazy_specs = False
+        db._read_installs(data['installs'], Version(data['version']),
+                          db._index_path)
+        return [rec.spec for rec in db._data.values()]
+    return build
+
+
+for path in sys.argv[1:]:
+    with open(path) as f:
+        measure(path, lockfile_nodes(json.load(f)))
+
+db = spack.database.Database(spack.store.db.root)
+with open(db._index_path) as f:
+    measure(db._index_path, database_nodes(db, json.load(f)['database']))
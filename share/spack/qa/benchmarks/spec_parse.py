@@ -0,0 +1,59 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the throughput of the spec parser.
+
+Run it with ``spack python``, optionally passing a file with one spec per
+line, e.g. extracted from environment matrices or packages.yaml externals::
+
+    $ spack python share/spack/qa/benchmarks/spec_parse.py specs.txt
+
+This prints the number of specs parsed per second by ``spack.spec.parse``
+and by the ``Spec`` constructor, with and without its parse cache.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import spack.spec
+
+default_specs = [
+    'mpileaks@2.3:2.5 +debug~opt %gcc@4.5.0 ^mpich@3.0.4 cflags="-O3 -g"',
+    'hdf5@1.10.7%intel@19.1 +mpi+fortran~cxx api=default '
+    'arch=linux-rhel7-x86_64',
+    'zlib@1.2.11',
+    'openmpi@4.0.5 fabrics=ucx,psm2 schedulers=slurm target=skylake',
+    'py-numpy ^openblas threads=openmp ^python@3.8:',
+]
+
+
+def measure(label, specs, parse, repeat=200):
+    start = time.time()
+    for _ in range(repeat):
+        for spec in specs:
+            parse(spec)
+    elapsed = time.time() - start
+    print('{0:>16}: {1:10.0f} specs/s'.format(
+        label, repeat * len(specs) / elapsed))
+
+
+if len(sys.argv) > 1:
+    with open(sys.argv[1]) as f:
+        specs = [line.strip() for line in f if line.strip()]
+else:
+    specs = default_specs
+
+print('{0} distinct specs'.format(len(set(specs))))
+measure('parse()', specs, spack.spec.parse)
+
+
+def parse_uncached(spec):
+    spack.spec._parsed_specs.clear()
+    return spack.spec.Spec(spec)
+
+
+measure('Spec() uncached', specs, parse_uncached)
+measure('Spec() cached', specs, spack.spec.Spec)
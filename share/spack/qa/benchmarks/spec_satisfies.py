@@ -0,0 +1,41 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed to check installed specs against constraints.
+
+Run it with ``spack python``, optionally passing the constraints to check::
+
+    $ spack python share/spack/qa/benchmarks/spec_satisfies.py '^mpi' '^zlib'
+
+This checks every spec in the installation database against every
+constraint a few times, as ``spack find`` and environment commands do, and
+prints the time per check and the hit rate of the ``satisfies`` cache.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import spack.spec
+import spack.store
+
+constraints = sys.argv[1:] or ['^mpi', '^zlib@1.2:', '^cmake@3.18:']
+
+specs = spack.store.db.query()
+cache = spack.spec._satisfies_cache()
+cache.clear()
+
+repeat = 5
+start = time.time()
+for _ in range(repeat):
+    for constraint in constraints:
+        for spec in specs:
+            spec.satisfies(constraint, strict=True)
+elapsed = time.time() - start
+
+checks = max(repeat * len(constraints) * len(specs), 1)
+print('{0} specs, {1} constraints: {2:.1f}us/check'.format(
+    len(specs), len(constraints), elapsed / checks * 1e6))
+print('cache: {0} hits, {1} misses'.format(cache.hits, cache.misses))
@@ -0,0 +1,42 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed to traverse large spec DAGs.
+
+Run it with ``spack python``, optionally passing the number of nodes::
+
+    $ spack python share/spack/qa/benchmarks/spec_traverse.py 600
+
+This builds a DAG where each node depends on the next few ones, like the
+dependencies of a large Python stack, and prints the time needed by
+``Spec.traverse`` with each order and cover.
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import spack.spec
+
+size = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+fanout = 4
+
+nodes = [spack.spec.Spec('node{0}'.format(i)) for i in range(size)]
+for i, node in enumerate(nodes):
+    for j, child in enumerate(nodes[i + 1:i + 1 + fanout]):
+        deptypes = ('build', 'link') if j % 2 else ('build', 'run')
+        node._add_dependency(child, deptypes)
+root = nodes[0]
+
+sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * size))
+for kwargs in ({}, {'order': 'post'}, {'cover': 'edges'},
+               {'deptype': ('link', 'run')}, {'depth': True}):
+    repeat = 20
+    start = time.time()
+    for _ in range(repeat):
+        count = sum(1 for _ in root.traverse(**kwargs))
+    elapsed = (time.time() - start) / repeat
+    print('{0:<28} {1:6} items  {2:8.2f}ms'.format(
+        str(kwargs), count, elapsed * 1e3))
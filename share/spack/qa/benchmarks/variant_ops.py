@@ -0,0 +1,51 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed to check and constrain variants.
+
+Run it with ``spack python``::
+
+    $ spack python share/spack/qa/benchmarks/variant_ops.py
+
+This prints the best of 5 average timings, in microseconds, of
+``satisfies()`` and ``constrain()`` on multi-valued, single-valued and
+boolean variants, and on the variant maps of two specs.
+"""
+from __future__ import print_function
+
+import time
+
+import spack.spec
+from spack.variant import (
+    BoolValuedVariant,
+    MultiValuedVariant,
+    SingleValuedVariant,
+)
+
+
+def measure(label, function, number=20000, repeat=5):
+    elapsed = []
+    for _ in range(repeat):
+        start = time.time()
+        for _ in range(number):
+            function()
+        elapsed.append(time.time() - start)
+    print('{0:>18}: {1:8.2f}us'.format(label, min(elapsed) / number * 1e6))
+
+
+multi = MultiValuedVariant('fabrics', 'ucx,psm2,ofi,verbs')
+other_multi = MultiValuedVariant('fabrics', 'ucx,psm2')
+single = SingleValuedVariant('build_type', 'Release')
+boolean = BoolValuedVariant('shared', True)
+
+measure('multi satisfies', lambda: multi.satisfies(other_multi))
+measure('single satisfies', lambda: single.satisfies(single))
+measure('bool satisfies', lambda: boolean.satisfies(boolean))
+measure('multi constrain', lambda: multi.copy().constrain(other_multi))
+
+a = spack.spec.Spec('openmpi fabrics=ucx,psm2,ofi +cuda build_type=Release')
+b = spack.spec.Spec('openmpi fabrics=ucx +cuda build_type=Release')
+measure('map satisfies', lambda: a.variants.satisfies(b.variants))
+measure('map constrain', lambda: a.variants.copy().constrain(b.variants))
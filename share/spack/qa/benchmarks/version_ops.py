@@ -0,0 +1,66 @@
+# Copyright 2013-2021 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Measure the time needed by the common operations on versions.
+
+Run it with ``spack python``::
+
+    $ spack python share/spack/qa/benchmarks/version_ops.py
+
+This reads the versions declared by every package in the builtin
+repository, and prints the best of 5 timings of parsing, sorting and
+comparing them, and of intersecting, overlapping and checking the
+satisfaction of version lists and of random ranges of their versions.
+"""
+from __future__ import print_function
+
+import random
+import time
+
+import spack.repo
+from spack.version import Version, VersionList, VersionRange, ver
+
+
+def measure(label, function, repeat=5):
+    elapsed = []
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        elapsed.append(time.time() - start)
+    print('{0:>18}: {1:8.4f}s'.format(label, min(elapsed)))
+
+
+strings = []
+for name in spack.repo.path.all_package_names():
+    pkg_class = spack.repo.path.get_pkg_class(name)
+    if len(pkg_class.versions) > 1:
+        strings.append([str(v) for v in pkg_class.versions])
+versions = [Version(s) for vstrings in strings for s in vstrings]
+print('{0} packages, {1} versions'.format(len(strings), len(versions)))
+
+# A package's versions, a range of them, and its lowest version
+random.seed(0)
+lists = []
+for vstrings in strings:
+    vlist = VersionList(vstrings)
+    low, high = sorted(random.sample([Version(s) for s in vstrings], 2))
+    vrange = VersionList([VersionRange(low, high)])
+    try:
+        vlist.intersection(vrange)
+    except ValueError:
+        # e.g. 1.0.1 and the range 1.0:1.0.1 make the invalid range 1.0.1:1.0
+        continue
+    lists.append((vlist, vrange, low))
+
+measure('Version()', lambda: [Version(s) for v in strings for s in v])
+measure('ver()', lambda: [ver(s) for v in strings for s in v])
+measure('sorted()', lambda: sorted(versions))
+measure('==', lambda: [a == b for a, b in zip(versions, versions[1:])])
+measure('VersionList()', lambda: [VersionList(v) for v in strings])
+measure('intersection', lambda: [a.intersection(b) for a, b, _ in lists])
+measure('overlaps', lambda: [a.overlaps(b) for a, b, _ in lists])
+measure('satisfies', lambda: [v.satisfies(b) for _, b, v in lists])
+measure('in', lambda: [v in a for a, _, v in lists])
+measure('self intersection', lambda: [a.intersection(a) for a, _, _ in lists])